@@ -1,14 +1,56 @@
+"""
+Emergency DAO snapshot export
+
+A snapshot is a directory holding a ``manifest.json`` and one record file
+per dataset. Full snapshots contain every proposal; delta snapshots
+(``--delta PREVIOUS_DIR``) contain only the proposals, votes and citizen
+status changes since the previous snapshot's block. Restoring replays the
+full snapshot followed by its deltas (``--restore DIR`` follows the chain
+of ``previous`` links).
+
+Every read of a snapshot is pinned to the block recorded in its manifest,
+so a snapshot is one consistent point-in-time state. Resuming a run
+requires the node to still serve state at that block (an archive node for
+old runs).
+
+Record files are NDJSON (optionally gzip or zstd compressed) or Parquet,
+written batch by batch as reads complete. Parquet stores nested fields as
+dotted columns and uint256 values as decimal strings; both are restored on
+read, so every format yields the same records. zstd needs the
+``zstandard`` package and Parquet ``pyarrow``. Interrupted runs resume from
+``checkpoint.json`` with ``--resume DIR``.
+"""
+
+import argparse
+import gzip
+import io
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from web3 import Web3
+from eth_utils import event_abi_to_log_topic
 from dotenv import load_dotenv
 from datetime import datetime
 
+from services.multicall import MULTICALL3_ADDRESS, MulticallReader, encode_call
+from services.rpc_pool import PooledHTTPProvider, RPCPool, rpc_urls_from_env
+
 load_dotenv()
 
 # Configuration
 RPC_URL = os.getenv("RPC_URL", "https://ethereum-sepolia-rpc.publicnode.com")
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
+
+MULTICALL_ADDRESS = os.getenv("MULTICALL_ADDRESS", MULTICALL3_ADDRESS)  # empty: JSON-RPC batches instead
+BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "200"))   # proposals per aggregated read
+WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "4"))           # concurrent aggregated reads
+LOG_PAGE_SIZE = int(os.getenv("SNAPSHOT_LOG_PAGE_SIZE", "2000"))  # blocks per eth_getLogs in delta mode
+FORMAT = os.getenv("SNAPSHOT_FORMAT", "ndjson.gz")          # ndjson, ndjson.gz, ndjson.zst or parquet
+MAX_RETRIES = 5                                             # attempts per batch before the run stops
+
+# Several endpoints (RPC_URLS) are health-scored, hedged and failed over;
+# the pool keeps one keep-alive connection per worker and endpoint
+w3 = Web3(PooledHTTPProvider(RPCPool(rpc_urls_from_env(RPC_URL), pool_size=WORKERS)))
 
 # Contract Addresses
 CONTRACTS = {
@@ -31,60 +73,513 @@ ABIS = {
             {"name": "startTime", "type": "uint256"},
             {"name": "endTime", "type": "uint256"},
             {"name": "status", "type": "uint8"}
-        ], "stateMutability": "view", "type": "function"}
+        ], "stateMutability": "view", "type": "function"},
+        {"anonymous": False, "name": "ProposalCreated", "type": "event", "inputs": [
+            {"indexed": True, "name": "proposalId", "type": "uint256"},
+            {"indexed": True, "name": "proposer", "type": "address"},
+            {"indexed": False, "name": "proposalType", "type": "uint8"},
+            {"indexed": False, "name": "metadataHash", "type": "string"}
+        ]},
+        {"anonymous": False, "name": "ProposalStateChanged", "type": "event", "inputs": [
+            {"indexed": True, "name": "proposalId", "type": "uint256"},
+            {"indexed": False, "name": "oldState", "type": "uint8"},
+            {"indexed": False, "name": "newState", "type": "uint8"}
+        ]},
+        {"anonymous": False, "name": "VoteCast", "type": "event", "inputs": [
+            {"indexed": True, "name": "proposalId", "type": "uint256"},
+            {"indexed": True, "name": "voter", "type": "address"},
+            {"indexed": False, "name": "support", "type": "uint8"},
+            {"indexed": False, "name": "weight", "type": "uint256"}
+        ]}
     ],
     "CitizenRegistry": [
-        {"inputs": [], "name": "getTotalCitizens", "outputs": [{"type": "uint256"}], "stateMutability": "view", "type": "function"}
+        {"inputs": [], "name": "getTotalCitizens", "outputs": [{"type": "uint256"}], "stateMutability": "view", "type": "function"},
+        {"anonymous": False, "name": "CitizenRegistered", "type": "event", "inputs": [
+            {"indexed": True, "name": "wallet", "type": "address"},
+            {"indexed": False, "name": "votingPower", "type": "uint256"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ]},
+        {"anonymous": False, "name": "CitizenshipApproved", "type": "event", "inputs": [
+            {"indexed": True, "name": "wallet", "type": "address"},
+            {"indexed": True, "name": "approver", "type": "address"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ]},
+        {"anonymous": False, "name": "CitizenshipRevoked", "type": "event", "inputs": [
+            {"indexed": True, "name": "wallet", "type": "address"},
+            {"indexed": True, "name": "revoker", "type": "address"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ]}
     ]
 }
 
-def export_snapshot():
-    print(f"🚀 Starting Emergency DAO Snapshot ({datetime.now()})")
-    snapshot = {
+CITIZEN_STATUS = {
+    "CitizenRegistered": "PENDING",
+    "CitizenshipApproved": "ACTIVE",
+    "CitizenshipRevoked": "REVOKED"
+}
+
+# Record fields that hold uint256 values, which overflow Parquet's int64; stored as strings
+UINT256_COLUMNS = (
+    "id", "votes.for", "votes.against", "votes.abstain", "timeline.start", "timeline.end",
+    "proposal_id", "weight"
+)
+
+CHECKPOINT_FILE = "checkpoint.json"
+MANIFEST_FILE = "manifest.json"
+DATASETS = ("proposals", "votes", "citizens")
+
+
+def format_proposal(prop):
+    return {
+        "id": prop[0],
+        "proposer": prop[1],
+        "description": prop[2],
+        "votes": {"for": prop[3], "against": prop[4], "abstain": prop[5]},
+        "timeline": {"start": prop[6], "end": prop[7]},
+        "status": prop[8]
+    }
+
+
+def write_json(path, data):
+    """Atomically replace a small JSON file"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# --- RECORD FILES ---
+
+def flatten_record(record, prefix=""):
+    """Parquet row of a record: nested fields as dotted columns, uint256 values as strings"""
+    row = {}
+    for key, value in record.items():
+        column = prefix + key
+        if isinstance(value, dict):
+            row.update(flatten_record(value, f"{column}."))
+        else:
+            row[column] = str(value) if column in UINT256_COLUMNS else value
+    return row
+
+
+def unflatten_record(row):
+    """Record of a Parquet row written by ``flatten_record``"""
+    record = {}
+    for column, value in row.items():
+        if column in UINT256_COLUMNS:
+            value = int(value)
+        *parents, key = column.split(".")
+        target = record
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+    return record
+
+
+def _compressor(fmt):
+    if fmt == "ndjson":
+        return lambda data: data
+    if fmt == "ndjson.gz":
+        return gzip.compress
+    if fmt == "ndjson.zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("ndjson.zst output requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().compress
+    raise ValueError(f"Unknown snapshot format {fmt}")
+
+
+class DatasetWriter:
+    """
+    Appends record batches of one dataset to disk
+
+    NDJSON batches are compressed as independent gzip members / zstd frames,
+    which read back as one stream. The checkpoint holds the file length after
+    each batch, so a resumed run truncates a partially written batch. Parquet
+    batches are written to numbered part files instead.
+    """
+
+    def __init__(self, directory, name, fmt, state):
+        """
+        Args:
+            directory: Snapshot directory
+            name: Dataset name (proposals, votes, citizens)
+            fmt: Output format
+            state: Per-dataset checkpoint entry, updated in place
+        """
+        self.fmt = fmt
+        self.state = state
+        self.file = None
+        if fmt == "parquet":
+            self.path = os.path.join(directory, name)
+            os.makedirs(self.path, exist_ok=True)
+            # Drop parts written after the last checkpoint
+            for part in os.listdir(self.path):
+                if part.endswith(".parquet") and int(part[5:10]) >= state["parts"]:
+                    os.remove(os.path.join(self.path, part))
+        else:
+            self.compress = _compressor(fmt)
+            self.path = os.path.join(directory, f"{name}.{fmt}")
+            self.file = open(self.path, "a+b")
+            self.file.truncate(state["bytes"])
+            self.file.seek(0, os.SEEK_END)
+        state["path"] = os.path.basename(self.path)
+
+    def append(self, records):
+        if not records:
+            return
+        if self.fmt == "parquet":
+            self._write_part(records)
+        else:
+            data = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+            self.file.write(self.compress(data))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.state["bytes"] = self.file.tell()
+        self.state["records"] += len(records)
+
+    def _write_part(self, records):
+        import pandas as pd
+
+        frame = pd.DataFrame([flatten_record(record) for record in records])
+        # Raises ImportError without pyarrow/fastparquet, before the checkpoint moves on
+        frame.to_parquet(os.path.join(self.path, f"part-{self.state['parts']:05d}.parquet"), index=False)
+        self.state["parts"] += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def iter_records(directory, name, fmt):
+    """Yield the records of one dataset of a snapshot directory"""
+    if fmt == "parquet":
+        import pandas as pd
+
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and os.listdir(path):
+            for row in pd.read_parquet(path).to_dict("records"):
+                yield unflatten_record(row)
+        return
+
+    path = os.path.join(directory, f"{name}.{fmt}")
+    if not os.path.exists(path):
+        return
+    if fmt == "ndjson.gz":
+        stream = gzip.open(path, "rt")
+    elif fmt == "ndjson.zst":
+        import zstandard
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        stream = io.TextIOWrapper(raw)
+    else:
+        stream = open(path)
+    with stream:
+        for line in stream:
+            yield json.loads(line)
+
+
+# --- READS ---
+
+def read_state(reader, pm, cr, block_number):
+    """Read the proposal count, citizen count and treasury balance at one block in one round-trip"""
+    calls = [encode_call(pm, "getProposalCount"), encode_call(cr, "getTotalCitizens")]
+    if reader.multicall is not None:
+        calls.append(encode_call(reader.multicall, "getEthBalance", CONTRACTS["TreasuryManager"]))
+    results = reader.aggregate(calls, block_identifier=block_number)
+    if results[0] is None or results[1] is None:
+        raise RuntimeError(f"Could not read governance state at block {block_number}")
+
+    if reader.multicall is not None:
+        treasury_balance = results[2]
+    else:
+        treasury_balance = w3.eth.get_balance(CONTRACTS["TreasuryManager"], block_identifier=block_number)
+    return {
+        "proposal_count": results[0],
+        "citizens_count": results[1],
+        "treasury_balance": treasury_balance
+    }
+
+
+def read_batch(reader, pm, batch, block_number):
+    """
+    Read one batch of proposals at the snapshot block with a single aggregated call, retrying with backoff
+
+    Proposals whose read failed are read again on the next attempt. A batch
+    with proposals still missing after MAX_RETRIES attempts raises, so it is
+    never checkpointed as complete.
+    """
+    records = {}
+    delay = 1
+    for attempt in range(1, MAX_RETRIES + 1):
+        missing = [proposal_id for proposal_id in batch if proposal_id not in records]
+        try:
+            results = reader.aggregate(
+                [encode_call(pm, "proposals", proposal_id) for proposal_id in missing],
+                block_identifier=block_number
+            )
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                raise
+            error = e
+        else:
+            records.update(
+                (proposal_id, format_proposal(result))
+                for proposal_id, result in zip(missing, results) if result is not None
+            )
+            if len(records) == len(batch):
+                return [records[proposal_id] for proposal_id in batch]
+            error = f"no result for proposals {[proposal_id for proposal_id in batch if proposal_id not in records]}"
+            if attempt == MAX_RETRIES:
+                raise RuntimeError(f"Batch {batch[0]}-{batch[-1]} incomplete: {error}")
+        print(f"⚠️ Batch {batch[0]}-{batch[-1]} failed (attempt {attempt}): {error}")
+        time.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+def scan_changes(contracts, from_block, to_block, writers):
+    """
+    Export votes and citizen changes in a block range and collect touched proposals
+
+    Returns:
+        Sorted ids of proposals created, voted on or changed in the range
+    """
+    events = {}
+    for contract in contracts:
+        for item in contract.abi:
+            if item["type"] == "event":
+                topic = Web3.to_hex(event_abi_to_log_topic(item))
+                events[(contract.address, topic)] = getattr(contract.events, item["name"])()
+
+    touched = set()
+    for start in range(from_block, to_block + 1, LOG_PAGE_SIZE):
+        end = min(start + LOG_PAGE_SIZE - 1, to_block)
+        logs = w3.eth.get_logs({
+            "address": [contract.address for contract in contracts],
+            "fromBlock": start,
+            "toBlock": end
+        })
+
+        votes, citizens = [], []
+        for log in logs:
+            event = events.get((Web3.to_checksum_address(log["address"]), Web3.to_hex(log["topics"][0])))
+            if event is None:
+                continue
+            decoded = event.process_log(log)
+            args = decoded["args"]
+            position = {
+                "block_number": log["blockNumber"],
+                "log_index": log["logIndex"],
+                "transaction_hash": Web3.to_hex(log["transactionHash"])
+            }
+            if "proposalId" in args:
+                touched.add(args["proposalId"])
+            if decoded["event"] == "VoteCast":
+                votes.append({
+                    "proposal_id": args["proposalId"],
+                    "voter": args["voter"],
+                    "support": args["support"],
+                    "weight": args["weight"],
+                    **position
+                })
+            elif decoded["event"] in CITIZEN_STATUS:
+                citizens.append({
+                    "wallet": args["wallet"],
+                    "status": CITIZEN_STATUS[decoded["event"]],
+                    "event": decoded["event"],
+                    **position
+                })
+
+        writers["votes"].append(votes)
+        writers["citizens"].append(citizens)
+    return sorted(touched)
+
+
+# --- EXPORT ---
+
+def load_or_create_checkpoint(directory, reader, pm, cr, fmt, previous):
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        checkpoint = read_json(path)
+        print(f"↩️ Resuming snapshot in {directory} at block {checkpoint['block_number']} "
+              f"({len(checkpoint['completed'])} batches done)")
+        return checkpoint
+
+    # Pin the snapshot to the current head; every later read uses this block
+    block = w3.eth.get_block("latest")
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = {
+        "type": "full",
+        "format": fmt,
+        "block_number": block["number"],
+        "block_hash": Web3.to_hex(block["hash"]),
+        "data": read_state(reader, pm, cr, block["number"]),
         "timestamp": datetime.now().isoformat(),
         "network": "sepolia",
         "contracts": CONTRACTS,
-        "data": {
-            "proposals": [],
-            "citizens_count": 0,
-            "treasury_balance": 0
-        }
+        "batch_size": BATCH_SIZE,
+        "completed": [],
+        "files": {name: {"records": 0, "bytes": 0, "parts": 0} for name in DATASETS},
+        "finished": False
     }
+    if previous:
+        checkpoint.update({
+            "type": "delta",
+            "previous": os.path.relpath(previous, directory),
+            "base_block": read_json(os.path.join(previous, MANIFEST_FILE))["block_number"],
+            "proposal_ids": None
+        })
+    else:
+        checkpoint["proposal_ids"] = list(range(1, checkpoint["data"]["proposal_count"] + 1))
+    return checkpoint
+
+
+def export_snapshot(directory=None, workers=WORKERS, fmt=FORMAT, previous=None):
+    """
+    Export a full or delta snapshot into ``directory``, resuming it if a checkpoint exists
+
+    Args:
+        directory: Output directory, created if missing
+        workers: Concurrent aggregated reads
+        fmt: Record file format
+        previous: Snapshot directory a delta is based on; None for a full snapshot
+
+    Returns:
+        Path of the manifest, or None if the run stopped early
+    """
+    print(f"🚀 Starting Emergency DAO Snapshot ({datetime.now()})")
+    kind = "delta" if previous else "full"
+    directory = directory or f"emergency_snapshot_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    writers = {}
 
     try:
-        # Get Proposals
         pm = w3.eth.contract(address=CONTRACTS["ProposalManager"], abi=ABIS["ProposalManager"])
-        count = pm.functions.getProposalCount().call()
-        print(f"📦 Exporting {count} proposals...")
-        for i in range(1, count + 1):
-            prop = pm.functions.proposals(i).call()
-            snapshot["data"]["proposals"].append({
-                "id": prop[0],
-                "proposer": prop[1],
-                "description": prop[2],
-                "votes": {"for": prop[3], "against": prop[4], "abstain": prop[5]},
-                "timeline": {"start": prop[6], "end": prop[7]},
-                "status": prop[8]
-            })
-
-        # Get Citizens
         cr = w3.eth.contract(address=CONTRACTS["CitizenRegistry"], abi=ABIS["CitizenRegistry"])
-        snapshot["data"]["citizens_count"] = cr.functions.getTotalCitizens().call()
+        reader = MulticallReader(w3, None, pm, multicall_address=MULTICALL_ADDRESS or None)
+
+        checkpoint = load_or_create_checkpoint(directory, reader, pm, cr, fmt, previous)
+        fmt = checkpoint["format"]
+        block_number = checkpoint["block_number"]
+
+        def save():
+            write_json(os.path.join(directory, CHECKPOINT_FILE), checkpoint)
+
+        # Delta change scans are not checkpointed; an interrupted scan starts over
+        rescan = checkpoint["type"] == "delta" and checkpoint["proposal_ids"] is None
+        if rescan:
+            for name in ("votes", "citizens"):
+                checkpoint["files"][name].update(records=0, bytes=0, parts=0)
+        writers = {name: DatasetWriter(directory, name, fmt, checkpoint["files"][name]) for name in DATASETS}
+        save()
 
-        # Get Treasury Balance
-        snapshot["data"]["treasury_balance"] = w3.eth.get_balance(CONTRACTS["TreasuryManager"])
+        # Get Votes & Citizen changes
+        if rescan:
+            from_block = checkpoint["base_block"] + 1
+            print(f"🔎 Scanning blocks {from_block}-{block_number} for changes...")
+            checkpoint["proposal_ids"] = scan_changes([pm, cr], from_block, block_number, writers)
+            save()
+
+        # Get Proposals
+        ids = checkpoint["proposal_ids"]
+        size = checkpoint["batch_size"]
+        done = set(checkpoint["completed"])
+        starts = range(0, len(ids), size)
+        batches = {index: ids[start:start + size] for index, start in enumerate(starts) if index not in done}
+        print(f"📦 Exporting {len(ids)} proposals ({len(batches)} batches of up to {size}, {workers} workers)...")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(read_batch, reader, pm, batch, block_number): index for index, batch in batches.items()}
+            try:
+                for future in as_completed(futures):
+                    # Records are written as batches finish, so file order follows completion order
+                    writers["proposals"].append(future.result())
+                    checkpoint["completed"].append(futures[future])
+                    save()
+                    print(f"   {len(checkpoint['completed'])}/{len(starts)} batches written")
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # Citizens count and treasury balance were read with the proposal count at the snapshot block
+        manifest = {
+            key: checkpoint[key]
+            for key in ("type", "format", "block_number", "block_hash", "timestamp", "network", "contracts",
+                        "previous", "base_block", "data")
+            if key in checkpoint
+        }
+        manifest["files"] = {
+            name: {"path": state["path"], "records": state["records"]}
+            for name, state in checkpoint["files"].items()
+        }
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        write_json(manifest_path, manifest)
+        checkpoint["finished"] = True
+        save()
 
-        # Save to file
-        filename = f"emergency_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, "w") as f:
-            json.dump(snapshot, f, indent=4)
-        
-        print(f"✅ Snapshot saved successfully to {filename}")
-        return filename
+        print(f"✅ Snapshot saved successfully to {directory}")
+        return manifest_path
 
     except Exception as e:
         print(f"❌ Snapshot failed: {e}")
+        print(f"   Progress is checkpointed; resume with: python emergency_snapshot.py --resume {directory}")
         return None
 
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+# --- RESTORE ---
+
+def snapshot_chain(directory):
+    """Snapshot directories from the full base to ``directory``"""
+    chain = [directory]
+    while True:
+        manifest = read_json(os.path.join(chain[0], MANIFEST_FILE))
+        if manifest["type"] == "full":
+            return chain
+        chain.insert(0, os.path.normpath(os.path.join(chain[0], manifest["previous"])))
+
+
+def restore(directory):
+    """
+    Rebuild state by replaying a full snapshot and its deltas
+
+    Returns:
+        Dict with proposals by id, all votes, citizen status by wallet and
+        the manifest of the newest snapshot
+    """
+    state = {"proposals": {}, "votes": [], "citizens": {}}
+    for path in snapshot_chain(directory):
+        manifest = read_json(os.path.join(path, MANIFEST_FILE))
+        for record in iter_records(path, "proposals", manifest["format"]):
+            state["proposals"][int(record["id"])] = record
+        state["votes"].extend(iter_records(path, "votes", manifest["format"]))
+        for record in iter_records(path, "citizens", manifest["format"]):
+            state["citizens"][record["wallet"]] = record["status"]
+    state["manifest"] = manifest
+    return state
+
+
 if __name__ == "__main__":
-    export_snapshot()
+    parser = argparse.ArgumentParser(description="Export an emergency snapshot of DAO state")
+    parser.add_argument("--resume", metavar="DIR", help="continue an interrupted snapshot directory")
+    parser.add_argument("--delta", metavar="PREVIOUS_DIR", help="export only changes since a previous snapshot")
+    parser.add_argument("--format", default=FORMAT, choices=["ndjson", "ndjson.gz", "ndjson.zst", "parquet"])
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent batch reads")
+    parser.add_argument("--restore", metavar="DIR", help="replay a snapshot chain and print its totals")
+    args = parser.parse_args()
+
+    if args.restore:
+        restored = restore(args.restore)
+        print(f"♻️ Restored state at block {restored['manifest']['block_number']}: "
+              f"{len(restored['proposals'])} proposals, {len(restored['votes'])} votes, "
+              f"{len(restored['citizens'])} citizens with status changes")
+    else:
+        export_snapshot(args.resume, workers=args.workers, fmt=args.format, previous=args.delta)
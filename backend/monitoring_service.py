@@ -1,11 +1,17 @@
 import time
 import json
-import requests
+from collections import OrderedDict
 from web3 import Web3
-from eth_abi import decode
+from eth_utils import event_abi_to_log_topic
 import os
 from dotenv import load_dotenv
 
+from services.alert_dispatcher import AlertDispatcher
+from services.block_cache import BlockHeaderCache
+from services.reorg import BlockHashRing, detect_reorg
+from services.rpc_pool import PooledHTTPProvider, RPCPool, rpc_urls_from_env
+from services.threat_rules import RuleEngine
+
 load_dotenv()
 
 # --- CONFIGURATION ---
@@ -16,6 +22,11 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 
 # Thresholds
 LARGE_WITHDRAWAL_THRESHOLD = Web3.to_wei(1, 'ether') # threshold for alerting
+THREAT_SCORE_THRESHOLD = float(os.getenv("THREAT_SCORE_THRESHOLD", "1"))  # minimum rule score for a proposal alert
+THREAT_RULES_FILE = os.getenv(
+    "THREAT_RULES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "threat_rules.json")
+)
 
 # Smart Contract Addresses (from your deployment)
 PROPOSAL_MANAGER_ADDR = "0xd8b934580fcE35a11B58C6D73aDeE468a2833fa8"
@@ -33,6 +44,16 @@ PROPOSAL_MANAGER_ABI = [
         ],
         "name": "ProposalCreated",
         "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "proposalId", "type": "uint256"},
+            {"indexed": False, "name": "oldState", "type": "uint8"},
+            {"indexed": False, "name": "newState", "type": "uint8"}
+        ],
+        "name": "ProposalStateChanged",
+        "type": "event"
     }
 ]
 
@@ -47,85 +68,265 @@ TREASURY_MANAGER_ABI = [
         ],
         "name": "Withdrawal",
         "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "freezer", "type": "address"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ],
+        "name": "EmergencyFreeze",
+        "type": "event"
     }
 ]
 
+GOVERNANCE_CORE_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "role", "type": "bytes32"},
+            {"indexed": True, "name": "account", "type": "address"},
+            {"indexed": True, "name": "sender", "type": "address"}
+        ],
+        "name": "RoleGranted",
+        "type": "event"
+    }
+]
+
+# Polling
+POLL_INTERVAL = 15          # seconds between polls once caught up (typical block time)
+MIN_BLOCK_RANGE = 10        # smallest eth_getLogs window when the node rejects large ranges
+MAX_BLOCK_RANGE = 2000      # largest eth_getLogs window while catching up
+MAX_ERROR_BACKOFF = 300     # seconds
+CONFIRMATIONS = int(os.getenv("MONITOR_CONFIRMATIONS", "3"))  # blocks behind the head scanned as final
+REORG_WINDOW = 256          # scanned block hashes kept to locate a fork
+SEEN_LOGS = 10000           # dispatched logs remembered so re-scans after a reorg do not re-alert
+
+PROPOSAL_STATES = ["DRAFT", "ACTIVE", "SUCCEEDED", "DEFEATED", "QUEUED", "EXECUTED", "CANCELLED", "EXPIRED"]
+ROLE_NAMES = {
+    Web3.to_hex(Web3.keccak(text=f"{name}_ROLE")): name
+    for name in ["CITIZEN", "DELEGATE", "ADMINISTRATOR", "AUDITOR", "GUARDIAN", "UPGRADER"]
+}
+ROLE_NAMES["0x" + "00" * 32] = "DEFAULT_ADMIN"
+PRIVILEGED_ROLES = {"DEFAULT_ADMIN", "ADMINISTRATOR", "GUARDIAN", "UPGRADER"}
+
 # Initialize Web3
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
+# Several endpoints (RPC_URLS) are health-scored, hedged and failed over
+w3 = Web3(PooledHTTPProvider(RPCPool(rpc_urls_from_env(RPC_URL))))
+
+# Alerts are delivered by background workers so slow webhooks never stall scanning
+alerts = AlertDispatcher.from_env()
 
-def send_alert(message):
+def send_alert(message, dedup_key=None):
     print(f"🚨 ALERT: {message}")
-    
-    # Slack
-    if SLACK_WEBHOOK_URL:
-        try:
-            requests.post(SLACK_WEBHOOK_URL, json={"text": message})
-        except Exception as e:
-            print(f"Failed to send Slack alert: {e}")
-            
-    # Telegram (optional)
-    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-        try:
-            # Basic sanitization for Chat ID if user accidentally pasted URL
-            clean_chat_id = TELEGRAM_CHAT_ID.strip()
-            if "t.me/" in clean_chat_id:
-                clean_chat_id = clean_chat_id.split("/")[-1]
-            
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            requests.post(url, data={"chat_id": clean_chat_id, "text": message})
-        except Exception as e:
-            print(f"Failed to send Telegram alert: {e}")
+    alerts.send(message, dedup_key=dedup_key)
+
+class LogPoller:
+    """Fetches logs of every watched contract with a single eth_getLogs per poll"""
+
+    def __init__(self, web3):
+        self.w3 = web3
+        self.addresses = []
+        self.events = {}     # (address, topic0) -> bound contract event
+        self.handlers = {}   # event name -> [handler]
+        self.ring = BlockHashRing(REORG_WINDOW)
+        self.headers = BlockHeaderCache(web3, maxsize=REORG_WINDOW)
+        self.seen = OrderedDict()  # (tx hash, address, topics, data) of dispatched logs
+
+    def watch(self, address, abi):
+        """Watch every event in a contract ABI"""
+        contract = self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
+        if contract.address not in self.addresses:
+            self.addresses.append(contract.address)
+        for item in abi:
+            if item["type"] == "event":
+                topic = Web3.to_hex(event_abi_to_log_topic(item))
+                self.events[(contract.address, topic)] = getattr(contract.events, item["name"])()
+
+    def on(self, event_name):
+        """Decorator registering a rule handler for an event"""
+        def register(handler):
+            self.handlers.setdefault(event_name, []).append(handler)
+            return handler
+        return register
+
+    def poll(self, from_block, to_block):
+        """Fetch, decode and dispatch all watched logs in a block range"""
+        topics = sorted({topic for _, topic in self.events})
+        logs = self.w3.eth.get_logs({
+            "address": self.addresses,
+            "topics": [topics],
+            "fromBlock": from_block,
+            "toBlock": to_block
+        })
+
+        # Record scanned block hashes so a later reorg can be detected and re-scanned.
+        # The last block's hash is fetched first: a failed fetch leaves the ring
+        # untouched for the retry of the same range
+        to_block_hash = self.headers.get_hashes([to_block])[to_block]
+        for block_number, block_hash in sorted({(log["blockNumber"], Web3.to_hex(log["blockHash"])) for log in logs}):
+            if block_number != to_block:
+                self.ring.add(block_number, block_hash)
+        self.ring.add(to_block, to_block_hash)
+
+        for log in logs:
+            event = self.events.get((Web3.to_checksum_address(log["address"]), Web3.to_hex(log["topics"][0])))
+            if event is None or not self._first_sighting(log):
+                continue
+            try:
+                decoded = event.process_log(log)
+            except Exception as e:
+                print(f"Could not decode log in block {log['blockNumber']}: {e}")
+                continue
+            for handler in self.handlers.get(decoded["event"], []):
+                try:
+                    handler(decoded)
+                except Exception as e:
+                    print(f"Rule {handler.__name__} failed: {e}")
+        return len(logs)
+
+    def _first_sighting(self, log):
+        """False for a log already dispatched before a reorg moved it to another block"""
+        key = (
+            Web3.to_hex(log["transactionHash"]),
+            log["address"],
+            tuple(Web3.to_hex(topic) for topic in log["topics"]),
+            Web3.to_hex(log["data"])
+        )
+        if key in self.seen:
+            return False
+        self.seen[key] = None
+        if len(self.seen) > SEEN_LOGS:
+            self.seen.popitem(last=False)
+        return True
+
+    def check_reorg(self):
+        """Return the last block shared with the canonical chain if scanned blocks were reorged"""
+        fork_block = detect_reorg(self.ring, self.headers.get_hashes)
+        if fork_block is not None:
+            self.ring.truncate(fork_block)
+        return fork_block
+
+
+poller = LogPoller(w3)
+poller.watch(PROPOSAL_MANAGER_ADDR, PROPOSAL_MANAGER_ABI)
+poller.watch(TREASURY_MANAGER_ADDR, TREASURY_MANAGER_ABI)
+poller.watch(GOVERNANCE_CORE_ADDR, GOVERNANCE_CORE_ABI)
+
+# Define keywords for "Malicious" proposals (used when the rules file is missing)
+MALICIOUS_KEYWORDS = ["hack", "steal", "malicious", "exploit", "drain", "backdoor"]
+threat_rules = RuleEngine.from_keywords(MALICIOUS_KEYWORDS, path=THREAT_RULES_FILE)
+
+
+# --- RULES ---
+
+@poller.on("ProposalCreated")
+def check_malicious_proposal(event):
+    desc = event['args']['description']
+    proposer = event['args']['proposer']
+    prop_id = event['args']['proposalId']
+
+    score, matches = threat_rules.score(desc)
+    if matches and score >= THREAT_SCORE_THRESHOLD:
+        rules = ", ".join(match.rule_id for match in matches)
+        send_alert(
+            f"⚠️ POTENTIAL MALICIOUS PROPOSAL DETECTED!\nID: {prop_id}\nProposer: {proposer}\n"
+            f"Score: {score:g} (rules: {rules})\nDescription Snippet: {desc[:100]}",
+            dedup_key=f"proposal:{prop_id}"
+        )
+    else:
+        print(f"New proposal {prop_id} detected (Safe description)")
+
+
+@poller.on("Withdrawal")
+def check_large_withdrawal(event):
+    amount = event['args']['amount']
+    recipient = event['args']['to']
+
+    if amount >= LARGE_WITHDRAWAL_THRESHOLD:
+        amt_eth = w3.from_wei(amount, 'ether')
+        send_alert(
+            f"🚩 LARGE WITHDRAWAL DETECTED!\nAmount: {amt_eth} ETH\nTo: {recipient}\nTx: {event['transactionHash'].hex()}",
+            dedup_key=f"withdrawal:{recipient}"
+        )
+    else:
+        print(f"Normal withdrawal detected ({w3.from_wei(amount, 'ether')} ETH)")
+
+
+@poller.on("EmergencyFreeze")
+def report_emergency_freeze(event):
+    send_alert(
+        f"🧊 TREASURY EMERGENCY FREEZE!\nBy: {event['args']['freezer']}\nTx: {event['transactionHash'].hex()}",
+        dedup_key="emergency-freeze"
+    )
+
+
+@poller.on("RoleGranted")
+def report_role_grant(event):
+    role_hash = Web3.to_hex(event['args']['role'])
+    role = ROLE_NAMES.get(role_hash, role_hash)
+
+    if role in PRIVILEGED_ROLES or role == role_hash:
+        send_alert(
+            f"🔑 PRIVILEGED ROLE GRANTED\nRole: {role}\nAccount: {event['args']['account']}\nBy: {event['args']['sender']}",
+            dedup_key=f"role:{event['args']['account']}"
+        )
+    else:
+        print(f"Role {role} granted to {event['args']['account']}")
+
+
+@poller.on("ProposalStateChanged")
+def report_state_change(event):
+    old_state = PROPOSAL_STATES[event['args']['oldState']]
+    new_state = PROPOSAL_STATES[event['args']['newState']]
+    print(f"Proposal {event['args']['proposalId']} moved {old_state} -> {new_state}")
+
 
 def monitor_events():
     print(f"📡 Monitoring Nexus Org Events on {RPC_URL}...")
-    
-    # Contract objects
-    proposal_manager = w3.eth.contract(address=PROPOSAL_MANAGER_ADDR, abi=PROPOSAL_MANAGER_ABI)
-    treasury_manager = w3.eth.contract(address=TREASURY_MANAGER_ADDR, abi=TREASURY_MANAGER_ABI)
-    
-    # Define keywords for "Malicious" proposals
-    MALICIOUS_KEYWORDS = ["hack", "steal", "malicious", "exploit", "drain", "backdoor"]
 
-    # Start from latest block
-    latest_block = w3.eth.block_number
+    # Start from the latest confirmed block
+    latest_block = w3.eth.block_number - CONFIRMATIONS
+    block_range = MAX_BLOCK_RANGE
+    backoff = POLL_INTERVAL
 
     while True:
         try:
-            current_block = w3.eth.block_number
+            fork_block = poller.check_reorg()
+            if fork_block is not None:
+                send_alert(
+                    f"⛓️ CHAIN REORG DETECTED\nBlocks {fork_block + 1}-{latest_block} were replaced; "
+                    f"alerts from them may refer to orphaned transactions. Re-scanning.",
+                    dedup_key="reorg"
+                )
+                latest_block = fork_block
+
+            current_block = w3.eth.block_number - CONFIRMATIONS
             if current_block > latest_block:
-                print(f"Scanning blocks {latest_block + 1} to {current_block}...")
-                
-                # Scan ProposalCreated
-                proposal_events = proposal_manager.events.ProposalCreated.get_logs(from_block=latest_block + 1, to_block=current_block)
-                for event in proposal_events:
-                    desc = event['args']['description'].lower()
-                    proposer = event['args']['proposer']
-                    prop_id = event['args']['proposalId']
-                    
-                    if any(kw in desc for kw in MALICIOUS_KEYWORDS):
-                        send_alert(f"⚠️ POTENTIAL MALICIOUS PROPOSAL DETECTED!\nID: {prop_id}\nProposer: {proposer}\nDescription Snippet: {desc[:100]}")
-                    else:
-                        print(f"New proposal {prop_id} detected (Safe description)")
-
-                # Scan Withdrawal
-                withdrawal_events = treasury_manager.events.Withdrawal.get_logs(from_block=latest_block + 1, to_block=current_block)
-                for event in withdrawal_events:
-                    amount = event['args']['amount']
-                    recipient = event['args']['to']
-                    
-                    if amount >= LARGE_WITHDRAWAL_THRESHOLD:
-                        amt_eth = w3.from_wei(amount, 'ether')
-                        send_alert(f"🚩 LARGE WITHDRAWAL DETECTED!\nAmount: {amt_eth} ETH\nTo: {recipient}\nTx: {event['transactionHash'].hex()}")
-                    else:
-                        print(f"Normal withdrawal detected ({w3.from_wei(amount, 'ether')} ETH)")
-
-                latest_block = current_block
-
-            time.sleep(15) # Scan every 15 seconds (typical block time)
-            
+                to_block = min(current_block, latest_block + block_range)
+                print(f"Scanning blocks {latest_block + 1} to {to_block}...")
+
+                poller.poll(latest_block + 1, to_block)
+                latest_block = to_block
+
+                # Widen the window again after a successful poll
+                block_range = min(block_range * 2, MAX_BLOCK_RANGE)
+                backoff = POLL_INTERVAL
+
+                if latest_block < current_block:
+                    continue  # Behind the head: catch up without sleeping
+
+            time.sleep(POLL_INTERVAL)
+
         except Exception as e:
-            print(f"Monitoring error: {e}")
-            time.sleep(30) # Wait before retry
+            # Large ranges are the usual cause (result limits, timeouts), so shrink the window
+            block_range = max(block_range // 2, MIN_BLOCK_RANGE)
+            print(f"Monitoring error: {e} (retrying in {backoff}s with {block_range}-block window)")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_ERROR_BACKOFF)
 
 if __name__ == "__main__":
-    monitor_events()
+    try:
+        monitor_events()
+    finally:
+        alerts.close()
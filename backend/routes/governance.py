@@ -8,15 +8,80 @@ Endpoints for interacting with the governance system:
 - Parameters
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
+from web3 import Web3
+
+from services import state_history
+from services.event_feed import TOPICS, parse_event_id
+from services.vote_relay import AlreadyRelayed
+from services.governance_stats import STATS_ID, format_stats
 
 router = APIRouter(prefix="/governance", tags=["governance"])
 
 
+# ============ Dependencies ============
+
+def get_db(request: Request):
+    """MongoDB database populated by the event indexer"""
+    return request.app.state.db
+
+
+def get_chain(request: Request):
+    """AsyncBlockchainService, or None when no RPC endpoint is configured"""
+    return request.app.state.chain
+
+
+def get_tally(request: Request):
+    """VoteTally kept current by the event indexer, or None when indexing is disabled"""
+    return request.app.state.tally
+
+
+def get_delegation(request: Request):
+    """DelegationGraph kept current by the event indexer, or None when indexing is disabled"""
+    graph = request.app.state.delegation
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Delegation graph unavailable")
+    return graph
+
+
+def get_feed(request: Request):
+    """EventFeed published to by the event indexer, or 503 when indexing is disabled"""
+    feed = request.app.state.feed
+    if feed is None:
+        raise HTTPException(status_code=503, detail="Event feed unavailable")
+    return feed
+
+
+async def require_indexed(request: Request, at_block: Optional[int] = None) -> Optional[int]:
+    """Validate an ``at_block`` query parameter against the indexer's progress and the versioned history"""
+    if at_block is None:
+        return None
+    indexer = request.app.state.indexer
+    last_block = indexer.last_block if indexer is not None else None
+    if at_block < 0 or (last_block is not None and at_block > last_block):
+        raise HTTPException(status_code=400, detail=f"Block {at_block} is not indexed (last indexed block {last_block})")
+    # Before the first versioned block, a missing version does not mean a missing record
+    first_block = await state_history.first_block(request.app.state.db)
+    if first_block is None:
+        raise HTTPException(status_code=400, detail="State history is not available")
+    if at_block < first_block:
+        raise HTTPException(status_code=400, detail=f"Block {at_block} predates the state history (first block {first_block})")
+    return at_block
+
+
+def checksum_address(address: str) -> str:
+    """Normalize an address to the checksummed form stored by the indexer"""
+    try:
+        return Web3.to_checksum_address(address)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid address: {address}")
+
+
 # ============ Models ============
 
 class ProposalType(str, Enum):
@@ -47,6 +112,20 @@ class ProposalCreate(BaseModel):
     voting_period: int = Field(default=50400, ge=1000, le=100000)
 
 
+class ProposalTally(BaseModel):
+    id: int
+    state: ProposalState
+    for_votes: str
+    against_votes: str
+    abstain_votes: str
+    total_votes: str
+    voters: int
+    quorum_required: str
+    quorum_reached: bool
+    passing: bool  # Quorum reached and more for than against votes
+    turnout: float  # Share of citizens who voted
+
+
 class ProposalResponse(BaseModel):
     id: int
     proposer: str
@@ -62,6 +141,7 @@ class ProposalResponse(BaseModel):
     abstain_votes: str
     created_at: datetime
     updated_at: datetime
+    tally: Optional[ProposalTally] = None
 
 
 class VoteCreate(BaseModel):
@@ -69,6 +149,38 @@ class VoteCreate(BaseModel):
     reason: Optional[str] = None
 
 
+class BatchVote(VoteCreate):
+    proposal_id: int
+    voter: str
+    # The voter's effective voting power, as signed
+    weight: int = Field(..., gt=0)
+    # EIP-712 signature by the voter of the Ballot in services.vote_relay.ballot
+    signature: str
+
+
+class BatchVoteRequest(BaseModel):
+    votes: List[BatchVote] = Field(..., min_length=1, max_length=1000)
+
+
+class BatchVoteResponse(BaseModel):
+    tracking_ids: List[str]
+
+
+class RelayStatus(BaseModel):
+    tracking_id: str
+    voter: Optional[str] = None
+    proposal_id: int
+    support: int
+    weight: int
+    reason: Optional[str]
+    status: str
+    transaction_hash: Optional[str]
+    block_number: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
 class VoteResponse(BaseModel):
     proposal_id: int
     voter: str
@@ -96,44 +208,138 @@ class UserRoles(BaseModel):
     is_guardian: bool
 
 
+class RoleQuery(BaseModel):
+    addresses: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class VotingPower(BaseModel):
+    address: str
+    block: Optional[int]
+    active: bool
+    voting_power: str
+    delegated_to: Optional[str]
+    delegators: List[str]
+    effective_power: str
+    in_cycle: bool
+
+
 # ============ Endpoints ============
 
+DEFAULT_GOVERNANCE_PARAMS = {
+    "voting_period": 50400,
+    "execution_delay": 172800,
+    "quorum_percentage": 1000,
+    "proposal_threshold": "100000000000000000000"
+}
+
+
 @router.get("/params", response_model=GovernanceParams)
-async def get_governance_parameters():
+async def get_governance_parameters(chain=Depends(get_chain)):
     """Get current governance parameters"""
-    # TODO: Integrate with blockchain service
-    return {
-        "voting_period": 50400,
-        "execution_delay": 172800,
-        "quorum_percentage": 1000,
-        "proposal_threshold": "100000000000000000000"
-    }
+    if chain is None:
+        return DEFAULT_GOVERNANCE_PARAMS
+
+    # Copy: the service may return a shared cached dict
+    params = dict(await chain.get_governance_params())
+    params["proposal_threshold"] = str(params["proposal_threshold"])
+    return params
+
+
+PROPOSAL_PROJECTION = {"_id": 0, **{field: 1 for field in ProposalResponse.model_fields if field != "tally"}}
+
+
+def _with_tallies(proposals: List[dict], tally) -> List[dict]:
+    """Attach the in-memory tally (quorum, turnout) to proposal documents"""
+    if tally is not None and proposals:
+        tallies = {t["id"]: t for t in tally.tallies([p["id"] for p in proposals])}
+        for proposal in proposals:
+            proposal["tally"] = tallies.get(proposal["id"])
+    return proposals
 
 
 @router.get("/proposals", response_model=List[ProposalResponse])
 async def list_proposals(
+    response: Response,
     state: Optional[ProposalState] = None,
     proposer: Optional[str] = None,
+    cursor: Optional[int] = None,
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    db=Depends(get_db),
+    tally=Depends(get_tally)
 ):
     """
-    List all proposals with optional filtering
+    List all proposals with optional filtering, newest first
     
     - **state**: Filter by proposal state
     - **proposer**: Filter by proposer address
+    - **cursor**: Only return proposals with an ID lower than this (keyset pagination)
     - **skip**: Number of proposals to skip
     - **limit**: Maximum number of proposals to return
+    
+    The ``X-Next-Cursor`` response header holds the cursor for the next page.
+    Prefer it over ``skip``, whose cost grows with the offset.
     """
-    # TODO: Integrate with database and blockchain
-    return []
+    query = {}
+    if state:
+        query["state"] = state.value
+    if proposer:
+        query["proposer"] = checksum_address(proposer)
+    if cursor is not None:
+        query["id"] = {"$lt": cursor}
+
+    limit = max(1, min(limit, 100))
+    proposals = await db.proposals.find(query, PROPOSAL_PROJECTION) \
+        .sort("id", -1).skip(skip).limit(limit).to_list(limit)
+
+    if len(proposals) == limit:
+        response.headers["X-Next-Cursor"] = str(proposals[-1]["id"])
+    return _with_tallies(proposals, tally)
 
 
 @router.get("/proposals/{proposal_id}", response_model=ProposalResponse)
-async def get_proposal(proposal_id: int):
-    """Get detailed information about a specific proposal"""
-    # TODO: Integrate with blockchain service
-    raise HTTPException(status_code=404, detail="Proposal not found")
+async def get_proposal(
+    proposal_id: int,
+    at_block: Optional[int] = Depends(require_indexed),
+    db=Depends(get_db),
+    tally=Depends(get_tally)
+):
+    """
+    Get detailed information about a specific proposal
+
+    - **at_block**: Return the proposal as it was at the end of this block
+    """
+    if at_block is not None:
+        proposal = await state_history.state_at(db, state_history.PROPOSAL, proposal_id, at_block)
+        if proposal is None:
+            raise HTTPException(status_code=404, detail=f"Proposal not found at block {at_block}")
+        return proposal
+
+    proposal = await db.proposals.find_one({"id": proposal_id}, PROPOSAL_PROJECTION)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return _with_tallies([proposal], tally)[0]
+
+
+@router.get("/tallies", response_model=List[ProposalTally])
+async def list_tallies(
+    state: Optional[ProposalState] = None,
+    ids: Optional[str] = None,
+    tally=Depends(get_tally)
+):
+    """
+    Live vote tallies with quorum status, computed from indexed votes
+
+    - **state**: Only return proposals in this state, e.g. ACTIVE
+    - **ids**: Comma-separated proposal IDs
+    """
+    if tally is None:
+        raise HTTPException(status_code=503, detail="Vote tallies unavailable")
+    try:
+        proposal_ids = [int(pid) for pid in ids.split(",") if pid.strip()] if ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid proposal IDs: {ids}")
+    return tally.tallies(proposal_ids, state.value if state else None)
 
 
 @router.post("/proposals", response_model=ProposalResponse)
@@ -159,11 +365,62 @@ async def cast_vote(proposal_id: int, vote: VoteCreate):
     raise HTTPException(status_code=501, detail="Not implemented yet")
 
 
+@router.post("/votes/batch", response_model=BatchVoteResponse, status_code=202)
+async def relay_votes(batch: BatchVoteRequest, request: Request):
+    """
+    Relay many votes at once
+
+    Each vote carries its voter's EIP-712 signature of a Ballot (see
+    ``ballot`` in services/vote_relay.py) whose weight must be the voter's
+    effective voting power. Votes are queued for submission through
+    ``castVoteBySig`` by the relayer account, which credits the voter, and
+    the call returns immediately with one tracking ID per vote. Poll
+    ``/votes/relay/{tracking_id}`` for the final status. A voter who already
+    has a relayed vote on the proposal is refused with 409.
+    """
+    relay = request.app.state.vote_relay
+    if relay is None:
+        raise HTTPException(status_code=503, detail="Vote relay not configured")
+    graph = get_delegation(request)
+
+    votes = []
+    for vote in batch.votes:
+        try:
+            voter = await relay.verify(vote.voter, vote.proposal_id, vote.support, vote.weight, vote.signature)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        power = graph.effective_power(voter)
+        if vote.weight != power:
+            raise HTTPException(status_code=400, detail=f"{voter} signed weight {vote.weight}, voting power is {power}")
+        votes.append({**vote.model_dump(), "voter": voter})
+
+    try:
+        tracking_ids = await relay.submit(votes)
+    except AlreadyRelayed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"tracking_ids": tracking_ids}
+
+
+@router.get("/votes/relay/{tracking_id}", response_model=RelayStatus)
+async def get_relay_status(tracking_id: str, db=Depends(get_db)):
+    """Get the status of a relayed vote (queued, submitted, confirmed, reverted, failed, dropped)"""
+    job = await db.vote_relay.find_one({"tracking_id": tracking_id}, {"_id": 0})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tracking ID not found")
+    return job
+
+
 @router.get("/proposals/{proposal_id}/votes", response_model=List[VoteResponse])
-async def get_proposal_votes(proposal_id: int):
+async def get_proposal_votes(
+    proposal_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db=Depends(get_db)
+):
     """Get all votes for a specific proposal"""
-    # TODO: Integrate with database
-    return []
+    cursor = db.votes.find({"proposal_id": proposal_id}, {"_id": 0}) \
+        .sort("block_number", 1).skip(skip).limit(min(limit, 1000))
+    return await cursor.to_list(None)
 
 
 @router.delete("/proposals/{proposal_id}")
@@ -177,60 +434,184 @@ async def cancel_proposal(proposal_id: int):
     raise HTTPException(status_code=501, detail="Not implemented yet")
 
 
-@router.get("/users/{address}/roles", response_model=UserRoles)
-async def get_user_roles(address: str):
-    """Get all roles for a specific address"""
-    # TODO: Integrate with blockchain service
+def _user_roles(address: str, roles: List[str]) -> dict:
     return {
         "address": address,
-        "roles": [],
-        "is_citizen": False,
-        "is_delegate": False,
-        "is_administrator": False,
-        "is_auditor": False,
-        "is_guardian": False
+        "roles": roles,
+        "is_citizen": "CITIZEN" in roles,
+        "is_delegate": "DELEGATE" in roles,
+        "is_administrator": "ADMINISTRATOR" in roles,
+        "is_auditor": "AUDITOR" in roles,
+        "is_guardian": "GUARDIAN" in roles
     }
 
 
+@router.get("/users/{address}/roles", response_model=UserRoles)
+async def get_user_roles(
+    address: str,
+    at_block: Optional[int] = Depends(require_indexed),
+    chain=Depends(get_chain),
+    db=Depends(get_db)
+):
+    """
+    Get all roles for a specific address
+
+    - **at_block**: Return the roles held at the end of this block, from indexed events
+    """
+    if at_block is not None:
+        address = checksum_address(address)
+        state = await state_history.state_at(db, state_history.ROLES, address, at_block)
+        return _user_roles(address, (state or {}).get("roles", []))
+
+    roles = []
+    if chain is not None:
+        address = checksum_address(address)
+        roles = await chain.get_user_roles(address)
+
+    return _user_roles(address, roles)
+
+
+@router.post("/users/roles", response_model=List[UserRoles])
+async def get_roles_for_users(query: RoleQuery, chain=Depends(get_chain)):
+    """
+    Get roles for many addresses at once
+
+    All role checks are aggregated into a single multicall, so dashboards
+    should prefer this over one request per address.
+    """
+    addresses = [checksum_address(address) for address in query.addresses]
+    matrix = await chain.get_roles_for_addresses(addresses) if chain is not None else {}
+    return [_user_roles(address, matrix.get(address, [])) for address in addresses]
+
+
+@router.get("/users/{address}/voting-power", response_model=VotingPower)
+async def get_voting_power(address: str, at_block: Optional[int] = None, graph=Depends(get_delegation)):
+    """
+    Effective voting power of an address, resolved from indexed delegations
+
+    - **at_block**: Resolve as of the end of this block instead of now
+    """
+    return graph.describe(checksum_address(address), at_block)
+
+
+@router.get("/delegation/cycles", response_model=List[List[str]])
+async def get_delegation_cycles(at_block: Optional[int] = None, graph=Depends(get_delegation)):
+    """Delegation cycles; the power of their members reaches no voter"""
+    return graph.cycles(at_block)
+
+
 @router.get("/users/{address}/proposals", response_model=List[ProposalResponse])
-async def get_user_proposals(address: str):
+async def get_user_proposals(address: str, db=Depends(get_db)):
     """Get all proposals created by a specific address"""
-    # TODO: Integrate with database
-    return []
+    cursor = db.proposals.find({"proposer": checksum_address(address)}, PROPOSAL_PROJECTION).sort("id", -1)
+    return await cursor.to_list(1000)
 
 
 @router.get("/users/{address}/votes", response_model=List[VoteResponse])
-async def get_user_votes(address: str):
+async def get_user_votes(address: str, db=Depends(get_db)):
     """Get all votes cast by a specific address"""
-    # TODO: Integrate with database
-    return []
+    cursor = db.votes.find({"voter": checksum_address(address)}, {"_id": 0}).sort("block_number", -1)
+    return await cursor.to_list(1000)
 
 
 @router.get("/stats")
-async def get_governance_stats():
-    """Get governance statistics"""
-    return {
-        "total_proposals": 0,
-        "active_proposals": 0,
-        "total_votes": 0,
-        "total_citizens": 0,
-        "total_delegates": 0,
-        "treasury_balance": "0"
-    }
+async def get_governance_stats(at_block: Optional[int] = Depends(require_indexed), db=Depends(get_db)):
+    """
+    Get governance statistics, maintained incrementally by the event indexer
+
+    - **at_block**: Return the statistics as of the end of this block
+    """
+    if at_block is not None:
+        return format_stats(await state_history.state_at(db, state_history.STATS, STATS_ID, at_block))
+    return format_stats(await db.governance_stats.find_one({"_id": STATS_ID}))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(request: Request):
+    """Hit/miss statistics of the contract read cache"""
+    return request.app.state.read_cache.stats()
+
+
+@router.get("/cache/responses")
+async def get_response_cache_stats(request: Request):
+    """Hit/miss and 304 statistics of the GET response cache"""
+    return request.app.state.response_cache.stats()
+
+
+@router.get("/rpc/stats")
+async def get_rpc_stats(request: Request):
+    """Latency, error rate and hedging counters of the RPC endpoint pool"""
+    chain = request.app.state.chain
+    if chain is None:
+        raise HTTPException(status_code=503, detail="Blockchain connection unavailable")
+    return chain.pool.stats()
 
 
 @router.get("/events")
 async def get_governance_events(
     event_type: Optional[str] = None,
     from_block: int = 0,
-    limit: int = 100
+    to_block: Optional[int] = None,
+    limit: int = 100,
+    db=Depends(get_db)
 ):
     """
     Get governance events from the blockchain
     
     - **event_type**: Filter by event type (ProposalCreated, VoteCast, etc.)
     - **from_block**: Starting block number
+    - **to_block**: Last block number (inclusive)
     - **limit**: Maximum number of events to return
     """
-    # TODO: Integrate with blockchain service event listener
-    return []
+    query = {"block_number": {"$gte": from_block}}
+    if to_block is not None:
+        query["block_number"]["$lte"] = to_block
+    if event_type:
+        query["event"] = event_type
+
+    cursor = db.events.find(query, {"_id": 0, "pending": 0}) \
+        .sort([("block_number", 1), ("log_index", 1)]).limit(min(limit, 1000))
+    return await cursor.to_list(None)
+
+
+@router.get("/events/stream")
+async def stream_governance_events(
+    request: Request,
+    topics: Optional[str] = None,
+    proposal_ids: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    feed=Depends(get_feed)
+):
+    """
+    Live governance events as server-sent events
+
+    Each event's ``id`` is its chain position; reconnecting with the last one
+    (``Last-Event-ID`` header, sent by EventSource automatically, or the
+    ``last_event_id`` parameter) first replays everything missed.
+
+    - **topics**: Comma-separated event names (ProposalCreated, VoteCast, ProposalStateChanged, Withdrawal)
+    - **proposal_ids**: Comma-separated proposal IDs to follow
+    - **last_event_id**: Resume after this event
+    """
+    names = [name.strip() for name in topics.split(",") if name.strip()] if topics else None
+    unknown = sorted(set(names or ()) - TOPICS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    try:
+        ids = [int(value) for value in proposal_ids.split(",") if value.strip()] if proposal_ids else None
+        resume = last_event_id or request.headers.get("last-event-id")
+        after = parse_event_id(resume) if resume else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid proposal ID or event ID")
+
+    return StreamingResponse(
+        feed.stream(names, ids, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/events/stream/stats")
+async def get_event_stream_stats(feed=Depends(get_feed)):
+    """Connected event stream subscribers and their buffers"""
+    return feed.stats()
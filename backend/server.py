@@ -1,14 +1,23 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Literal, Optional
 import uuid
 from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+from services import metrics, state_history, status_checks
+from services.metrics import MetricsMiddleware, MongoCommandListener
+from services.read_cache import CacheInvalidator, ReadThroughCache
+from services.response_cache import ResponseCache, ResponseCacheMiddleware
 
 
 ROOT_DIR = Path(__file__).parent
@@ -16,11 +25,28 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI(title="Government-Grade DAO Platform API", version="1.0.0")
+app.state.db = db
+app.state.blockchain = None
+app.state.chain = None
+app.state.vote_relay = None
+app.state.read_cache = ReadThroughCache(
+    maxsize=int(os.environ.get('READ_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('READ_CACHE_TTL', '60')),
+    max_block_age=int(os.environ.get('READ_CACHE_MAX_BLOCKS', '100'))
+)
+app.state.indexer = None
+app.state.tally = None
+app.state.delegation = None
+app.state.feed = None
+app.state.response_cache = ResponseCache(
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', '1000')),
+    collection=db.response_cache if os.environ.get('RESPONSE_CACHE_SHARED', 'false').lower() == 'true' else None
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -55,28 +81,113 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
-    doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    
-    _ = await db.status_checks.insert_one(doc)
+    # Stored as a BSON date, so it can be range-indexed and sorted
+    _ = await db.status_checks.insert_one(status_obj.model_dump())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+async def get_status_checks(
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """
+    List status checks, oldest first
     
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    - **since** / **until**: Only return checks in ``[since, until)``
+    - **cursor**: Only return checks after this one (keyset pagination)
+    - **limit**: Maximum number of checks to return (default and maximum 1000 as JSON)
+    - **format**: ``ndjson`` streams one check per line, unbounded unless
+      ``limit`` is given
     
-    return status_checks
+    The ``X-Next-Cursor`` response header holds the cursor for the next JSON page.
+    """
+    try:
+        query = status_checks.build_query(since, until, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    find = status_checks.collection(db).find(query, status_checks.PROJECTION).sort(status_checks.SORT)
+    if format == "ndjson":
+        if limit is not None:
+            find = find.limit(max(1, limit))
+
+        async def lines():
+            async for doc in find.batch_size(1000):
+                yield StatusCheck.model_construct(**doc).model_dump_json() + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    limit = max(1, min(limit or 1000, 1000))
+    checks = await find.limit(limit).to_list(limit)
+    if len(checks) == limit:
+        response.headers["X-Next-Cursor"] = status_checks.encode_cursor(checks[-1])
+    return checks
+
+def _collect_state():
+    """Refresh the gauges mirroring the RPC pools, the indexer and the read cache"""
+    for client_name, service in (('api', app.state.chain), ('indexer', app.state.blockchain)):
+        if service is None:
+            continue
+        for endpoint in service.pool.stats()['endpoints']:
+            labels = {'client': client_name, 'url': endpoint['url']}
+            if endpoint['latency_ms'] is not None:
+                metrics.RPC_ENDPOINT_LATENCY.set(endpoint['latency_ms'] / 1000, **labels)
+            metrics.RPC_ENDPOINT_ERROR_RATE.set(endpoint['error_rate'], **labels)
+            metrics.RPC_ENDPOINT_AVAILABLE.set(int(endpoint['available']), **labels)
+    indexer = app.state.indexer
+    if indexer is not None:
+        for kind in ('last', 'head'):
+            block = getattr(indexer, f'{kind}_block')
+            if block is not None:
+                metrics.INDEXER_BLOCK.set(block, kind=kind)
+    cache = app.state.read_cache.stats()
+    for stat in ('size', 'hits', 'misses', 'invalidations', 'evictions'):
+        metrics.READ_CACHE.set(cache[stat], stat=stat)
+    responses = app.state.response_cache.stats()
+    for stat in ('size', 'hits', 'shared_hits', 'misses', 'not_modified', 'evictions'):
+        metrics.RESPONSE_CACHE.set(responses[stat], stat=stat)
+
+metrics.REGISTRY.add_collector(_collect_state)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
 
+def _indexed_block():
+    indexer = app.state.indexer
+    return indexer.last_block if indexer is not None else None
+
+# Answered from the chain head unless pinned to an indexed block with at_block
+LIVE_CHAIN_READS = re.compile(r'/api/governance/(params|users/[^/]+/roles)')
+
+def _reads_chain_head(scope):
+    if LIVE_CHAIN_READS.fullmatch(scope['path']) is None:
+        return False
+    return 'at_block' not in parse_qs(scope['query_string'].decode('latin-1'))
+
+# Governance reads only change with indexed blocks
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cache=app.state.response_cache,
+    version=_indexed_block,
+    prefixes=('/api/governance/',),
+    exclude=(
+        '/api/governance/events/stream',
+        '/api/governance/votes/relay/',
+        '/api/governance/cache/',
+        '/api/governance/rpc/',
+    ),
+    bypass=_reads_chain_head,
+    max_age=int(os.environ.get('RESPONSE_CACHE_MAX_AGE', '0'))
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -85,6 +196,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latency covers every other middleware
+app.add_middleware(
+    MetricsMiddleware,
+    server_timing=os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -92,6 +209,170 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _build_blockchain_service():
+    """Create the blockchain service from the environment, or None if not configured"""
+    from services.blockchain_service import BlockchainService
+
+    rpc_url = os.environ.get('RPC_URLS') or os.environ.get('RPC_URL')
+    governance_core = os.environ.get('GOVERNANCE_CORE_ADDRESS')
+    proposal_manager = os.environ.get('PROPOSAL_MANAGER_ADDRESS')
+    if not (rpc_url and governance_core and proposal_manager):
+        return None
+
+    return BlockchainService(
+        rpc_url=rpc_url,
+        governance_core_address=governance_core,
+        proposal_manager_address=proposal_manager,
+        private_key=os.environ.get('PRIVATE_KEY'),
+        cache=app.state.read_cache
+    )
+
+
+def _indexed_contracts(service):
+    """Contracts whose events are indexed, keyed by contract name"""
+    contracts = {
+        'GovernanceCore': service.governance_core,
+        'ProposalManager': service.proposal_manager,
+    }
+    optional = {
+        'TreasuryManager': 'TREASURY_MANAGER_ADDRESS',
+        'CitizenRegistry': 'CITIZEN_REGISTRY_ADDRESS',
+    }
+    for name, env_var in optional.items():
+        address = os.environ.get(env_var)
+        if not address:
+            continue
+        try:
+            contracts[name] = service.load_contract(name, address)
+        except FileNotFoundError as e:
+            logger.warning(f"Not indexing {name}: {e}")
+    return contracts
+
+
+@app.on_event("startup")
+async def create_indexes():
+    from services.event_indexer import ensure_indexes
+
+    try:
+        await ensure_indexes(db)
+        await status_checks.ensure_indexes(db)
+        await state_history.ensure_indexes(db)
+        await app.state.response_cache.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create MongoDB indexes: {e}")
+    try:
+        await status_checks.migrate_string_timestamps(db)
+    except Exception as e:
+        logger.warning(f"Could not migrate status check timestamps: {e}")
+
+@app.on_event("startup")
+async def connect_async_blockchain():
+    from services.async_blockchain_service import AsyncBlockchainService
+
+    rpc_url = os.environ.get('RPC_URLS') or os.environ.get('RPC_URL')
+    governance_core = os.environ.get('GOVERNANCE_CORE_ADDRESS')
+    proposal_manager = os.environ.get('PROPOSAL_MANAGER_ADDRESS')
+    if not (rpc_url and governance_core and proposal_manager):
+        return
+
+    try:
+        app.state.chain = await AsyncBlockchainService.create(
+            rpc_url=rpc_url,
+            governance_core_address=governance_core,
+            proposal_manager_address=proposal_manager,
+            private_key=os.environ.get('PRIVATE_KEY'),
+            pool_size=int(os.environ.get('RPC_POOL_SIZE', '100')),
+            cache=app.state.read_cache
+        )
+    except Exception as e:
+        logger.warning(f"Async blockchain service unavailable: {e}")
+        return
+
+    if app.state.chain.account is not None:
+        from services.vote_relay import VoteRelay
+
+        app.state.vote_relay = VoteRelay(
+            app.state.chain,
+            db,
+            batch_size=int(os.environ.get('VOTE_RELAY_BATCH_SIZE', '100'))
+        )
+        await app.state.vote_relay.start()
+
+@app.on_event("startup")
+async def start_event_indexer():
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import GovernanceStatsProjection
+    from services.delegation_graph import DelegationGraph
+    from services.event_feed import EventFeed
+    from services.vote_tally import VoteTally
+
+    try:
+        service = await asyncio.to_thread(_build_blockchain_service)
+    except Exception as e:
+        logger.warning(f"Blockchain service unavailable, indexer disabled: {e}")
+        return
+    if service is None:
+        logger.warning("Blockchain not configured, indexer disabled")
+        return
+
+    app.state.blockchain = service
+    if os.environ.get('INDEXER_ENABLED', 'true').lower() != 'true':
+        return
+
+    indexer = EventIndexer(
+        service,
+        db,
+        _indexed_contracts(service),
+        start_block=int(os.environ.get('INDEXER_START_BLOCK', '0')),
+        page_size=int(os.environ.get('INDEXER_PAGE_SIZE', '2000')),
+        poll_interval=float(os.environ.get('INDEXER_POLL_INTERVAL', '15')),
+        confirmations=int(os.environ.get('INDEXER_CONFIRMATIONS', '12')),
+        reorg_window=int(os.environ.get('INDEXER_REORG_WINDOW', '256'))
+    )
+    # Invalidate cached reads before other projections re-read the chain
+    indexer.projections.insert(0, CacheInvalidator(app.state.read_cache))
+    indexer.add_projection(app.state.response_cache)
+    # Versions the state of the previous block before the projections change it
+    history = state_history.StateHistory(db)
+    try:
+        await history.baseline(await indexer.get_checkpoint())
+    except Exception as e:
+        logger.warning(f"Could not version existing state: {e}")
+    indexer.projections.insert(1, history)
+    indexer.add_projection(GovernanceStatsProjection(
+        db,
+        reconcile_interval=float(os.environ.get('STATS_RECONCILE_INTERVAL', '3600'))
+    ))
+    # Loaded before the indexer starts, then kept current by it
+    tally = VoteTally(db, service)
+    try:
+        await tally.load()
+    except Exception as e:
+        logger.warning(f"Vote tallies unavailable: {e}")
+    else:
+        indexer.add_projection(tally)
+        app.state.tally = tally
+    delegation = DelegationGraph(db, transitive=os.environ.get('DELEGATION_TRANSITIVE', 'true').lower() == 'true')
+    try:
+        await delegation.load()
+    except Exception as e:
+        logger.warning(f"Delegation graph unavailable: {e}")
+    else:
+        indexer.add_projection(delegation)
+        app.state.delegation = delegation
+    feed = EventFeed(db, buffer_size=int(os.environ.get('FEED_BUFFER_SIZE', '256')))
+    indexer.add_projection(feed)
+    app.state.feed = feed
+    indexer.start()
+    app.state.indexer = indexer
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if app.state.indexer is not None:
+        await app.state.indexer.stop()
+    if app.state.vote_relay is not None:
+        await app.state.vote_relay.stop()
+    if app.state.chain is not None:
+        await app.state.chain.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,313 @@
+"""
+Asynchronous alert delivery
+
+Alerts are pushed onto an in-process queue and delivered by asyncio workers
+running in a background thread, so a slow or failing webhook never stalls
+the caller (e.g. the block scanning loop of monitoring_service). Each
+channel has its own worker, token-bucket rate limit and retry with
+exponential backoff. Alerts sharing a dedup key within the coalescing
+window are merged: the first is sent immediately, the rest are summarized
+in one follow-up message.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+
+def retry_after(value: Optional[str], default: float) -> float:
+    """
+    Seconds to wait from a ``Retry-After`` header
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+        default: Returned when the header is missing or malformed
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when is None:
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Simple token bucket rate limiter"""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Channel:
+    """Base class for a notification channel"""
+
+    name = 'channel'
+
+    def __init__(self, rate: float = 1.0, burst: int = 5):
+        self.limiter = TokenBucket(rate, burst)
+
+    def request(self, message: str) -> Dict:
+        """Keyword arguments for ``session.post``"""
+        raise NotImplementedError
+
+
+class SlackChannel(Channel):
+    """Slack incoming webhook (about one message per second)"""
+
+    name = 'slack'
+
+    def __init__(self, webhook_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.webhook_url = webhook_url
+
+    def request(self, message: str) -> Dict:
+        return {'url': self.webhook_url, 'json': {'text': message}}
+
+
+class TelegramChannel(Channel):
+    """Telegram Bot API sendMessage"""
+
+    name = 'telegram'
+
+    def __init__(self, bot_token: str, chat_id: str, api_url: str = 'https://api.telegram.org', **kwargs):
+        super().__init__(**kwargs)
+        # Basic sanitization for Chat ID if user accidentally pasted URL
+        chat_id = chat_id.strip()
+        if 't.me/' in chat_id:
+            chat_id = chat_id.split('/')[-1]
+        self.chat_id = chat_id
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+
+    def request(self, message: str) -> Dict:
+        return {'url': self.url, 'data': {'chat_id': self.chat_id, 'text': message}}
+
+
+class AlertDispatcher:
+    """Background, rate-limited and deduplicating alert delivery"""
+
+    def __init__(
+        self,
+        channels: List[Channel],
+        coalesce_window: float = 60,
+        max_retries: int = 5,
+        request_timeout: float = 10,
+        queue_size: int = 10000
+    ):
+        """
+        Args:
+            channels: Channels every alert is delivered to
+            coalesce_window: Seconds during which alerts with the same key are merged
+            max_retries: Delivery attempts per alert and channel
+            request_timeout: HTTP timeout per attempt in seconds
+            queue_size: Maximum queued deliveries per channel before alerts are dropped
+        """
+        self.channels = channels
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.queue_size = queue_size
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._queues: Dict[str, asyncio.Queue] = {}
+        # dedup key -> suppressed messages during the current window
+        self._windows: Dict[str, List[str]] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._workers: List[asyncio.Task] = []
+
+    @classmethod
+    def from_env(cls) -> "AlertDispatcher":
+        """Build the dispatcher from SLACK_* / TELEGRAM_* environment variables"""
+        channels: List[Channel] = []
+        if os.getenv('SLACK_WEBHOOK_URL'):
+            channels.append(SlackChannel(os.environ['SLACK_WEBHOOK_URL']))
+        if os.getenv('TELEGRAM_BOT_TOKEN') and os.getenv('TELEGRAM_CHAT_ID'):
+            channels.append(TelegramChannel(
+                os.environ['TELEGRAM_BOT_TOKEN'],
+                os.environ['TELEGRAM_CHAT_ID'],
+                api_url=os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+            ))
+        return cls(channels, coalesce_window=float(os.getenv('ALERT_COALESCE_WINDOW', '60')))
+
+    # ============ Lifecycle ============
+
+    def start(self) -> "AlertDispatcher":
+        """Start the delivery thread (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._setup())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _setup(self) -> None:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+        for channel in self.channels:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[channel.name] = queue
+            self._workers.append(asyncio.create_task(self._worker(channel, queue)))
+
+    def close(self, timeout: float = 10) -> None:
+        """Deliver what is queued (up to ``timeout`` seconds) and stop the thread"""
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop)
+        future.result(timeout + 5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    async def _shutdown(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues.values())), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._session.close()
+
+    # ============ Enqueueing ============
+
+    def send(self, message: str, dedup_key: Optional[str] = None) -> None:
+        """
+        Queue an alert for delivery; never blocks
+
+        Args:
+            message: Alert text
+            dedup_key: Alerts with the same key (e.g. "withdrawal:<recipient>")
+                within the coalescing window are merged into one follow-up
+        """
+        if not self.channels:
+            return
+        self.start()
+        self._loop.call_soon_threadsafe(self._accept, message, dedup_key)
+
+    def _accept(self, message: str, dedup_key: Optional[str]) -> None:
+        if dedup_key is None:
+            self._enqueue(message)
+            return
+
+        suppressed = self._windows.get(dedup_key)
+        if suppressed is not None:
+            suppressed.append(message)
+            self.coalesced += 1
+            return
+
+        self._windows[dedup_key] = []
+        self._enqueue(message)
+        self._loop.call_later(self.coalesce_window, self._flush_window, dedup_key)
+
+    def _flush_window(self, dedup_key: str) -> None:
+        suppressed = self._windows.pop(dedup_key, [])
+        if suppressed:
+            summary = suppressed[-1]
+            if len(suppressed) > 1:
+                summary += f"\n(+{len(suppressed) - 1} more similar alerts in the last {self.coalesce_window:.0f}s)"
+            self._enqueue(summary)
+
+    def _enqueue(self, message: str) -> None:
+        for queue in self._queues.values():
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    # ============ Delivery ============
+
+    async def _worker(self, channel: Channel, queue: asyncio.Queue) -> None:
+        while True:
+            message = await queue.get()
+            try:
+                await channel.limiter.acquire()
+                await self._deliver(channel, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # One bad delivery must not stop the channel
+                self.failed += 1
+                print(f"Failed to send {channel.name} alert: {e!r}")
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, channel: Channel, message: str) -> bool:
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self._session.post(**channel.request(message)) as response:
+                    if response.status < 300:
+                        self.sent += 1
+                        return True
+                    if response.status == 429:
+                        delay = retry_after(response.headers.get('Retry-After'), delay)
+                    elif response.status < 500:
+                        # Client errors (bad token, bad chat id) will not succeed on retry
+                        print(f"Failed to send {channel.name} alert: HTTP {response.status}")
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Failed to send {channel.name} alert (attempt {attempt}): {e}")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+        self.failed += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        """Delivery counters"""
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'queued': sum(queue.qsize() for queue in self._queues.values()),
+        }
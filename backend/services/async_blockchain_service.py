@@ -0,0 +1,421 @@
+"""
+Async Blockchain Service for Government-Grade DAO Platform
+
+AsyncWeb3 counterpart of ``BlockchainService`` for use inside FastAPI
+handlers. All RPC calls are awaited on a shared aiohttp connection pool, so
+concurrent requests overlap their network waits instead of blocking the
+uvicorn worker for a full round-trip each. Requests are spread over the
+configured endpoints by an AsyncRPCPool (services/rpc_pool.py).
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+
+import aiohttp
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.middleware import async_geth_poa_middleware
+
+from services.contracts import (
+    format_governance_params,
+    format_proposal,
+    format_vote_counts,
+    load_abi,
+)
+from services.multicall import MULTICALL3_ADDRESS, AsyncMulticallReader
+from services.nonce_manager import GasPriceCache, NonceManager
+from services.read_cache import ReadThroughCache
+from services.rpc_pool import AsyncPooledHTTPProvider, AsyncRPCPool
+
+
+class AsyncBlockchainService:
+    """Non-blocking service for interacting with governance smart contracts"""
+
+    def __init__(
+        self,
+        rpc_url: Union[str, List[str]],
+        governance_core_address: str,
+        proposal_manager_address: str,
+        private_key: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        pool_size: int = 100,
+        request_timeout: float = 30,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        cache: Optional[ReadThroughCache] = None
+    ):
+        """
+        Initialize async blockchain service
+
+        Use ``await AsyncBlockchainService.create(...)`` to also verify the
+        connection; the constructor itself performs no I/O.
+
+        Args:
+            rpc_url: Ethereum RPC endpoint, or several (list or comma-separated)
+            governance_core_address: Address of GovernanceCore contract
+            proposal_manager_address: Address of ProposalManager contract
+            private_key: Private key for signing transactions (optional)
+            session: aiohttp session to share with other clients (optional)
+            pool_size: Maximum concurrent connections of the owned session
+            request_timeout: Per-request timeout in seconds
+            multicall_address: Multicall3 address, None to batch via JSON-RPC instead
+            cache: Read-through cache for parameter and proposal reads (optional)
+        """
+        self.cache = cache
+        self.pool = AsyncRPCPool(rpc_url, session=session, pool_size=pool_size, timeout=request_timeout)
+        self.w3 = AsyncWeb3(AsyncPooledHTTPProvider(self.pool))
+
+        # Add PoA middleware for testnets
+        self.w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+
+        # Initialize contracts
+        self.governance_core = self.w3.eth.contract(
+            address=AsyncWeb3.to_checksum_address(governance_core_address),
+            abi=load_abi("GovernanceCore")
+        )
+
+        self.proposal_manager = self.w3.eth.contract(
+            address=AsyncWeb3.to_checksum_address(proposal_manager_address),
+            abi=load_abi("ProposalManager")
+        )
+
+        # Aggregated fan-out reads (role matrices, proposal lists)
+        self.reader = AsyncMulticallReader(
+            self.w3,
+            self.governance_core,
+            self.proposal_manager,
+            pool=self.pool,
+            multicall_address=multicall_address
+        )
+
+        # Set up account if private key provided
+        self.account = None
+        self.nonce_manager = None
+        if private_key:
+            self.account = Account.from_key(private_key)
+            self.nonce_manager = NonceManager(self.account.address)
+        self.gas_price_cache = GasPriceCache()
+        self._chain_id: Optional[int] = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncBlockchainService":
+        """Create the service and verify the RPC connection"""
+        service = cls(*args, **kwargs)
+        await service.connect()
+        return service
+
+    async def connect(self) -> None:
+        """Check connectivity"""
+        if not await self.w3.is_connected():
+            raise ConnectionError(f"Failed to connect to {self.w3.provider}")
+
+    async def close(self) -> None:
+        """Close the aiohttp session if this service created it"""
+        await self.pool.close()
+
+    async def _cached(self, key: tuple, loader):
+        """Serve a read from the cache when one is configured"""
+        if self.cache is None:
+            return await loader()
+        return await self.cache.aget_or_load(key, loader)
+
+    # ============ Governance Parameters ============
+
+    async def get_governance_params(self) -> Dict[str, Any]:
+        """Get current governance parameters"""
+        async def load():
+            params = await self.governance_core.functions.getGovernanceParams().call()
+            return format_governance_params(params)
+
+        return await self._cached(('GovernanceCore', 'getGovernanceParams'), load)
+
+    async def get_proposal_count(self) -> int:
+        """Get total number of proposals"""
+        return await self._cached(
+            ('GovernanceCore', 'getProposalCount'),
+            self.governance_core.functions.getProposalCount().call
+        )
+
+    # ============ Proposal Management ============
+
+    async def get_proposal(self, proposal_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Fetch proposal details from blockchain
+
+        Args:
+            proposal_id: ID of the proposal
+
+        Returns:
+            Proposal data dictionary or None if not found
+        """
+        async def load():
+            proposal = await self.proposal_manager.functions.getProposal(proposal_id).call()
+            return format_proposal(proposal)
+
+        try:
+            return await self._cached(('ProposalManager', 'getProposal', proposal_id), load)
+        except Exception as e:
+            print(f"Error fetching proposal {proposal_id}: {e}")
+            return None
+
+    async def get_vote_counts(self, proposal_id: int) -> Dict[str, str]:
+        """Get vote counts for a proposal"""
+        async def load():
+            votes = await self.proposal_manager.functions.getVoteCounts(proposal_id).call()
+            return format_vote_counts(votes)
+
+        try:
+            return await self._cached(('ProposalManager', 'getVoteCounts', proposal_id), load)
+        except Exception as e:
+            print(f"Error fetching vote counts: {e}")
+            return {'for_votes': '0', 'against_votes': '0', 'abstain_votes': '0'}
+
+    async def has_voted(self, proposal_id: int, voter_address: str) -> bool:
+        """Check if an address has voted on a proposal"""
+        try:
+            return await self.proposal_manager.functions.hasVotedOnProposal(
+                proposal_id,
+                AsyncWeb3.to_checksum_address(voter_address)
+            ).call()
+        except Exception as e:
+            print(f"Error checking vote status: {e}")
+            return False
+
+    async def get_proposals(self, proposal_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Fetch many proposals with a single aggregated call"""
+        return await self.reader.get_proposals(proposal_ids)
+
+    async def get_vote_counts_batch(self, proposal_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """Fetch vote counts of many proposals with a single aggregated call"""
+        return await self.reader.get_vote_counts(proposal_ids)
+
+    # ============ Role Management ============
+
+    async def has_role(self, role_name: str, address: str) -> bool:
+        """
+        Check if an address has a specific role
+
+        Args:
+            role_name: Name of role (CITIZEN, DELEGATE, ADMINISTRATOR, etc.)
+            address: Address to check
+
+        Returns:
+            True if address has the role
+        """
+        try:
+            # Role hashes are constants, resolved once by the reader
+            role_hash = (await self.reader.role_hashes())[role_name]
+
+            return await self.governance_core.functions.checkRole(
+                role_hash,
+                AsyncWeb3.to_checksum_address(address)
+            ).call()
+        except Exception as e:
+            print(f"Error checking role: {e}")
+            return False
+
+    async def get_user_roles(self, address: str) -> List[str]:
+        """Get all roles for an address (none if the roles cannot be read)"""
+        try:
+            roles = await self.get_roles_for_addresses([address])
+            return roles[AsyncWeb3.to_checksum_address(address)]
+        except Exception as e:
+            print(f"Error fetching roles: {e}")
+            return []
+
+    async def get_roles_for_addresses(self, addresses: List[str]) -> Dict[str, List[str]]:
+        """
+        Get the role matrix for many addresses in one aggregated call
+
+        Returns:
+            Mapping of checksummed address to list of role names
+        """
+        return await self.reader.get_roles(addresses)
+
+    # ============ Transaction Sending ============
+
+    async def _pending_nonce(self) -> int:
+        return await self.w3.eth.get_transaction_count(self.account.address, 'pending')
+
+    async def _gas_price(self) -> int:
+        return await self.w3.eth.gas_price
+
+    async def _build_and_sign(self, function, gas: int, nonce: int):
+        """Build and sign a contract call with an explicit nonce"""
+        if self._chain_id is None:
+            self._chain_id = await self.w3.eth.chain_id
+
+        txn = await function.build_transaction({
+            'from': self.account.address,
+            'chainId': self._chain_id,
+            'nonce': nonce,
+            'gas': gas,
+            'gasPrice': await self.gas_price_cache.aget(self._gas_price)
+        })
+        return self.w3.eth.account.sign_transaction(txn, self.account.key)
+
+    async def _send(self, function, gas: int) -> str:
+        """Sign and send one contract call using a locally reserved nonce"""
+        if not self.account:
+            raise ValueError("No account configured for signing transactions")
+
+        nonce = (await self.nonce_manager.areserve(self._pending_nonce))[0]
+        try:
+            signed_txn = await self._build_and_sign(function, gas, nonce)
+            tx_hash = await self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception:
+            # The reserved nonce may now be a gap; re-read it from chain
+            self.nonce_manager.resync()
+            raise
+        return self.w3.to_hex(tx_hash)
+
+    async def send_transactions(self, calls: List[tuple]) -> List[Optional[str]]:
+        """
+        Sign and submit several contract calls back to back
+
+        Nonces are reserved as one consecutive block and all signed
+        transactions go out in a single JSON-RPC batch without waiting for
+        any receipt.
+
+        Args:
+            calls: List of (contract function call, gas limit) tuples
+
+        Returns:
+            Transaction hashes in call order, None for rejected transactions
+        """
+        if not self.account:
+            raise ValueError("No account configured for signing transactions")
+        if not calls:
+            return []
+
+        nonces = await self.nonce_manager.areserve(self._pending_nonce, count=len(calls))
+        try:
+            signed = await asyncio.gather(*(
+                self._build_and_sign(function, gas, nonce)
+                for (function, gas), nonce in zip(calls, nonces)
+            ))
+            hashes = await self.pool.batch_request(
+                [('eth_sendRawTransaction', [self.w3.to_hex(tx.rawTransaction)]) for tx in signed],
+                allow_errors=True
+            )
+        except Exception:
+            self.nonce_manager.resync()
+            raise
+
+        if any(tx_hash is None for tx_hash in hashes):
+            print(f"{hashes.count(None)} of {len(hashes)} transactions rejected, resyncing nonce")
+            self.nonce_manager.resync()
+        return hashes
+
+    async def create_proposal(
+        self,
+        proposal_type: int,
+        metadata_hash: str,
+        voting_period: int = 50400
+    ) -> Optional[str]:
+        """
+        Create a new proposal on-chain
+
+        Args:
+            proposal_type: Type of proposal (0-5)
+            metadata_hash: IPFS hash of proposal details
+            voting_period: Voting period in blocks
+
+        Returns:
+            Transaction hash or None if failed
+        """
+        if not self.account:
+            raise ValueError("No account configured for signing transactions")
+
+        try:
+            return await self._send(
+                self.proposal_manager.functions.createProposal(proposal_type, metadata_hash, voting_period),
+                gas=500000
+            )
+        except Exception as e:
+            print(f"Error creating proposal: {e}")
+            return None
+
+    async def cast_vote(
+        self,
+        proposal_id: int,
+        support: int,
+        weight: int = 1
+    ) -> Optional[str]:
+        """
+        Cast a vote on a proposal
+
+        Args:
+            proposal_id: ID of proposal
+            support: 0=against, 1=for, 2=abstain
+            weight: Vote weight
+
+        Returns:
+            Transaction hash or None if failed
+        """
+        if not self.account:
+            raise ValueError("No account configured for signing transactions")
+
+        try:
+            return await self._send(
+                self.proposal_manager.functions.castVote(proposal_id, support, weight),
+                gas=200000
+            )
+        except Exception as e:
+            print(f"Error casting vote: {e}")
+            return None
+
+    async def cast_votes(self, votes: List[tuple]) -> List[Optional[str]]:
+        """
+        Relay several votes without waiting for receipts
+
+        Args:
+            votes: List of (proposal_id, support, weight) tuples
+
+        Returns:
+            Transaction hashes in vote order, None for rejected votes
+        """
+        return await self.send_transactions([
+            (self.proposal_manager.functions.castVote(proposal_id, support, weight), 200000)
+            for proposal_id, support, weight in votes
+        ])
+
+    async def cast_votes_by_sig(self, votes: List[tuple]) -> List[Optional[str]]:
+        """
+        Relay votes signed by their voters without waiting for receipts
+
+        The contract credits each vote to its signer, not to this account.
+
+        Args:
+            votes: List of (proposal_id, support, weight, voter, signature)
+                tuples, the signature being the voter's EIP-712 Ballot signature
+
+        Returns:
+            Transaction hashes in vote order, None for rejected votes
+        """
+        return await self.send_transactions([
+            (self.proposal_manager.functions.castVoteBySig(
+                proposal_id, support, weight, voter, self.w3.to_bytes(hexstr=signature)
+            ), 200000)
+            for proposal_id, support, weight, voter, signature in votes
+        ])
+
+    # ============ Utilities ============
+
+    def observe_head(self, block_number: int) -> None:
+        """Record a block seen on chain; a newer one expires the cached gas price"""
+        self.gas_price_cache.observe_head(block_number)
+
+    async def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict]:
+        """Get transaction receipt"""
+        try:
+            receipt = await self.w3.eth.get_transaction_receipt(tx_hash)
+            self.observe_head(receipt['blockNumber'])
+            return {
+                'status': receipt['status'],
+                'block_number': receipt['blockNumber'],
+                'gas_used': receipt['gasUsed'],
+                'transaction_hash': receipt['transactionHash'].hex()
+            }
+        except Exception as e:
+            print(f"Error getting receipt: {e}")
+            return None
@@ -0,0 +1,119 @@
+"""
+Block header cache
+
+Events that share a block share a timestamp. The cache keeps a bounded LRU
+of block headers and resolves every missing block of an event page with a
+single batched eth_getBlockByNumber request.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable
+
+from services.rpc_batch import batch_request
+
+
+class BlockHeaderCache:
+    """Size-limited LRU cache of block headers"""
+
+    def __init__(self, w3, maxsize: int = 10000):
+        """
+        Args:
+            w3: Web3 instance used to fetch missing headers
+            maxsize: Maximum number of headers kept in memory
+        """
+        self.w3 = w3
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._headers: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_headers(self, block_numbers: Iterable[int], refresh: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Get headers for several blocks
+
+        Args:
+            block_numbers: Block numbers, duplicates are allowed
+            refresh: Bypass cached headers, e.g. to compare hashes with the canonical chain
+
+        Returns:
+            Mapping of block number to header with ``number``, ``hash``,
+            ``parent_hash`` and ``timestamp``
+        """
+        wanted = set(block_numbers)
+        found: Dict[int, Dict[str, Any]] = {}
+
+        if not refresh:
+            with self._lock:
+                for number in wanted:
+                    header = self._headers.get(number)
+                    if header is not None:
+                        self._headers.move_to_end(number)
+                        found[number] = header
+                self.hits += len(found)
+                self.misses += len(wanted) - len(found)
+
+        missing = sorted(wanted - found.keys())
+        if missing:
+            blocks = batch_request(
+                self.w3,
+                [('eth_getBlockByNumber', [hex(number), False]) for number in missing]
+            )
+            fetched = {}
+            for number, block in zip(missing, blocks):
+                if block is None:
+                    continue
+                fetched[number] = {
+                    'number': number,
+                    'hash': block['hash'],
+                    'parent_hash': block['parentHash'],
+                    'timestamp': int(block['timestamp'], 16),
+                }
+            self.put_many(fetched.values())
+            found.update(fetched)
+
+        return found
+
+    def get_hashes(self, block_numbers: Iterable[int]) -> Dict[int, str]:
+        """Canonical hashes of several blocks, always fetched from the node"""
+        return {number: header['hash'] for number, header in self.get_headers(block_numbers, refresh=True).items()}
+
+    def get_timestamps(self, block_numbers: Iterable[int]) -> Dict[int, int]:
+        """Get timestamps for several blocks with at most one batched request"""
+        return {number: header['timestamp'] for number, header in self.get_headers(block_numbers).items()}
+
+    def get_timestamp(self, block_number: int) -> int:
+        """Get the timestamp of a single block"""
+        return self.get_timestamps([block_number])[block_number]
+
+    def put_many(self, headers: Iterable[Dict[str, Any]]) -> None:
+        """Insert headers obtained elsewhere (e.g. from a new-head poll)"""
+        with self._lock:
+            for header in headers:
+                self._headers[header['number']] = header
+                self._headers.move_to_end(header['number'])
+            while len(self._headers) > self.maxsize:
+                self._headers.popitem(last=False)
+
+    def invalidate_from(self, block_number: int) -> None:
+        """Drop headers of ``block_number`` and later, e.g. after a reorg"""
+        with self._lock:
+            for number in [n for n in self._headers if n >= block_number]:
+                del self._headers[number]
+
+    def clear(self) -> None:
+        """Drop all cached headers"""
+        with self._lock:
+            self._headers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._headers),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -11,34 +11,56 @@ This service handles all interactions with the Ethereum blockchain:
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from eth_account import Account
-import json
+from eth_utils import event_abi_to_log_topic
 import os
-from typing import Dict, Any, Optional, List
-from pathlib import Path
+from typing import Dict, Any, Optional, List, Union
 import asyncio
 from datetime import datetime
 
+from services.block_cache import BlockHeaderCache
+from services.multicall import MULTICALL3_ADDRESS, MulticallReader
+from services.nonce_manager import GasPriceCache, NonceManager
+from services.read_cache import ReadThroughCache
+from services.rpc_batch import batch_request
+from services.reorg import DEFAULT_CONFIRMATIONS
+from services.rpc_pool import PooledHTTPProvider, RPCPool
+from services.contracts import (
+    format_governance_params,
+    format_proposal,
+    format_vote_counts,
+    load_abi,
+)
+
 
 class BlockchainService:
     """Service for interacting with governance smart contracts"""
     
     def __init__(
         self,
-        rpc_url: str,
+        rpc_url: Union[str, List[str]],
         governance_core_address: str,
         proposal_manager_address: str,
-        private_key: Optional[str] = None
+        private_key: Optional[str] = None,
+        block_cache_size: int = 10000,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        cache: Optional[ReadThroughCache] = None
     ):
         """
         Initialize blockchain service
         
         Args:
-            rpc_url: Ethereum RPC endpoint
+            rpc_url: Ethereum RPC endpoint, or several (list or comma-separated)
+                served through a health-scored RPCPool
             governance_core_address: Address of GovernanceCore contract
             proposal_manager_address: Address of ProposalManager contract
             private_key: Private key for signing transactions (optional)
+            block_cache_size: Number of block headers kept in the LRU cache
+            multicall_address: Multicall3 address, None to batch via JSON-RPC instead
+            cache: Read-through cache for parameter and proposal reads (optional)
         """
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.cache = cache
+        self.pool = RPCPool(rpc_url)
+        self.w3 = Web3(PooledHTTPProvider(self.pool))
         
         # Add PoA middleware for testnets
         self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -47,6 +69,9 @@ class BlockchainService:
         if not self.w3.is_connected():
             raise ConnectionError(f"Failed to connect to {rpc_url}")
         
+        # Shared by event listeners and the indexer to resolve timestamps
+        self.block_cache = BlockHeaderCache(self.w3, maxsize=block_cache_size)
+        
         # Load contract ABIs
         self.governance_core_abi = self._load_abi("GovernanceCore")
         self.proposal_manager_abi = self._load_abi("ProposalManager")
@@ -62,43 +87,64 @@ class BlockchainService:
             abi=self.proposal_manager_abi
         )
         
+        # Aggregated fan-out reads (role matrices, proposal lists)
+        self.reader = MulticallReader(
+            self.w3,
+            self.governance_core,
+            self.proposal_manager,
+            multicall_address=multicall_address
+        )
+        
         # Set up account if private key provided
         self.account = None
+        self.nonce_manager = None
         if private_key:
             self.account = Account.from_key(private_key)
+            self.nonce_manager = NonceManager(self.account.address)
+        self.gas_price_cache = GasPriceCache()
+        self._chain_id: Optional[int] = None
     
     def _load_abi(self, contract_name: str) -> List[Dict]:
         """Load contract ABI from artifacts"""
-        # Try multiple possible paths
-        possible_paths = [
-            Path(f"../contracts/artifacts/contracts/governance/{contract_name}.sol/{contract_name}.json"),
-            Path(f"./contracts/abi/{contract_name}.json"),
-            Path(f"./abi/{contract_name}.json"),
-        ]
-        
-        for path in possible_paths:
-            if path.exists():
-                with open(path, 'r') as f:
-                    artifact = json.load(f)
-                    return artifact.get('abi', artifact)
+        return load_abi(contract_name)
+    
+    def load_contract(self, contract_name: str, address: str):
+        """
+        Build a contract object for any deployed platform contract
         
-        raise FileNotFoundError(f"ABI for {contract_name} not found")
+        Args:
+            contract_name: Artifact name (e.g. "TreasuryManager")
+            address: Deployed address of the contract
+            
+        Returns:
+            web3 Contract instance bound to this service's provider
+        """
+        return self.w3.eth.contract(
+            address=Web3.to_checksum_address(address),
+            abi=self._load_abi(contract_name)
+        )
+    
+    def _cached(self, key: tuple, loader):
+        """Serve a read from the cache when one is configured"""
+        if self.cache is None:
+            return loader()
+        return self.cache.get_or_load(key, loader)
     
     # ============ Governance Parameters ============
     
     def get_governance_params(self) -> Dict[str, Any]:
         """Get current governance parameters"""
-        params = self.governance_core.functions.getGovernanceParams().call()
-        return {
-            'voting_period': params[0],
-            'execution_delay': params[1],
-            'quorum_percentage': params[2],
-            'proposal_threshold': params[3]
-        }
+        return self._cached(
+            ('GovernanceCore', 'getGovernanceParams'),
+            lambda: format_governance_params(self.governance_core.functions.getGovernanceParams().call())
+        )
     
     def get_proposal_count(self) -> int:
         """Get total number of proposals"""
-        return self.governance_core.functions.getProposalCount().call()
+        return self._cached(
+            ('GovernanceCore', 'getProposalCount'),
+            self.governance_core.functions.getProposalCount().call
+        )
     
     # ============ Proposal Management ============
     
@@ -113,22 +159,10 @@ class BlockchainService:
             Proposal data dictionary or None if not found
         """
         try:
-            proposal = self.proposal_manager.functions.getProposal(proposal_id).call()
-            
-            return {
-                'id': proposal[0],
-                'proposer': proposal[1],
-                'proposal_type': proposal[2],
-                'state': proposal[3],
-                'start_block': proposal[4],
-                'end_block': proposal[5],
-                'execution_time': proposal[6],
-                'metadata_hash': proposal[7],
-                'for_votes': str(proposal[8]),
-                'against_votes': str(proposal[9]),
-                'abstain_votes': str(proposal[10]),
-                'created_at': proposal[11]
-            }
+            return self._cached(
+                ('ProposalManager', 'getProposal', proposal_id),
+                lambda: format_proposal(self.proposal_manager.functions.getProposal(proposal_id).call())
+            )
         except Exception as e:
             print(f"Error fetching proposal {proposal_id}: {e}")
             return None
@@ -136,12 +170,10 @@ class BlockchainService:
     def get_vote_counts(self, proposal_id: int) -> Dict[str, str]:
         """Get vote counts for a proposal"""
         try:
-            votes = self.proposal_manager.functions.getVoteCounts(proposal_id).call()
-            return {
-                'for_votes': str(votes[0]),
-                'against_votes': str(votes[1]),
-                'abstain_votes': str(votes[2])
-            }
+            return self._cached(
+                ('ProposalManager', 'getVoteCounts', proposal_id),
+                lambda: format_vote_counts(self.proposal_manager.functions.getVoteCounts(proposal_id).call())
+            )
         except Exception as e:
             print(f"Error fetching vote counts: {e}")
             return {'for_votes': '0', 'against_votes': '0', 'abstain_votes': '0'}
@@ -157,6 +189,14 @@ class BlockchainService:
             print(f"Error checking vote status: {e}")
             return False
     
+    def get_proposals(self, proposal_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Fetch many proposals with a single aggregated call"""
+        return self.reader.get_proposals(proposal_ids)
+    
+    def get_vote_counts_batch(self, proposal_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """Fetch vote counts of many proposals with a single aggregated call"""
+        return self.reader.get_vote_counts(proposal_ids)
+    
     # ============ Role Management ============
     
     def has_role(self, role_name: str, address: str) -> bool:
@@ -171,8 +211,8 @@ class BlockchainService:
             True if address has the role
         """
         try:
-            # Get role hash
-            role_hash = getattr(self.governance_core.functions, f"{role_name}_ROLE")().call()
+            # Role hashes are constants, resolved once by the reader
+            role_hash = self.reader.role_hashes()[role_name]
             
             return self.governance_core.functions.checkRole(
                 role_hash,
@@ -183,18 +223,98 @@ class BlockchainService:
             return False
     
     def get_user_roles(self, address: str) -> List[str]:
-        """Get all roles for an address"""
-        roles = []
-        role_names = ['CITIZEN', 'DELEGATE', 'ADMINISTRATOR', 'AUDITOR', 'GUARDIAN']
+        """Get all roles for an address (none if the roles cannot be read)"""
+        try:
+            return self.get_roles_for_addresses([address])[Web3.to_checksum_address(address)]
+        except Exception as e:
+            print(f"Error fetching roles: {e}")
+            return []
+    
+    def get_roles_for_addresses(self, addresses: List[str]) -> Dict[str, List[str]]:
+        """
+        Get the role matrix for many addresses
         
-        for role_name in role_names:
-            if self.has_role(role_name, address):
-                roles.append(role_name)
+        All checkRole calls are aggregated, so this costs one round-trip per
+        ~100 addresses instead of ten per address.
         
-        return roles
+        Args:
+            addresses: Addresses to check
+            
+        Returns:
+            Mapping of checksummed address to list of role names
+        """
+        return self.reader.get_roles(addresses)
     
     # ============ Transaction Sending ============
     
+    def _pending_nonce(self) -> int:
+        return self.w3.eth.get_transaction_count(self.account.address, 'pending')
+    
+    def _build_and_sign(self, function, gas: int, nonce: int):
+        """Build and sign a contract call with an explicit nonce"""
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        
+        txn = function.build_transaction({
+            'from': self.account.address,
+            'chainId': self._chain_id,
+            'nonce': nonce,
+            'gas': gas,
+            'gasPrice': self.gas_price_cache.get(lambda: self.w3.eth.gas_price)
+        })
+        return self.w3.eth.account.sign_transaction(txn, self.account.key)
+    
+    def _send(self, function, gas: int) -> str:
+        """Sign and send one contract call using a locally reserved nonce"""
+        nonce = self.nonce_manager.reserve(self._pending_nonce)[0]
+        try:
+            signed_txn = self._build_and_sign(function, gas, nonce)
+            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception:
+            # The reserved nonce may now be a gap; re-read it from chain
+            self.nonce_manager.resync()
+            raise
+        return self.w3.to_hex(tx_hash)
+    
+    def send_transactions(self, calls: List[tuple]) -> List[Optional[str]]:
+        """
+        Sign and submit several contract calls back to back
+        
+        Nonces are reserved as one consecutive block and all signed
+        transactions go out in a single JSON-RPC batch of
+        eth_sendRawTransaction, without waiting for any receipt.
+        
+        Args:
+            calls: List of (contract function call, gas limit) tuples
+            
+        Returns:
+            Transaction hashes in call order, None for rejected transactions
+        """
+        if not self.account:
+            raise ValueError("No account configured for signing transactions")
+        if not calls:
+            return []
+        
+        nonces = self.nonce_manager.reserve(self._pending_nonce, count=len(calls))
+        try:
+            raw = [
+                self.w3.to_hex(self._build_and_sign(function, gas, nonce).rawTransaction)
+                for (function, gas), nonce in zip(calls, nonces)
+            ]
+            hashes = batch_request(
+                self.w3,
+                [('eth_sendRawTransaction', [tx]) for tx in raw],
+                allow_errors=True
+            )
+        except Exception:
+            self.nonce_manager.resync()
+            raise
+        
+        if any(tx_hash is None for tx_hash in hashes):
+            print(f"{hashes.count(None)} of {len(hashes)} transactions rejected, resyncing nonce")
+            self.nonce_manager.resync()
+        return hashes
+    
     def create_proposal(
         self,
         proposal_type: int,
@@ -216,26 +336,10 @@ class BlockchainService:
             raise ValueError("No account configured for signing transactions")
         
         try:
-            # Build transaction
-            nonce = self.w3.eth.get_transaction_count(self.account.address)
-            
-            txn = self.proposal_manager.functions.createProposal(
-                proposal_type,
-                metadata_hash,
-                voting_period
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': nonce,
-                'gas': 500000,
-                'gasPrice': self.w3.eth.gas_price
-            })
-            
-            # Sign and send
-            signed_txn = self.w3.eth.account.sign_transaction(txn, self.account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            return self.w3.to_hex(tx_hash)
-        
+            return self._send(
+                self.proposal_manager.functions.createProposal(proposal_type, metadata_hash, voting_period),
+                gas=500000
+            )
         except Exception as e:
             print(f"Error creating proposal: {e}")
             return None
@@ -261,43 +365,56 @@ class BlockchainService:
             raise ValueError("No account configured for signing transactions")
         
         try:
-            nonce = self.w3.eth.get_transaction_count(self.account.address)
-            
-            txn = self.proposal_manager.functions.castVote(
-                proposal_id,
-                support,
-                weight
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': nonce,
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price
-            })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(txn, self.account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            return self.w3.to_hex(tx_hash)
-        
+            return self._send(
+                self.proposal_manager.functions.castVote(proposal_id, support, weight),
+                gas=200000
+            )
         except Exception as e:
             print(f"Error casting vote: {e}")
             return None
     
+    def cast_votes(self, votes: List[tuple]) -> List[Optional[str]]:
+        """
+        Relay several votes without waiting for receipts
+        
+        Args:
+            votes: List of (proposal_id, support, weight) tuples
+            
+        Returns:
+            Transaction hashes in vote order, None for rejected votes
+        """
+        return self.send_transactions([
+            (self.proposal_manager.functions.castVote(proposal_id, support, weight), 200000)
+            for proposal_id, support, weight in votes
+        ])
+    
     # ============ Event Listening ============
     
     def listen_to_events(
         self,
         event_name: str,
         from_block: int = 0,
-        to_block: str = 'latest'
+        to_block: str = 'latest',
+        page_size: int = 2000,
+        confirmations: int = DEFAULT_CONFIRMATIONS
     ):
         """
         Listen to contract events
         
+        Logs are fetched with ``eth_getLogs`` over consecutive block ranges of
+        at most ``page_size`` blocks instead of a single filter from genesis,
+        so callers can stop iterating early without scanning the whole chain.
+        For anything beyond ad-hoc queries use the persistent
+        ``EventIndexer`` (services/event_indexer.py), which checkpoints its
+        progress in MongoDB and rolls back reorged blocks.
+        
         Args:
             event_name: Name of event to listen for
             from_block: Starting block number
             to_block: Ending block number or 'latest'
+            page_size: Maximum number of blocks per ``eth_getLogs`` request
+            confirmations: Blocks behind the head excluded when ``to_block`` is
+                'latest', so unconfirmed (reorgable) events are not yielded
             
         Yields:
             Event data dictionaries
@@ -311,36 +428,55 @@ class BlockchainService:
         else:
             raise ValueError(f"Event {event_name} not found in contracts")
         
-        # Create event filter
-        event_filter = getattr(contract.events, event_name).create_filter(
-            fromBlock=from_block,
-            toBlock=to_block
-        )
+        event = getattr(contract.events, event_name)()
+        topic = self.w3.to_hex(event_abi_to_log_topic(
+            next(item for item in contract.abi if item.get('type') == 'event' and item['name'] == event_name)
+        ))
+        if to_block == 'latest':
+            head = self.w3.eth.block_number
+            self.observe_head(head)
+            last_block = head - confirmations
+        else:
+            last_block = int(to_block)
         
-        # Get all events
-        for event in event_filter.get_all_entries():
-            yield {
-                'event': event_name,
-                'block_number': event['blockNumber'],
-                'transaction_hash': event['transactionHash'].hex(),
-                'args': dict(event['args']),
-                'timestamp': self._get_block_timestamp(event['blockNumber'])
-            }
+        start = from_block
+        while start <= last_block:
+            end = min(start + page_size - 1, last_block)
+            logs = self.w3.eth.get_logs({
+                'address': contract.address,
+                'topics': [topic],
+                'fromBlock': start,
+                'toBlock': end
+            })
+            timestamps = self.block_cache.get_timestamps(log['blockNumber'] for log in logs)
+            for log in map(event.process_log, logs):
+                yield {
+                    'event': event_name,
+                    'block_number': log['blockNumber'],
+                    'transaction_hash': log['transactionHash'].hex(),
+                    'args': dict(log['args']),
+                    'timestamp': timestamps.get(log['blockNumber'], 0)
+                }
+            start = end + 1
     
     def _get_block_timestamp(self, block_number: int) -> int:
         """Get timestamp for a block"""
         try:
-            block = self.w3.eth.get_block(block_number)
-            return block['timestamp']
-        except:
+            return self.block_cache.get_timestamp(block_number)
+        except Exception:
             return 0
     
     # ============ Utilities ============
+
+    def observe_head(self, block_number: int) -> None:
+        """Record a block seen on chain; a newer one expires the cached gas price"""
+        self.gas_price_cache.observe_head(block_number)
     
     def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict]:
         """Get transaction receipt"""
         try:
             receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            self.observe_head(receipt['blockNumber'])
             return {
                 'status': receipt['status'],
                 'block_number': receipt['blockNumber'],
@@ -366,7 +502,7 @@ class BlockchainService:
 if __name__ == "__main__":
     # Initialize service
     service = BlockchainService(
-        rpc_url=os.getenv("RPC_URL", "http://localhost:8545"),
+        rpc_url=os.getenv("RPC_URLS") or os.getenv("RPC_URL", "http://localhost:8545"),
         governance_core_address=os.getenv("GOVERNANCE_CORE_ADDRESS"),
         proposal_manager_address=os.getenv("PROPOSAL_MANAGER_ADDRESS"),
         private_key=os.getenv("PRIVATE_KEY")
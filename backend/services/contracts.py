@@ -0,0 +1,73 @@
+"""
+Contract helpers shared by the sync and async blockchain services
+
+ABI loading, role names and conversion of raw contract call results into
+the dictionaries returned by the services.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+ROLE_NAMES = ['CITIZEN', 'DELEGATE', 'ADMINISTRATOR', 'AUDITOR', 'GUARDIAN']
+
+
+def load_abi(contract_name: str) -> List[Dict]:
+    """Load contract ABI from artifacts"""
+    # Try multiple possible paths
+    possible_paths = [
+        Path(f"../contracts/artifacts/contracts/governance/{contract_name}.sol/{contract_name}.json"),
+        *Path("../contracts/artifacts/contracts").glob(f"*/{contract_name}.sol/{contract_name}.json"),
+        Path(f"./contracts/abi/{contract_name}.json"),
+        Path(f"./abi/{contract_name}.json"),
+    ]
+    # ABIs of a specific deployment (e.g. a local test chain) take precedence
+    if os.environ.get('ABI_DIR'):
+        possible_paths.insert(0, Path(os.environ['ABI_DIR']) / f"{contract_name}.json")
+    
+    for path in possible_paths:
+        if path.exists():
+            with open(path, 'r') as f:
+                artifact = json.load(f)
+                return artifact.get('abi', artifact)
+    
+    raise FileNotFoundError(f"ABI for {contract_name} not found")
+
+
+def format_governance_params(params) -> Dict[str, Any]:
+    """Convert a getGovernanceParams() result into a dictionary"""
+    return {
+        'voting_period': params[0],
+        'execution_delay': params[1],
+        'quorum_percentage': params[2],
+        'proposal_threshold': params[3]
+    }
+
+
+def format_proposal(proposal) -> Dict[str, Any]:
+    """Convert a getProposal() result into a dictionary"""
+    return {
+        'id': proposal[0],
+        'proposer': proposal[1],
+        'proposal_type': proposal[2],
+        'state': proposal[3],
+        'start_block': proposal[4],
+        'end_block': proposal[5],
+        'execution_time': proposal[6],
+        'metadata_hash': proposal[7],
+        'for_votes': str(proposal[8]),
+        'against_votes': str(proposal[9]),
+        'abstain_votes': str(proposal[10]),
+        'created_at': proposal[11]
+    }
+
+
+def format_vote_counts(votes) -> Dict[str, str]:
+    """Convert a getVoteCounts() result into a dictionary"""
+    return {
+        'for_votes': str(votes[0]),
+        'against_votes': str(votes[1]),
+        'abstain_votes': str(votes[2])
+    }
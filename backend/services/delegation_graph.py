@@ -0,0 +1,251 @@
+"""
+Delegation graph
+
+Resolves effective voting power from indexed CitizenRegistry events
+(CitizenRegistered, CitizenshipApproved/Revoked, VotingPowerUpdated,
+VotingPowerDelegated, DelegationRevoked) without chain reads. The graph is
+rebuilt from the ``events`` collection on startup and then updated by the
+event indexer.
+
+Every address keeps the history of its (delegate, voting power, active)
+state, so power can be resolved at any indexed block. The power carried by
+each address (its own plus everything delegated to it) is memoized and only
+invalidated along the delegation chain above a change, so current lookups
+during a vote burst are dictionary reads.
+
+Each address delegates to at most one other, so following delegations
+either ends at an address that votes itself or runs into a cycle. Power in
+a cycle reaches no voter; cycles are detected when they form and reported
+by ``cycles()``.
+"""
+
+import logging
+from bisect import bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = 'CitizenRegistry'
+
+
+class CitizenState(NamedTuple):
+    """State of one address from a given event onwards"""
+    position: Tuple[int, int]  # (block_number, log_index) of the event
+    delegate: Optional[str]
+    power: int
+    active: bool
+
+
+class DelegationGraph:
+    """In-memory delegation graph, maintained as an indexer projection"""
+
+    def __init__(self, db=None, transitive: bool = True):
+        """
+        Args:
+            db: Motor database with the indexed ``events`` collection
+            transitive: Pass delegated power on along delegation chains. If
+                False, power moves a single hop, as CitizenRegistry's
+                ``getEffectiveVotingPower`` computes it.
+        """
+        self.db = db
+        self.transitive = transitive
+        self._history: Dict[str, List[CitizenState]] = {}
+        # Everyone who ever delegated to an address, current or not
+        self._delegators: Dict[str, Set[str]] = {}
+        self._carried: Dict[str, int] = {}
+
+    async def load(self) -> None:
+        """Rebuild the graph from the indexed CitizenRegistry events"""
+        # Pending events are applied by the indexer when it resumes; events of
+        # an interrupted rollback stay until they are reverted
+        cursor = self.db.events.find({'contract': REGISTRY, 'pending': {'$ne': True}}, {'_id': 0}) \
+            .sort([('block_number', 1), ('log_index', 1)])
+        count = 0
+        async for event in cursor:
+            self.apply_event(event)
+            count += 1
+        logger.info(f"Loaded delegation graph of {len(self._history)} addresses from {count} events")
+
+    # ============ State ============
+
+    def state(self, address: str, block: Optional[int] = None) -> Optional[CitizenState]:
+        """State of an address, at the end of ``block`` if given"""
+        history = self._history.get(address)
+        if not history:
+            return None
+        if block is None:
+            return history[-1]
+        index = bisect_right(history, (block, float('inf')), key=lambda state: state.position)
+        return history[index - 1] if index else None
+
+    def _own(self, state: Optional[CitizenState]) -> int:
+        return state.power if state is not None and state.active else 0
+
+    # ============ Updates ============
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Apply a CitizenRegistry event in chain order"""
+        if event['contract'] != REGISTRY:
+            return
+        args = event['args']
+        name = event['event']
+        if name in ('VotingPowerDelegated', 'DelegationRevoked'):
+            address = args['from']
+        elif name in ('CitizenRegistered', 'CitizenshipApproved', 'CitizenshipRevoked', 'VotingPowerUpdated'):
+            address = args['wallet']
+        else:
+            return
+
+        current = self.state(address)
+        position = (event['block_number'], event['log_index'])
+        if current is not None and current.position >= position:
+            # Applied already before the indexer retried the page
+            return
+        delegate, power, active = current[1:] if current else (None, 0, False)
+        if name == 'CitizenRegistered':
+            power = int(args['votingPower'])
+        elif name == 'CitizenshipApproved':
+            active = True
+        elif name == 'CitizenshipRevoked':
+            # The contract revokes the delegation first and emits DelegationRevoked
+            active = False
+        elif name == 'VotingPowerUpdated':
+            power = int(args['newPower'])
+        elif name == 'VotingPowerDelegated':
+            delegate = args['to']
+            self._delegators.setdefault(delegate, set()).add(address)
+        else:
+            delegate = None
+
+        self._invalidate(address)
+        self._history.setdefault(address, []).append(
+            CitizenState(position, delegate, power, active)
+        )
+        self._invalidate(address)
+        if name == 'VotingPowerDelegated' and self._cycle_from(address):
+            logger.warning(f"Delegation cycle formed by {address} -> {delegate} in block {event['block_number']}")
+
+    def revert_event(self, event: Dict[str, Any]) -> None:
+        """Undo the latest applied event of an orphaned block"""
+        if event['contract'] != REGISTRY:
+            return
+        args = event['args']
+        address = args.get('from') or args.get('wallet')
+        history = self._history.get(address)
+        position = (event['block_number'], event['log_index'])
+        if not history or history[-1].position != position:
+            return
+        self._invalidate(address)
+        history.pop()
+        if not history:
+            del self._history[address]
+        self._invalidate(address)
+
+    def _invalidate(self, address: str) -> None:
+        """Drop the memoized power of an address and everything it delegates to"""
+        seen = set()
+        while address is not None and address not in seen:
+            seen.add(address)
+            self._carried.pop(address, None)
+            state = self.state(address)
+            address = state.delegate if state else None
+
+    # ============ Indexer projection ============
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Apply a single indexed event"""
+        self.apply_event(event)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Undo an event from an orphaned block"""
+        self.revert_event(event)
+
+    # ============ Queries ============
+
+    def delegators(self, address: str, block: Optional[int] = None) -> List[str]:
+        """Addresses delegating directly to ``address``"""
+        return sorted(
+            delegator for delegator in self._delegators.get(address, ())
+            if (state := self.state(delegator, block)) is not None and state.delegate == address
+        )
+
+    def _cycle_from(self, address: str, block: Optional[int] = None) -> Optional[List[str]]:
+        """The cycle reached by following delegations from ``address``, if any"""
+        path: List[str] = []
+        index: Dict[str, int] = {}
+        while address is not None:
+            if address in index:
+                return path[index[address]:]
+            index[address] = len(path)
+            path.append(address)
+            state = self.state(address, block)
+            address = state.delegate if state else None
+        return None
+
+    def cycles(self, block: Optional[int] = None) -> List[List[str]]:
+        """Every delegation cycle, each starting at its smallest address"""
+        found = {}
+        for address in self._history:
+            cycle = self._cycle_from(address, block)
+            if cycle:
+                start = cycle.index(min(cycle))
+                found[min(cycle)] = cycle[start:] + cycle[:start]
+        return [found[key] for key in sorted(found)]
+
+    def _carry(self, address: str, block: Optional[int], memo: Dict[str, int]) -> int:
+        """
+        Own power plus all power delegated to ``address``
+
+        Iterative post-order walk of the delegator tree; addresses in a
+        cycle are never reached from a voter.
+        """
+        stack = [(address, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in memo:
+                continue
+            children = self.delegators(node, block)
+            if expanded:
+                if self.transitive:
+                    delegated = sum(memo[child] for child in children)
+                else:
+                    delegated = sum(self._own(self.state(child, block)) for child in children)
+                memo[node] = self._own(self.state(node, block)) + delegated
+                continue
+            stack.append((node, True))
+            if self.transitive:
+                stack.extend((child, False) for child in children if child not in memo)
+        return memo[address]
+
+    def effective_power(self, address: str, block: Optional[int] = None) -> int:
+        """
+        Voting power ``address`` can vote with
+
+        Args:
+            address: Checksummed address
+            block: Resolve at the end of this block instead of now
+
+        Returns:
+            0 if the address delegates, otherwise its own power (when it is an
+            active citizen) plus the power delegated to it
+        """
+        state = self.state(address, block)
+        if state is not None and state.delegate is not None:
+            return 0
+        if block is not None:
+            return self._carry(address, block, {})
+        return self._carry(address, None, self._carried)
+
+    def describe(self, address: str, block: Optional[int] = None) -> Dict[str, Any]:
+        """API view of one address"""
+        state = self.state(address, block)
+        return {
+            'address': address,
+            'block': block,
+            'active': bool(state and state.active),
+            'voting_power': str(state.power if state else 0),
+            'delegated_to': state.delegate if state else None,
+            'delegators': self.delegators(address, block),
+            'effective_power': str(self.effective_power(address, block)),
+            'in_cycle': bool(state and state.delegate and address in (self._cycle_from(address, block) or ())),
+        }
@@ -0,0 +1,225 @@
+"""
+Live governance event feed
+
+Fans newly indexed events out to any number of subscribers (served as
+server-sent events by ``/governance/events/stream``), so clients stop
+polling the API.
+
+- Event IDs are the chain position ``<block>-<log index>``. A client
+  resuming with the last ID it saw is first replayed the missed events from
+  the ``events`` collection, then switched to the live feed.
+- Each subscriber has a bounded buffer. The indexer never waits for a slow
+  client: when its buffer overflows, the buffer is dropped and the client
+  catches up from the ``events`` collection, the same way as on resume.
+- Events of orphaned blocks are announced as ``reverted``.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+FEED_EVENTS = {
+    ('ProposalManager', 'ProposalCreated'),
+    ('ProposalManager', 'VoteCast'),
+    ('ProposalManager', 'ProposalStateChanged'),
+    ('TreasuryManager', 'Withdrawal'),
+}
+TOPICS = frozenset(name for _, name in FEED_EVENTS)
+
+Position = Tuple[int, int]
+
+
+def event_id(event: Dict[str, Any]) -> str:
+    return f"{event['block_number']}-{event['log_index']}"
+
+
+def parse_event_id(value: str) -> Position:
+    """
+    Raises:
+        ValueError: Not a ``<block>-<log index>`` ID
+    """
+    block, _, log_index = value.partition('-')
+    return int(block), int(log_index)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def format_sse(event: Dict[str, Any], reverted: bool = False) -> str:
+    """Server-sent event frame; reverted events carry no ID so resuming is unaffected"""
+    data = {key: value for key, value in event.items() if key != '_id'}
+    data['id'] = event_id(event)
+    body = json.dumps(data, default=_json_default, separators=(',', ':'))
+    if reverted:
+        return f"event: reverted\ndata: {body}\n\n"
+    return f"id: {data['id']}\nevent: {event['event']}\ndata: {body}\n\n"
+
+
+class Subscriber:
+    """One client's filters and bounded buffer"""
+
+    def __init__(self, topics: Set[str], proposal_ids: Optional[Set[int]], buffer_size: int):
+        self.topics = topics
+        self.proposal_ids = proposal_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.lagged = False
+        # Position just before the oldest event dropped on overflow
+        self.dropped_after: Optional[Position] = None
+        # Position of the last event sent to the client
+        self.last: Optional[Position] = None
+        # Sent events orphaned while lagging, announced on catch-up
+        self.reverted: List[Dict[str, Any]] = []
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if event['event'] not in self.topics:
+            return False
+        if self.proposal_ids is None:
+            return True
+        proposal_id = event['args'].get('proposalId')
+        return proposal_id is not None and int(proposal_id) in self.proposal_ids
+
+    def rewind(self, event: Dict[str, Any]) -> bool:
+        """Move ``last`` before an orphaned event the client was sent; False if it was not sent"""
+        position = (event['block_number'], event['log_index'])
+        if self.last is None or position > self.last:
+            return False
+        # A later catch-up resumes from before the orphaned event
+        self.last = (position[0], position[1] - 1)
+        return True
+
+    def offer(self, item: Tuple[Dict[str, Any], bool]) -> None:
+        """Queue an event without blocking; on overflow drop the buffer and catch up later"""
+        if self.lagged:
+            event, reverted = item
+            # The catch-up only replays new events, so keep the orphaning of sent ones
+            if reverted and self.rewind(event):
+                self.reverted.append(event)
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            oldest, _ = self.queue.get_nowait()
+            self.dropped_after = (oldest['block_number'], oldest['log_index'] - 1)
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+
+class EventFeed:
+    """Indexer projection broadcasting feed events to subscribers"""
+
+    def __init__(self, db, buffer_size: int = 256, keepalive: float = 15):
+        """
+        Args:
+            db: Motor database with the indexed ``events`` collection
+            buffer_size: Events buffered per subscriber before it has to catch up
+            keepalive: Seconds of silence after which a comment is sent
+        """
+        self.db = db
+        self.buffer_size = buffer_size
+        self.keepalive = keepalive
+        self.subscribers: Set[Subscriber] = set()
+
+    # ============ Indexer projection ============
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Broadcast a newly indexed event"""
+        self._publish(event, reverted=False)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Announce an event of an orphaned block"""
+        self._publish(event, reverted=True)
+
+    def _publish(self, event: Dict[str, Any], reverted: bool) -> None:
+        if (event['contract'], event['event']) not in FEED_EVENTS:
+            return
+        for subscriber in self.subscribers:
+            if subscriber.wants(event):
+                subscriber.offer((event, reverted))
+
+    # ============ Subscriptions ============
+
+    async def _replay(self, subscriber: Subscriber, after: Position) -> AsyncIterator[Dict[str, Any]]:
+        """Indexed events after a position matching the subscriber's filters"""
+        block, log_index = after
+        query: Dict[str, Any] = {
+            'event': {'$in': sorted(subscriber.topics)},
+            '$or': [
+                {'block_number': {'$gt': block}},
+                {'block_number': block, 'log_index': {'$gt': log_index}},
+            ],
+        }
+        if subscriber.proposal_ids is not None:
+            query['args.proposalId'] = {'$in': sorted(subscriber.proposal_ids)}
+        cursor = self.db.events.find(query, {'_id': 0, 'pending': 0}) \
+            .sort([('block_number', 1), ('log_index', 1)]).batch_size(self.buffer_size)
+        async for event in cursor:
+            if (event['contract'], event['event']) in FEED_EVENTS:
+                yield event
+
+    async def stream(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        proposal_ids: Optional[Iterable[int]] = None,
+        after: Optional[Position] = None
+    ) -> AsyncIterator[str]:
+        """
+        Server-sent event frames for one client
+
+        Args:
+            topics: Event names to receive; all feed events if None
+            proposal_ids: Only events of these proposals if given
+            after: Position of the last event the client saw, to resume from
+        """
+        subscriber = Subscriber(
+            set(topics) if topics else set(TOPICS),
+            set(proposal_ids) if proposal_ids is not None else None,
+            self.buffer_size
+        )
+        # Subscribe before replaying, so nothing indexed in between is missed
+        self.subscribers.add(subscriber)
+        subscriber.last = after
+        try:
+            while True:
+                if after is not None or subscriber.lagged:
+                    start = after if after is not None else subscriber.last or subscriber.dropped_after
+                    after = None
+                    subscriber.lagged = False
+                    while subscriber.reverted:
+                        yield format_sse(subscriber.reverted.pop(0), reverted=True)
+                    async for event in self._replay(subscriber, start):
+                        subscriber.last = (event['block_number'], event['log_index'])
+                        yield format_sse(event)
+
+                try:
+                    event, reverted = await asyncio.wait_for(subscriber.queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                position = (event['block_number'], event['log_index'])
+                if reverted:
+                    yield format_sse(event, reverted=True)
+                    subscriber.rewind(event)
+                    continue
+                if subscriber.last is not None and position <= subscriber.last:
+                    # Already replayed
+                    continue
+                subscriber.last = position
+                yield format_sse(event)
+        finally:
+            self.subscribers.discard(subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self.subscribers),
+            'lagging': sum(subscriber.lagged for subscriber in self.subscribers),
+            'buffered': sum(subscriber.queue.qsize() for subscriber in self.subscribers),
+        }
@@ -0,0 +1,530 @@
+"""
+Event Indexer for Government-Grade DAO Platform
+
+Persists decoded contract events into MongoDB so API reads never have to
+scan the chain:
+- Pages through block ranges with one eth_getLogs request per page
+- Decodes logs of every registered contract in-process
+- Maintains the proposal and vote collections read by the API
+- Checkpoints the last indexed block and resumes from it after a restart
+- Stays ``confirmations`` blocks behind the head and rolls back the blocks
+  orphaned by a deeper reorg (see services/reorg.py)
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from web3 import Web3
+
+from services.reorg import DEFAULT_CONFIRMATIONS, DEFAULT_REORG_WINDOW, BlockHashRing, detect_reorg
+
+logger = logging.getLogger(__name__)
+
+# Enum orderings from ProposalManager.sol
+PROPOSAL_TYPES = [
+    'POLICY_DECISION',
+    'BUDGET_ALLOCATION',
+    'REGULATION_AMENDMENT',
+    'ROLE_ASSIGNMENT',
+    'EMERGENCY_ACTION',
+    'PARAMETER_UPDATE',
+]
+
+PROPOSAL_STATES = [
+    'DRAFT',
+    'ACTIVE',
+    'SUCCEEDED',
+    'DEFEATED',
+    'QUEUED',
+    'EXECUTED',
+    'CANCELLED',
+    'EXPIRED',
+]
+
+MAX_INT64 = 2 ** 63 - 1
+
+
+def chain_position(event: Dict[str, Any]) -> int:
+    """Sortable integer position of an event in the chain"""
+    return event['block_number'] << 32 | event['log_index']
+
+
+class ReorgDetected(Exception):
+    """Fetched logs and block headers disagree; the page is retried later"""
+
+
+def normalize_value(value: Any) -> Any:
+    """
+    Convert decoded ABI values into BSON-friendly types
+
+    Bytes become 0x-prefixed hex strings and integers that do not fit into
+    a signed 64-bit BSON integer (uint256 amounts) are stored as strings.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value if -MAX_INT64 - 1 <= value <= MAX_INT64 else str(value)
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+
+async def ensure_indexes(db) -> None:
+    """Create the indexes for indexed events and the API queries over them"""
+    await db.events.create_index(
+        [('transaction_hash', ASCENDING), ('log_index', ASCENDING)],
+        unique=True
+    )
+    await db.events.create_index([('block_number', ASCENDING), ('log_index', ASCENDING)])
+    await db.events.create_index([('event', ASCENDING), ('block_number', ASCENDING)])
+
+    await db.proposals.create_index('id', unique=True)
+    await db.proposals.create_index([('state', ASCENDING), ('id', DESCENDING)])
+    await db.proposals.create_index([('proposer', ASCENDING), ('id', DESCENDING)])
+    await db.proposals.create_index('created_at')
+
+    await db.votes.create_index([('proposal_id', ASCENDING), ('voter', ASCENDING)], unique=True)
+    await db.votes.create_index([('voter', ASCENDING), ('block_number', DESCENDING)])
+
+    await db.citizens.create_index('wallet', unique=True)
+    await db.citizens.create_index('status')
+
+
+class ProposalProjection:
+    """Maintains the ``proposals`` and ``votes`` collections from ProposalManager events"""
+
+    def __init__(self, db, service):
+        """
+        Args:
+            db: Motor database
+            service: BlockchainService used to enrich new proposals
+        """
+        self.db = db
+        self.service = service
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Apply a single indexed event"""
+        if event['contract'] != 'ProposalManager':
+            return
+
+        handler = getattr(self, f"_on_{event['event']}", None)
+        if handler:
+            await handler(event)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Undo an event from an orphaned block"""
+        if event['contract'] != 'ProposalManager':
+            return
+
+        handler = getattr(self, f"_revert_{event['event']}", None)
+        if handler:
+            await handler(event)
+
+    async def _on_ProposalCreated(self, event: Dict[str, Any]) -> None:
+        args = event['args']
+        proposal_id = int(args['proposalId'])
+
+        # startBlock/endBlock are set by the activation in the same transaction
+        # but are not part of any event, so read them once from the contract.
+        onchain = await asyncio.to_thread(self.service.get_proposal, proposal_id) or {}
+
+        await self.db.proposals.update_one(
+            {'id': proposal_id},
+            {
+                '$set': {
+                    'proposer': args['proposer'],
+                    'proposal_type': PROPOSAL_TYPES[int(args['proposalType'])],
+                    'metadata_hash': args['metadataHash'],
+                    'start_block': onchain.get('start_block', event['block_number']),
+                    'end_block': onchain.get('end_block', 0),
+                    'created_at': event['timestamp'],
+                    'updated_at': event['timestamp'],
+                },
+                '$setOnInsert': {
+                    'id': proposal_id,
+                    'state': 'DRAFT',
+                    'title': '',
+                    'description': '',
+                    'for_votes': '0',
+                    'against_votes': '0',
+                    'abstain_votes': '0',
+                },
+            },
+            upsert=True
+        )
+
+    async def _on_ProposalStateChanged(self, event: Dict[str, Any]) -> None:
+        args = event['args']
+        await self.db.proposals.update_one(
+            {'id': int(args['proposalId'])},
+            {'$set': {
+                'state': PROPOSAL_STATES[int(args['newState'])],
+                'updated_at': event['timestamp'],
+            }}
+        )
+
+    async def _on_VoteCast(self, event: Dict[str, Any]) -> None:
+        args = event['args']
+        proposal_id = int(args['proposalId'])
+        support = int(args['support'])
+        weight = int(args['weight'])
+
+        await self.db.votes.update_one(
+            {'proposal_id': proposal_id, 'voter': args['voter']},
+            {'$set': {
+                'proposal_id': proposal_id,
+                'voter': args['voter'],
+                'support': support,
+                'weight': str(weight),
+                'reason': None,
+                'transaction_hash': event['transaction_hash'],
+                'block_number': event['block_number'],
+                'timestamp': event['timestamp'],
+            }},
+            upsert=True
+        )
+
+        await self._add_to_tally(event, proposal_id, support, weight)
+
+    async def _add_to_tally(self, event: Dict[str, Any], proposal_id: int, support: int, weight: int) -> None:
+        # Vote totals are uint256 strings, so they are updated read-modify-write.
+        # The indexer is the only writer of this collection. ``tallied_through``
+        # is the position up to which votes are counted, so an event applied or
+        # reverted again after an interrupted run is not counted twice.
+        field = ('against_votes', 'for_votes', 'abstain_votes')[support]
+        position = chain_position(event)
+        proposal = await self.db.proposals.find_one({'id': proposal_id}, {field: 1, 'tallied_through': 1})
+        if proposal is None:
+            return
+        tallied_through = proposal.get('tallied_through')
+        if weight >= 0 and tallied_through is not None and tallied_through >= position:
+            return
+        if weight < 0 and tallied_through is not None and tallied_through < position:
+            return
+        total = int(proposal.get(field, '0')) + weight
+        await self.db.proposals.update_one(
+            {'id': proposal_id, 'tallied_through': tallied_through},
+            {'$set': {
+                field: str(total),
+                'tallied_through': position if weight >= 0 else position - 1,
+                'updated_at': event['timestamp'],
+            }}
+        )
+
+    async def _revert_ProposalCreated(self, event: Dict[str, Any]) -> None:
+        await self.db.proposals.delete_one({'id': int(event['args']['proposalId'])})
+
+    async def _revert_ProposalStateChanged(self, event: Dict[str, Any]) -> None:
+        args = event['args']
+        await self.db.proposals.update_one(
+            {'id': int(args['proposalId'])},
+            {'$set': {'state': PROPOSAL_STATES[int(args['oldState'])]}}
+        )
+
+    async def _revert_VoteCast(self, event: Dict[str, Any]) -> None:
+        args = event['args']
+        proposal_id = int(args['proposalId'])
+        await self.db.votes.delete_one({
+            'proposal_id': proposal_id,
+            'voter': args['voter'],
+            'transaction_hash': event['transaction_hash'],
+        })
+        await self._add_to_tally(event, proposal_id, int(args['support']), -int(args['weight']))
+
+
+class EventIndexer:
+    """Incrementally indexes contract events into MongoDB"""
+
+    def __init__(
+        self,
+        service,
+        db,
+        contracts: Dict[str, Any],
+        start_block: int = 0,
+        page_size: int = 2000,
+        poll_interval: float = 15,
+        name: str = 'governance',
+        confirmations: int = DEFAULT_CONFIRMATIONS,
+        reorg_window: int = DEFAULT_REORG_WINDOW
+    ):
+        """
+        Initialize the indexer
+
+        Args:
+            service: BlockchainService providing the web3 connection
+            db: Motor database the events are written to
+            contracts: Mapping of contract label (e.g. "ProposalManager") to web3 contract
+            start_block: First block to index when no checkpoint exists
+            page_size: Maximum number of blocks per eth_getLogs request
+            poll_interval: Seconds to wait between polls once caught up
+            name: Checkpoint key, allows several indexers to share a database
+            confirmations: Blocks behind the head that are considered final
+            reorg_window: Number of indexed block hashes kept to locate a fork
+        """
+        self.service = service
+        self.w3 = service.w3
+        self.db = db
+        self.contracts = contracts
+        self.start_block = start_block
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.name = name
+        self.confirmations = confirmations
+        self.reorg_window = reorg_window
+
+        self.ring = BlockHashRing(reorg_window)
+        self.last_block: Optional[int] = None
+        self.head_block: Optional[int] = None
+
+        # (address, topic0) -> (contract label, event name, bound event)
+        self._events: Dict[tuple, tuple] = {}
+        for label, contract in contracts.items():
+            for item in contract.abi:
+                if item.get('type') != 'event' or item.get('anonymous'):
+                    continue
+                topic = Web3.to_hex(event_abi_to_log_topic(item))
+                event = getattr(contract.events, item['name'])()
+                self._events[(contract.address, topic)] = (label, item['name'], event)
+        self._addresses = [contract.address for contract in contracts.values()]
+
+        self.projections: List[Any] = [ProposalProjection(db, service)]
+        self._task: Optional[asyncio.Task] = None
+
+    def add_projection(self, projection) -> None:
+        """
+        Register a consumer of indexed events
+
+        Projections expose ``async apply(event)`` and are called for every
+        stored event, in chain order. An event whose projections were
+        interrupted by a crash is applied again on resume, so ``apply`` must
+        tolerate seeing the same event twice. Projections may also define
+        ``async checkpoint(block_number)``, called after every indexed range,
+        and ``async revert(event)``, called in reverse chain order for events
+        of blocks orphaned by a reorg.
+        """
+        self.projections.append(projection)
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes the indexer and the API queries rely on"""
+        await ensure_indexes(self.db)
+
+    # ============ Checkpointing ============
+
+    async def get_checkpoint(self) -> int:
+        """Return the last fully indexed block and restore the recorded block hashes"""
+        state = await self.db.indexer_state.find_one({'_id': self.name})
+        if state is None:
+            return self.start_block - 1
+        self.ring = BlockHashRing(self.reorg_window, state.get('recent_blocks'))
+        return state['last_block']
+
+    async def _save_checkpoint(self, block_number: int) -> None:
+        await self.db.indexer_state.update_one(
+            {'_id': self.name},
+            {'$set': {
+                'last_block': block_number,
+                'recent_blocks': self.ring.to_list(),
+                'updated_at': datetime.now(timezone.utc),
+            }},
+            upsert=True
+        )
+        self.last_block = block_number
+
+    # ============ Fetching ============
+
+    def _fetch_page(self, from_block: int, to_block: int) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Fetch and decode all watched logs in a block range (blocking)
+
+        Returns:
+            Decoded events and the hash of ``to_block``
+
+        Raises:
+            ReorgDetected: A log's block hash differs from the header fetched
+                for its block, i.e. the range changed while it was read
+        """
+        logs = self.w3.eth.get_logs({
+            'address': self._addresses,
+            'fromBlock': from_block,
+            'toBlock': to_block
+        })
+
+        # One batched header request per page instead of one per event
+        block_cache = self.service.block_cache
+        headers = block_cache.get_headers([to_block] + [log['blockNumber'] for log in logs])
+        for log in logs:
+            header = headers.get(log['blockNumber'])
+            if header is None or header['hash'].lower() != Web3.to_hex(log['blockHash']).lower():
+                block_cache.invalidate_from(log['blockNumber'])
+                raise ReorgDetected(f"Block {log['blockNumber']} changed while indexing {from_block}-{to_block}")
+
+        events = []
+        for log in logs:
+            if not log['topics']:
+                continue
+            key = (Web3.to_checksum_address(log['address']), Web3.to_hex(log['topics'][0]))
+            if key not in self._events:
+                continue
+            label, event_name, event = self._events[key]
+            try:
+                decoded = event.process_log(log)
+            except Exception as e:
+                logger.warning(f"Could not decode {label}.{event_name} log in block {log['blockNumber']}: {e}")
+                continue
+
+            events.append({
+                'event': event_name,
+                'contract': label,
+                'address': key[0],
+                'block_number': log['blockNumber'],
+                'block_hash': Web3.to_hex(log['blockHash']),
+                'transaction_hash': Web3.to_hex(log['transactionHash']),
+                'log_index': log['logIndex'],
+                'args': normalize_value(dict(decoded['args'])),
+                'timestamp': datetime.fromtimestamp(headers[log['blockNumber']]['timestamp'], tz=timezone.utc),
+            })
+        return events, headers[to_block]['hash']
+
+    # ============ Indexing ============
+
+    async def index_range(self, from_block: int, to_block: int) -> int:
+        """
+        Index a block range and advance the checkpoint
+
+        Events are upserted on (transaction_hash, log_index) and stored
+        flagged ``pending`` until every projection has applied them. Re-indexing
+        a range after a crash never duplicates data, and events stored by an
+        interrupted run are applied then.
+
+        Returns:
+            Number of applied events
+        """
+        events, to_block_hash = await asyncio.to_thread(self._fetch_page, from_block, to_block)
+
+        if events:
+            await self.db.events.bulk_write([
+                UpdateOne(
+                    {'transaction_hash': event['transaction_hash'], 'log_index': event['log_index']},
+                    {'$setOnInsert': {**event, 'pending': True}},
+                    upsert=True
+                )
+                for event in events
+            ], ordered=True)
+
+        pending = await self.db.events.find(
+            {'pending': True, 'block_number': {'$gte': from_block, '$lte': to_block}},
+            {'pending': 0}
+        ).sort([('block_number', ASCENDING), ('log_index', ASCENDING)]).to_list(None)
+        for event in pending:
+            event_id = event.pop('_id')
+            for projection in self.projections:
+                await projection.apply(event)
+            await self.db.events.update_one({'_id': event_id}, {'$unset': {'pending': ''}})
+
+        for block_number, block_hash in sorted({(e['block_number'], e['block_hash']) for e in events}):
+            if block_number != to_block:
+                self.ring.add(block_number, block_hash)
+        self.ring.add(to_block, to_block_hash)
+
+        await self._save_checkpoint(to_block)
+        for projection in self.projections:
+            if hasattr(projection, 'checkpoint'):
+                await projection.checkpoint(to_block)
+        return len(pending)
+
+    async def rollback(self, fork_block: int) -> int:
+        """
+        Discard everything indexed after ``fork_block``
+
+        The orphaned events are first flagged ``reverting``, then reverted in
+        reverse chain order and deleted one at a time. An interrupted rollback
+        resumes with the events not deleted yet, so the event in progress
+        is reverted again. The stats and proposal totals are guarded by chain
+        position, and the in-memory projections rebuild their state with the
+        flag in mind, so no projection reverts the event twice.
+
+        Returns:
+            Number of reverted events
+        """
+        await self.db.events.update_many(
+            {'block_number': {'$gt': fork_block}},
+            {'$set': {'reverting': True}}
+        )
+        orphaned = await self.db.events.find(
+            {'block_number': {'$gt': fork_block}}
+        ).sort([('block_number', DESCENDING), ('log_index', DESCENDING)]).to_list(length=None)
+
+        for event in orphaned:
+            for projection in reversed(self.projections):
+                if hasattr(projection, 'revert'):
+                    await projection.revert(event)
+            await self.db.events.delete_one({'_id': event['_id']})
+
+        self.ring.truncate(fork_block)
+        self.service.block_cache.invalidate_from(fork_block + 1)
+        await self._save_checkpoint(fork_block)
+        logger.warning(f"Reorg: rolled back {len(orphaned)} events after block {fork_block}")
+        return len(orphaned)
+
+    async def sync(self) -> int:
+        """
+        Index everything between the checkpoint and the last confirmed block
+
+        Returns:
+            Last indexed block
+        """
+        last_block = await self.get_checkpoint()
+
+        fork_block = await asyncio.to_thread(detect_reorg, self.ring, self.service.block_cache.get_hashes)
+        if fork_block is not None and fork_block < last_block:
+            await self.rollback(fork_block)
+            last_block = fork_block
+
+        self.head_block = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+        self.service.observe_head(self.head_block)
+        confirmed = self.head_block - self.confirmations
+
+        while last_block < confirmed:
+            end = min(last_block + self.page_size, confirmed)
+            count = await self.index_range(last_block + 1, end)
+            if count:
+                logger.info(f"Indexed {count} events in blocks {last_block + 1}-{end}")
+            last_block = end
+
+        self.last_block = last_block
+        return last_block
+
+    async def run(self) -> None:
+        """Follow the chain head until cancelled"""
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Indexer error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> asyncio.Task:
+        """Run the indexer as a background task on the current event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
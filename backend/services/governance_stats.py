@@ -0,0 +1,305 @@
+"""
+Governance statistics aggregate
+
+Keeps the numbers behind ``/governance/stats`` in a single MongoDB document
+that the event indexer updates incrementally, so the endpoint is one
+document read regardless of chain size. Events of orphaned blocks are
+reverted with the inverse update. The document records the chain position
+of the last counted event, so an event applied or reverted again after an
+interrupted run is not counted twice; citizen documents record the event
+that set their status in the same way. A periodic full recount from the indexed
+collections corrects any drift.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict
+
+from bson.decimal128 import Decimal128
+from pymongo.errors import DuplicateKeyError
+from web3 import Web3
+
+from services.event_indexer import PROPOSAL_STATES, chain_position
+
+logger = logging.getLogger(__name__)
+
+STATS_ID = 'current'
+DELEGATE_ROLE = Web3.to_hex(Web3.keccak(text='DELEGATE_ROLE'))
+NATIVE_TOKEN = '0x0000000000000000000000000000000000000000'
+
+# CitizenshipStatus values as tracked in the citizens collection
+CITIZEN_PENDING = 'PENDING'
+CITIZEN_ACTIVE = 'ACTIVE'
+CITIZEN_REVOKED = 'REVOKED'
+
+CITIZEN_EVENT_STATUS = {
+    'CitizenRegistered': CITIZEN_PENDING,
+    'CitizenshipApproved': CITIZEN_ACTIVE,
+    'CitizenshipRevoked': CITIZEN_REVOKED,
+}
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        'total_proposals': 0,
+        'states': {state: 0 for state in PROPOSAL_STATES},
+        'total_votes': 0,
+        'total_citizens': 0,
+        'total_delegates': 0,
+        'treasury_balance': Decimal128('0'),
+    }
+
+
+def format_stats(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the stored aggregate into the API response shape"""
+    doc = doc or _empty_stats()
+    states = doc.get('states', {})
+    balance = doc.get('treasury_balance', Decimal128('0'))
+    return {
+        'total_proposals': doc.get('total_proposals', 0),
+        'active_proposals': states.get('ACTIVE', 0),
+        'total_votes': doc.get('total_votes', 0),
+        'total_citizens': doc.get('total_citizens', 0),
+        'total_delegates': doc.get('total_delegates', 0),
+        'treasury_balance': str(balance.to_decimal().to_integral_value()),
+        'proposals_by_state': {state: states.get(state, 0) for state in PROPOSAL_STATES},
+        'last_block': doc.get('last_block'),
+    }
+
+
+class GovernanceStatsProjection:
+    """Indexer projection maintaining the ``governance_stats`` document"""
+
+    def __init__(self, db, reconcile_interval: float = 3600):
+        """
+        Args:
+            db: Motor database
+            reconcile_interval: Seconds between full recounts, 0 to disable
+        """
+        self.db = db
+        self.reconcile_interval = reconcile_interval
+        self._last_reconcile = time.monotonic()
+
+    async def _inc(self, event: Dict[str, Any], changes: Dict[str, Any], revert: bool = False) -> None:
+        position = chain_position(event)
+        # Only count events after the last counted one, and only revert counted ones
+        if revert:
+            query = {'_id': STATS_ID, '$or': [{'position': {'$gte': position}}, {'position': {'$exists': False}}]}
+            position -= 1
+        else:
+            query = {'_id': STATS_ID, '$or': [{'position': {'$lt': position}}, {'position': {'$exists': False}}]}
+        try:
+            await self.db.governance_stats.update_one(
+                query,
+                {
+                    '$inc': changes,
+                    '$set': {
+                        'last_block': event['block_number'],
+                        'position': position,
+                        'updated_at': datetime.now(timezone.utc),
+                    },
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The document has counted (or reverted) this event already
+            pass
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Apply a single indexed event to the counters"""
+        handler = getattr(self, f"_on_{event['contract']}_{event['event']}", None)
+        if handler:
+            await handler(event)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Undo an event from an orphaned block"""
+        if event['contract'] == 'CitizenRegistry' and event['event'] in CITIZEN_EVENT_STATUS:
+            await self._revert_citizen_event(event)
+            return
+        handler = getattr(self, f"_on_{event['contract']}_{event['event']}", None)
+        if handler:
+            await handler(event, sign=-1)
+
+    # ============ Proposals & Votes ============
+
+    async def _on_ProposalManager_ProposalCreated(self, event: Dict[str, Any], sign: int = 1) -> None:
+        await self._inc(event, {'total_proposals': sign, 'states.DRAFT': sign}, revert=sign < 0)
+
+    async def _on_ProposalManager_ProposalStateChanged(self, event: Dict[str, Any], sign: int = 1) -> None:
+        old_state = PROPOSAL_STATES[int(event['args']['oldState'])]
+        new_state = PROPOSAL_STATES[int(event['args']['newState'])]
+        await self._inc(event, {f'states.{old_state}': -sign, f'states.{new_state}': sign}, revert=sign < 0)
+
+    async def _on_ProposalManager_VoteCast(self, event: Dict[str, Any], sign: int = 1) -> None:
+        await self._inc(event, {'total_votes': sign}, revert=sign < 0)
+
+    # ============ Citizens & Delegates ============
+
+    async def _set_citizen_status(self, event: Dict[str, Any], status: str) -> str:
+        """
+        Store the status a registry event gives a citizen and return the previous one
+
+        The citizen document records the position of the event that set its
+        status and the status before it. An event applied again after a crash
+        between this write and the counter update gets the same previous
+        status, so the position-guarded counter update still runs once.
+        """
+        wallet = event['args']['wallet']
+        position = chain_position(event)
+        citizen = await self.db.citizens.find_one({'wallet': wallet}) or {}
+        if citizen.get('position', -1) >= position:
+            return citizen.get('previous_status')
+
+        previous = citizen.get('status')
+        await self.db.citizens.update_one(
+            {'wallet': wallet},
+            {'$set': {'wallet': wallet, 'status': status, 'position': position, 'previous_status': previous}},
+            upsert=True
+        )
+        return previous
+
+    async def _on_CitizenRegistry_CitizenRegistered(self, event: Dict[str, Any]) -> None:
+        await self._set_citizen_status(event, CITIZEN_PENDING)
+
+    async def _on_CitizenRegistry_CitizenshipApproved(self, event: Dict[str, Any]) -> None:
+        previous = await self._set_citizen_status(event, CITIZEN_ACTIVE)
+        if previous != CITIZEN_ACTIVE:
+            await self._inc(event, {'total_citizens': 1})
+
+    async def _on_CitizenRegistry_CitizenshipRevoked(self, event: Dict[str, Any]) -> None:
+        # The registry only decrements totalCitizens for active citizens
+        previous = await self._set_citizen_status(event, CITIZEN_REVOKED)
+        if previous == CITIZEN_ACTIVE:
+            await self._inc(event, {'total_citizens': -1})
+
+    async def _revert_citizen_event(self, event: Dict[str, Any]) -> None:
+        """Restore the status the citizen had before an orphaned registry event"""
+        wallet = event['args']['wallet']
+        earlier = await self.db.events.find_one(
+            {
+                'contract': 'CitizenRegistry',
+                'event': {'$in': list(CITIZEN_EVENT_STATUS)},
+                'args.wallet': wallet,
+                '$or': [
+                    {'block_number': {'$lt': event['block_number']}},
+                    {'block_number': event['block_number'], 'log_index': {'$lt': event['log_index']}},
+                ],
+            },
+            sort=[('block_number', -1), ('log_index', -1)]
+        )
+
+        if earlier is None:
+            await self.db.citizens.delete_one({'wallet': wallet})
+            status = None
+        else:
+            status = CITIZEN_EVENT_STATUS[earlier['event']]
+            await self.db.citizens.update_one(
+                {'wallet': wallet},
+                {
+                    '$set': {'wallet': wallet, 'status': status, 'position': chain_position(earlier)},
+                    '$unset': {'previous_status': ''},
+                },
+                upsert=True
+            )
+
+        # Rollbacks run newest first, so the status being undone is the one this event set;
+        # a revert repeated after a crash computes the same change
+        undone = CITIZEN_EVENT_STATUS[event['event']]
+        delta = int(status == CITIZEN_ACTIVE) - int(undone == CITIZEN_ACTIVE)
+        if delta:
+            await self._inc(event, {'total_citizens': delta}, revert=True)
+
+    async def _on_GovernanceCore_RoleGranted(self, event: Dict[str, Any], sign: int = 1) -> None:
+        if event['args']['role'] == DELEGATE_ROLE:
+            await self._inc(event, {'total_delegates': sign}, revert=sign < 0)
+
+    async def _on_GovernanceCore_RoleRevoked(self, event: Dict[str, Any], sign: int = 1) -> None:
+        if event['args']['role'] == DELEGATE_ROLE:
+            await self._inc(event, {'total_delegates': -sign}, revert=sign < 0)
+
+    # ============ Treasury ============
+
+    async def _adjust_treasury(self, event: Dict[str, Any], amount: int, revert: bool = False) -> None:
+        await self._inc(event, {'treasury_balance': Decimal128(Decimal(amount))}, revert=revert)
+
+    async def _on_TreasuryManager_Deposit(self, event: Dict[str, Any], sign: int = 1) -> None:
+        if event['args']['token'] == NATIVE_TOKEN:
+            await self._adjust_treasury(event, sign * int(event['args']['amount']), revert=sign < 0)
+
+    async def _on_TreasuryManager_Withdrawal(self, event: Dict[str, Any], sign: int = 1) -> None:
+        if event['args']['token'] == NATIVE_TOKEN:
+            await self._adjust_treasury(event, -sign * int(event['args']['amount']), revert=sign < 0)
+
+    async def _on_TreasuryManager_TransactionExecuted(self, event: Dict[str, Any], sign: int = 1) -> None:
+        # The paid-out token is only part of the budget's BudgetCreated event
+        budget = await self.db.events.find_one({
+            'contract': 'TreasuryManager',
+            'event': 'BudgetCreated',
+            'args.budgetId': event['args']['budgetId'],
+        })
+        if budget and budget['args'].get('token') == NATIVE_TOKEN:
+            await self._adjust_treasury(event, -sign * int(event['args']['amount']), revert=sign < 0)
+
+    # ============ Reconciliation ============
+
+    async def checkpoint(self, block_number: int) -> None:
+        """Run a full recount once the reconcile interval has elapsed"""
+        if not self.reconcile_interval:
+            return
+        if time.monotonic() - self._last_reconcile < self.reconcile_interval:
+            return
+        try:
+            await self.reconcile(block_number)
+        except Exception as e:
+            logger.error(f"Stats reconciliation failed: {e}")
+        self._last_reconcile = time.monotonic()
+
+    async def reconcile(self, block_number: int) -> Dict[str, Any]:
+        """
+        Recompute every counter from the indexed collections
+
+        Returns:
+            The recomputed stats document
+        """
+        stats = _empty_stats()
+        stats['total_proposals'] = await self.db.proposals.count_documents({})
+        async for group in self.db.proposals.aggregate([{'$group': {'_id': '$state', 'count': {'$sum': 1}}}]):
+            stats['states'][group['_id']] = group['count']
+        stats['total_votes'] = await self.db.votes.count_documents({})
+        stats['total_citizens'] = await self.db.citizens.count_documents({'status': CITIZEN_ACTIVE})
+
+        delegates = set()
+        native_budgets = set()
+        balance = 0
+        cursor = self.db.events.find(
+            {'event': {'$in': ['RoleGranted', 'RoleRevoked', 'Deposit', 'Withdrawal',
+                               'BudgetCreated', 'TransactionExecuted']}},
+            {'_id': 0, 'contract': 1, 'event': 1, 'args': 1}
+        ).sort([('block_number', 1), ('log_index', 1)])
+        async for event in cursor:
+            args = event['args']
+            key = (event['contract'], event['event'])
+            if key == ('GovernanceCore', 'RoleGranted') and args['role'] == DELEGATE_ROLE:
+                delegates.add(args['account'])
+            elif key == ('GovernanceCore', 'RoleRevoked') and args['role'] == DELEGATE_ROLE:
+                delegates.discard(args['account'])
+            elif key == ('TreasuryManager', 'Deposit') and args['token'] == NATIVE_TOKEN:
+                balance += int(args['amount'])
+            elif key == ('TreasuryManager', 'Withdrawal') and args['token'] == NATIVE_TOKEN:
+                balance -= int(args['amount'])
+            elif key == ('TreasuryManager', 'BudgetCreated') and args.get('token') == NATIVE_TOKEN:
+                native_budgets.add(args['budgetId'])
+            elif key == ('TreasuryManager', 'TransactionExecuted') and args['budgetId'] in native_budgets:
+                balance -= int(args['amount'])
+
+        stats['total_delegates'] = len(delegates)
+        stats['treasury_balance'] = Decimal128(Decimal(balance))
+        stats['last_block'] = block_number
+        stats['position'] = chain_position({'block_number': block_number, 'log_index': 2 ** 32 - 1})
+        stats['updated_at'] = datetime.now(timezone.utc)
+        stats['reconciled_at'] = stats['updated_at']
+
+        await self.db.governance_stats.replace_one({'_id': STATS_ID}, stats, upsert=True)
+        return stats
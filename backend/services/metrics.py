@@ -0,0 +1,325 @@
+"""
+Performance metrics
+
+Process-wide counters, gauges and histograms, rendered in the Prometheus
+text format by ``/metrics``:
+- HTTP request latency per route (``MetricsMiddleware``)
+- JSON-RPC calls, errors and round-trip latency per method (recorded by
+  the RPC pools in services/rpc_pool.py)
+- MongoDB command latency per command and collection
+  (``MongoCommandListener``, registered on the Motor client)
+
+The RPC and MongoDB time spent on behalf of a request is also summed per
+request and can be returned in a ``Server-Timing`` header.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ============ Metric types ============
+
+class Metric:
+    """A named family of time series distinguished by label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, tuple, float]]:
+        """(suffix, extra label pairs + label values, value) rows"""
+        with self._lock:
+            return [('', (tuple(zip(self.labelnames, key))), value) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, pairs, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> List[Tuple[str, tuple, float]]:
+        rows = []
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            pairs = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                rows.append(('_bucket', pairs + (('le', _format_value(bound)),), cumulative))
+            rows.append(('_sum', pairs, total))
+            rows.append(('_count', pairs, count))
+        return rows
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        """Run ``collect`` before every render, to refresh gauges from live state"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ['method', 'route', 'status']
+)
+RPC_CALLS = REGISTRY.counter('rpc_calls_total', 'JSON-RPC calls by method, batched calls included', ['method'])
+RPC_ERRORS = REGISTRY.counter(
+    'rpc_errors_total', 'JSON-RPC calls that returned an error or got no response', ['method']
+)
+RPC_DURATION = REGISTRY.histogram(
+    'rpc_request_duration_seconds', 'JSON-RPC round-trip latency; batches are labelled method="batch"', ['method']
+)
+MONGO_COMMAND_DURATION = REGISTRY.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency', ['command', 'collection'],
+    buckets=(0.0005,) + DEFAULT_BUCKETS
+)
+MONGO_COMMAND_FAILURES = REGISTRY.counter(
+    'mongodb_command_failures_total', 'Failed MongoDB commands', ['command', 'collection']
+)
+
+# Refreshed at scrape time from the live services
+RPC_ENDPOINT_LATENCY = REGISTRY.gauge(
+    'rpc_endpoint_latency_seconds', 'Moving average latency per RPC endpoint', ['client', 'url']
+)
+RPC_ENDPOINT_ERROR_RATE = REGISTRY.gauge(
+    'rpc_endpoint_error_rate', 'Moving average error rate per RPC endpoint', ['client', 'url']
+)
+RPC_ENDPOINT_AVAILABLE = REGISTRY.gauge(
+    'rpc_endpoint_available', '1 unless the endpoint is benched after failures', ['client', 'url']
+)
+INDEXER_BLOCK = REGISTRY.gauge('indexer_block', 'Last indexed and last seen chain head block', ['kind'])
+READ_CACHE = REGISTRY.gauge('read_cache', 'Contract read cache size and lookup counters', ['stat'])
+RESPONSE_CACHE = REGISTRY.gauge('response_cache', 'HTTP response cache size and lookup counters', ['stat'])
+
+
+# ============ Per-request timings ============
+
+class Timings:
+    """Time spent per category (rpc, mongo) while serving one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, category: str, seconds: float) -> None:
+        with self._lock:
+            total = self._totals.setdefault(category, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def header(self) -> str:
+        """``Server-Timing`` value; concurrent calls can make a category exceed the total"""
+        with self._lock:
+            parts = [
+                f'{category};dur={seconds * 1000:.2f};desc="{count} calls"'
+                for category, (seconds, count) in self._totals.items()
+            ]
+        parts.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.2f}')
+        return ', '.join(parts)
+
+
+# Set by MetricsMiddleware; copied into threads started with asyncio.to_thread
+# and into Motor's executor, so blocking RPC and MongoDB work is attributed too
+request_timings: ContextVar[Optional[Timings]] = ContextVar('request_timings', default=None)
+
+
+def add_timing(category: str, seconds: float) -> None:
+    """Attribute time to the request being served, if any"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(category, seconds)
+
+
+# ============ Collectors ============
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and optionally a Server-Timing header"""
+
+    def __init__(self, app, server_timing: bool = False):
+        """
+        Args:
+            app: ASGI application
+            server_timing: Add a ``Server-Timing`` header with the RPC and
+                MongoDB time spent on the request
+        """
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.server_timing:
+                    MutableHeaders(scope=message).append('Server-Timing', timings.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            # Route templates, not raw paths, keep the label set bounded
+            route = scope.get('route')
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - timings.start,
+                method=scope['method'],
+                route=getattr(route, 'path', 'unmatched'),
+                status=status
+            )
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo command listener timing every command sent by a client"""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore names the collection in a separate field
+            collection = event.command.get('collection', '')
+        with self._lock:
+            self._collections[(event.request_id, event.connection_id)] = collection
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            collection = self._collections.pop((event.request_id, event.connection_id), '')
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_DURATION.observe(seconds, command=event.command_name, collection=collection)
+        if failed:
+            MONGO_COMMAND_FAILURES.inc(command=event.command_name, collection=collection)
+        add_timing('mongo', seconds)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
@@ -0,0 +1,288 @@
+"""
+Batched contract reads
+
+Fan-out reads (role matrices, proposal lists, vote counts) are aggregated
+into a single Multicall3 ``aggregate3`` eth_call. On chains without a
+Multicall3 deployment the same calls are sent as one JSON-RPC batch of
+``eth_call`` requests instead.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+
+from services.contracts import ROLE_NAMES, format_proposal, format_vote_counts
+from services.rpc_batch import batch_request
+
+# Deployed at the same address on mainnet, Sepolia and most public chains
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [{
+            "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"}
+            ],
+            "name": "calls",
+            "type": "tuple[]"
+        }],
+        "name": "aggregate3",
+        "outputs": [{
+            "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"}
+            ],
+            "name": "returnData",
+            "type": "tuple[]"
+        }],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+BlockIdentifier = Union[int, str]
+
+
+class Call(NamedTuple):
+    """A single encoded contract read"""
+    target: str
+    data: str
+    output_types: List[str]
+
+
+def encode_call(contract, fn_name: str, *args) -> Call:
+    """Encode a contract function call for aggregation"""
+    fn_abi = next(
+        item for item in contract.abi
+        if item.get('type') == 'function' and item['name'] == fn_name
+    )
+    return Call(
+        target=contract.address,
+        data=contract.encodeABI(fn_name=fn_name, args=list(args)),
+        output_types=[collapse_if_tuple(output) for output in fn_abi['outputs']]
+    )
+
+
+class MulticallReader:
+    """Aggregated reads against GovernanceCore and ProposalManager"""
+
+    def __init__(
+        self,
+        w3,
+        governance_core,
+        proposal_manager,
+        multicall_address: Optional[str] = MULTICALL3_ADDRESS,
+        max_calls: int = 500
+    ):
+        """
+        Args:
+            w3: Web3 instance
+            governance_core: GovernanceCore contract
+            proposal_manager: ProposalManager contract
+            multicall_address: Multicall3 address, or None to use JSON-RPC batches
+            max_calls: Maximum number of calls per aggregated request
+        """
+        self.w3 = w3
+        self.governance_core = governance_core
+        self.proposal_manager = proposal_manager
+        self.max_calls = max_calls
+        self.multicall = None
+        if multicall_address:
+            self.multicall = w3.eth.contract(
+                address=Web3.to_checksum_address(multicall_address),
+                abi=MULTICALL3_ABI
+            )
+        self._role_hashes: Optional[Dict[str, bytes]] = None
+
+    # ============ Encoding ============
+
+    def _decode(self, call: Call, raw: Optional[bytes]) -> Any:
+        """Decode return data, None for failed or empty calls"""
+        if not raw:
+            return None
+        values = self.w3.codec.decode(call.output_types, raw)
+        return values[0] if len(values) == 1 else values
+
+    def _aggregate3_args(self, calls: Sequence[Call]) -> List[tuple]:
+        return [(call.target, True, call.data) for call in calls]
+
+    def _eth_call_params(self, calls: Sequence[Call], block_identifier: BlockIdentifier = 'latest') -> List[tuple]:
+        block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        return [('eth_call', [{'to': call.target, 'data': call.data}, block]) for call in calls]
+
+    def _chunks(self, calls: Sequence[Call]) -> Iterable[Sequence[Call]]:
+        for offset in range(0, len(calls), self.max_calls):
+            yield calls[offset:offset + self.max_calls]
+
+    # ============ Execution ============
+
+    def aggregate(self, calls: Sequence[Call], block_identifier: BlockIdentifier = 'latest') -> List[Any]:
+        """
+        Execute reads in as few round-trips as possible
+
+        Args:
+            calls: Encoded reads
+            block_identifier: Block every read is executed against; pin a
+                block number to read one consistent state across chunks
+
+        Returns:
+            Decoded results in call order, None for calls that reverted
+        """
+        results: List[Any] = []
+        for chunk in self._chunks(calls):
+            if self.multicall is not None:
+                returned = self.multicall.functions.aggregate3(self._aggregate3_args(chunk)).call(
+                    block_identifier=block_identifier
+                )
+                raw = [data if success else None for success, data in returned]
+            else:
+                raw = [
+                    Web3.to_bytes(hexstr=result) if result else None
+                    for result in batch_request(
+                        self.w3, self._eth_call_params(chunk, block_identifier), allow_errors=True
+                    )
+                ]
+            results.extend(self._decode(call, data) for call, data in zip(chunk, raw))
+        return results
+
+    # ============ Roles ============
+
+    def _role_hash_calls(self) -> List[Call]:
+        return [encode_call(self.governance_core, f"{name}_ROLE") for name in ROLE_NAMES]
+
+    def _set_role_hashes(self, hashes: List[Any]) -> Dict[str, bytes]:
+        if any(value is None for value in hashes):
+            raise ValueError("Could not resolve role hashes")
+        self._role_hashes = dict(zip(ROLE_NAMES, hashes))
+        return self._role_hashes
+
+    def role_hashes(self) -> Dict[str, bytes]:
+        """Role name to bytes32 hash; constants, so resolved only once"""
+        if self._role_hashes is None:
+            self._set_role_hashes(self.aggregate(self._role_hash_calls()))
+        return self._role_hashes
+
+    def _role_calls(self, addresses: List[str], hashes: Dict[str, bytes]) -> List[Call]:
+        return [
+            encode_call(self.governance_core, 'checkRole', hashes[name], address)
+            for address in addresses
+            for name in ROLE_NAMES
+        ]
+
+    @staticmethod
+    def _role_matrix(addresses: List[str], results: List[Any]) -> Dict[str, List[str]]:
+        width = len(ROLE_NAMES)
+        return {
+            address: [
+                name for name, granted in zip(ROLE_NAMES, results[i * width:(i + 1) * width])
+                if granted
+            ]
+            for i, address in enumerate(addresses)
+        }
+
+    def get_roles(self, addresses: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Resolve the role matrix for many addresses
+
+        Returns:
+            Mapping of checksummed address to list of role names
+        """
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        results = self.aggregate(self._role_calls(addresses, self.role_hashes()))
+        return self._role_matrix(addresses, results)
+
+    # ============ Proposals ============
+
+    def _proposal_calls(self, proposal_ids: List[int]) -> List[Call]:
+        return [encode_call(self.proposal_manager, 'getProposal', pid) for pid in proposal_ids]
+
+    def _vote_count_calls(self, proposal_ids: List[int]) -> List[Call]:
+        return [encode_call(self.proposal_manager, 'getVoteCounts', pid) for pid in proposal_ids]
+
+    @staticmethod
+    def _proposal_map(proposal_ids: List[int], results: List[Any]) -> Dict[int, Optional[Dict[str, Any]]]:
+        proposals = {}
+        for pid, result in zip(proposal_ids, results):
+            if result is None:
+                proposals[pid] = None
+                continue
+            proposal = format_proposal(result)
+            proposal['proposer'] = Web3.to_checksum_address(proposal['proposer'])
+            proposals[pid] = proposal
+        return proposals
+
+    @staticmethod
+    def _vote_count_map(proposal_ids: List[int], results: List[Any]) -> Dict[int, Dict[str, str]]:
+        return {
+            pid: format_vote_counts(result) if result is not None
+            else {'for_votes': '0', 'against_votes': '0', 'abstain_votes': '0'}
+            for pid, result in zip(proposal_ids, results)
+        }
+
+    def get_proposals(self, proposal_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Fetch many proposals in one aggregated read"""
+        proposal_ids = list(proposal_ids)
+        return self._proposal_map(proposal_ids, self.aggregate(self._proposal_calls(proposal_ids)))
+
+    def get_vote_counts(self, proposal_ids: Iterable[int]) -> Dict[int, Dict[str, str]]:
+        """Fetch vote counts of many proposals in one aggregated read"""
+        proposal_ids = list(proposal_ids)
+        return self._vote_count_map(proposal_ids, self.aggregate(self._vote_count_calls(proposal_ids)))
+
+
+class AsyncMulticallReader(MulticallReader):
+    """MulticallReader for AsyncWeb3, batching over the service's RPC pool"""
+
+    def __init__(self, w3, governance_core, proposal_manager, pool, **kwargs):
+        """
+        Args:
+            pool: AsyncRPCPool used for JSON-RPC batch fallback
+        """
+        super().__init__(w3, governance_core, proposal_manager, **kwargs)
+        self.pool = pool
+
+    async def aggregate(self, calls: Sequence[Call], block_identifier: BlockIdentifier = 'latest') -> List[Any]:
+        results: List[Any] = []
+        for chunk in self._chunks(calls):
+            if self.multicall is not None:
+                returned = await self.multicall.functions.aggregate3(self._aggregate3_args(chunk)).call(
+                    block_identifier=block_identifier
+                )
+                raw = [data if success else None for success, data in returned]
+            else:
+                responses = await self.pool.batch_request(
+                    self._eth_call_params(chunk, block_identifier),
+                    allow_errors=True
+                )
+                raw = [Web3.to_bytes(hexstr=result) if result else None for result in responses]
+            results.extend(self._decode(call, data) for call, data in zip(chunk, raw))
+        return results
+
+    async def role_hashes(self) -> Dict[str, bytes]:
+        if self._role_hashes is None:
+            self._set_role_hashes(await self.aggregate(self._role_hash_calls()))
+        return self._role_hashes
+
+    async def get_roles(self, addresses: Iterable[str]) -> Dict[str, List[str]]:
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        results = await self.aggregate(self._role_calls(addresses, await self.role_hashes()))
+        return self._role_matrix(addresses, results)
+
+    async def get_proposals(self, proposal_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        proposal_ids = list(proposal_ids)
+        return self._proposal_map(proposal_ids, await self.aggregate(self._proposal_calls(proposal_ids)))
+
+    async def get_vote_counts(self, proposal_ids: Iterable[int]) -> Dict[int, Dict[str, str]]:
+        proposal_ids = list(proposal_ids)
+        return self._vote_count_map(proposal_ids, await self.aggregate(self._vote_count_calls(proposal_ids)))
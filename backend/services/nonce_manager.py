@@ -0,0 +1,121 @@
+"""
+Transaction nonce and gas price management
+
+Concurrent sends from the same relayer account must not read the same
+``eth_getTransactionCount``. The NonceManager hands out nonces from a local
+counter, seeded once from the chain's pending count and re-seeded after a
+failed send. Gas price is cached for roughly one block.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class NonceManager:
+    """Atomic local nonce allocator for a single signing account"""
+
+    def __init__(self, address: str):
+        """
+        Args:
+            address: Signing account the nonces belong to
+        """
+        self.address = address
+        self._next: Optional[int] = None
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def needs_sync(self) -> bool:
+        """True until seeded from chain, and again after resync()"""
+        return self._next is None
+
+    def sync(self, chain_nonce: int) -> None:
+        """Seed the counter from the chain's pending transaction count"""
+        with self._lock:
+            if self._next is None or chain_nonce > self._next:
+                self._next = chain_nonce
+
+    def resync(self) -> None:
+        """Force the next reservation to re-read the nonce from chain"""
+        with self._lock:
+            self._next = None
+
+    def _take(self, count: int) -> range:
+        # Caller holds _lock and has seeded the counter
+        start = self._next
+        self._next += count
+        return range(start, start + count)
+
+    def reserve(self, fetch_chain_nonce: Callable[[], int], count: int = 1) -> range:
+        """
+        Reserve consecutive nonces
+
+        Args:
+            fetch_chain_nonce: Returns the account's pending transaction count
+            count: Number of nonces to reserve
+
+        Returns:
+            Range of reserved nonces
+        """
+        with self._lock:
+            if self._next is None:
+                self._next = fetch_chain_nonce()
+            return self._take(count)
+
+    async def areserve(self, fetch_chain_nonce: Callable[[], Awaitable[int]], count: int = 1) -> range:
+        """Async ``reserve``; concurrent callers wait for a single chain read"""
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        while True:
+            async with self._async_lock:
+                chain_nonce = await fetch_chain_nonce() if self._next is None else None
+                with self._lock:
+                    if self._next is None and chain_nonce is not None:
+                        self._next = chain_nonce
+                    if self._next is not None:
+                        return self._take(count)
+            # Resynced from another thread after the check; read the chain again
+
+
+class GasPriceCache:
+    """Caches eth_gasPrice for one block"""
+
+    def __init__(self, max_age: float = 12):
+        """
+        Args:
+            max_age: Seconds a price is reused when no new head is observed
+                (one block on Ethereum)
+        """
+        self.max_age = max_age
+        self._price: Optional[int] = None
+        self._fetched_at = 0.0
+        self._block: Optional[int] = None
+
+    def _valid(self) -> bool:
+        return self._price is not None and time.monotonic() - self._fetched_at < self.max_age
+
+    def _store(self, price: int) -> int:
+        self._price = price
+        self._fetched_at = time.monotonic()
+        return price
+
+    def observe_head(self, block_number: int) -> None:
+        """Drop the cached price once a newer block is seen"""
+        if self._block is not None and block_number > self._block:
+            self._price = None
+        if self._block is None or block_number > self._block:
+            self._block = block_number
+
+    def get(self, fetch_gas_price: Callable[[], int]) -> int:
+        """Return the cached gas price or fetch a new one"""
+        if self._valid():
+            return self._price
+        return self._store(fetch_gas_price())
+
+    async def aget(self, fetch_gas_price: Callable[[], Awaitable[int]]) -> int:
+        """Async ``get``"""
+        if self._valid():
+            return self._price
+        return self._store(await fetch_gas_price())
@@ -0,0 +1,220 @@
+"""
+Read-through cache for contract calls
+
+Governance parameters, proposal counts and proposal reads only change when
+specific events are emitted. Results are cached per (contract, call, args)
+and dropped when the indexer sees a relevant event, when the chain head
+has moved more than ``max_block_age`` blocks past the block the entry was
+stored at, or after ``ttl`` seconds as a fallback when no indexer runs.
+Every key is indexed under each of its prefixes, so an invalidation only
+touches the entries it drops.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+CacheKey = Tuple[Hashable, ...]
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at', 'block')
+
+    def __init__(self, value: Any, stored_at: float, block: Optional[int]):
+        self.value = value
+        self.stored_at = stored_at
+        self.block = block
+
+
+class ReadThroughCache:
+    """Bounded LRU of contract call results with event and block based invalidation"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60, max_block_age: int = 100):
+        """
+        Args:
+            maxsize: Maximum number of cached results
+            ttl: Seconds after which an entry expires regardless of events
+            max_block_age: Blocks the head may advance before an entry expires
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_block_age = max_block_age
+        self.head_block: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        # Key prefix -> cached keys starting with it
+        self._prefixes: Dict[CacheKey, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+
+    # ============ Lookup ============
+
+    def _fresh(self, entry: _Entry) -> bool:
+        if time.monotonic() - entry.stored_at > self.ttl:
+            return False
+        if self.head_block is not None and entry.block is not None:
+            return self.head_block - entry.block <= self.max_block_age
+        return True
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        """
+        Look up a key
+
+        Returns:
+            (found, value) tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry.value
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a value at the current head"""
+        with self._lock:
+            if key not in self._entries:
+                for length in range(1, len(key) + 1):
+                    self._prefixes.setdefault(key[:length], set()).add(key)
+            self._entries[key] = _Entry(value, time.monotonic(), self.head_block)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        """Drop an entry and its prefix index references; the caller holds the lock"""
+        del self._entries[key]
+        for length in range(1, len(key) + 1):
+            keys = self._prefixes[key[:length]]
+            keys.discard(key)
+            if not keys:
+                del self._prefixes[key[:length]]
+
+    def get_or_load(self, key: CacheKey, loader: Callable[[], Any]) -> Any:
+        """Return the cached value or call ``loader`` and cache its result (None is not cached)"""
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    async def aget_or_load(self, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async ``get_or_load``
+
+        Concurrent misses for the same key share a single load, so a burst of
+        requests after an invalidation costs one RPC.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    # ============ Invalidation ============
+
+    def invalidate(self, *prefix: Hashable) -> int:
+        """
+        Drop every entry whose key starts with ``prefix``
+
+        ``invalidate('ProposalManager', 'getProposal', 7)`` drops one proposal,
+        ``invalidate('ProposalManager')`` drops all ProposalManager reads.
+
+        Returns:
+            Number of dropped entries
+        """
+        with self._lock:
+            keys = list(self._entries) if not prefix else list(self._prefixes.get(prefix, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def observe_head(self, block_number: int) -> None:
+        """Record the latest known chain head; older entries age out lazily"""
+        if self.head_block is None or block_number > self.head_block:
+            self.head_block = block_number
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and configuration"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'head_block': self.head_block,
+            'ttl': self.ttl,
+            'max_block_age': self.max_block_age,
+        }
+
+
+class CacheInvalidator:
+    """Indexer projection that drops cached reads affected by new events"""
+
+    def __init__(self, cache: ReadThroughCache):
+        self.cache = cache
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Invalidate the reads an event can change"""
+        name = event['event']
+        args = event['args']
+
+        if name == 'GovernanceParamsUpdated':
+            self.cache.invalidate('GovernanceCore', 'getGovernanceParams')
+        elif name == 'ProposalCreated':
+            self.cache.invalidate('GovernanceCore', 'getProposalCount')
+
+        if event['contract'] == 'ProposalManager' and 'proposalId' in args:
+            proposal_id = int(args['proposalId'])
+            self.cache.invalidate('ProposalManager', 'getProposal', proposal_id)
+            self.cache.invalidate('ProposalManager', 'getVoteCounts', proposal_id)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Orphaned events invalidate the same reads as new ones"""
+        await self.apply(event)
+
+    async def checkpoint(self, block_number: int) -> None:
+        """Advance the cache's view of the chain head"""
+        self.cache.observe_head(block_number)
@@ -0,0 +1,107 @@
+"""
+Chain reorganization detection
+
+Consumers of contract logs (the event indexer, the monitoring service) only
+process blocks that are ``confirmations`` blocks behind the head, and record
+the hashes of the blocks they processed in a bounded ring. Before moving on
+they compare the newest recorded hash with the canonical chain; on a
+mismatch the ring locates the last block both chains share, so only the
+data derived from blocks after it has to be rolled back and re-ingested.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CONFIRMATIONS = 12
+DEFAULT_REORG_WINDOW = 256
+
+
+class BlockHashRing:
+    """Bounded, ordered record of recently processed block hashes"""
+
+    def __init__(self, maxlen: int = DEFAULT_REORG_WINDOW, entries: Optional[Iterable[Tuple[int, str]]] = None):
+        """
+        Args:
+            maxlen: Number of blocks remembered; bounds the deepest reorg that can be rolled back
+            entries: Initial (block number, hash) pairs, e.g. from a checkpoint
+        """
+        self.maxlen = maxlen
+        self._hashes: "OrderedDict[int, str]" = OrderedDict()
+        for number, block_hash in entries or []:
+            self.add(number, block_hash)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def tip(self) -> Optional[Tuple[int, str]]:
+        """Newest recorded (block number, hash)"""
+        if not self._hashes:
+            return None
+        return next(reversed(self._hashes.items()))
+
+    def add(self, number: int, block_hash: str) -> None:
+        """Record a processed block; entries are kept in block order"""
+        if self._hashes and number < next(reversed(self._hashes)):
+            raise ValueError(f"Block {number} is older than the ring tip")
+        self._hashes[number] = block_hash.lower()
+        self._hashes.move_to_end(number)
+        while len(self._hashes) > self.maxlen:
+            self._hashes.popitem(last=False)
+
+    def numbers(self) -> List[int]:
+        return list(self._hashes)
+
+    def truncate(self, last_block: int) -> None:
+        """Forget every block after ``last_block``"""
+        while self._hashes and next(reversed(self._hashes)) > last_block:
+            self._hashes.popitem()
+
+    def find_fork(self, canonical: Dict[int, Optional[str]]) -> Optional[int]:
+        """
+        Locate the last block shared with the canonical chain
+
+        Args:
+            canonical: Canonical hash per recorded block number (None if the
+                block no longer exists)
+
+        Returns:
+            None if every recorded hash is canonical, otherwise the block
+            after which recorded data must be discarded
+        """
+        common = None
+        for number, block_hash in self._hashes.items():
+            if (canonical.get(number) or '').lower() != block_hash:
+                if common is None:
+                    # Reorg deeper than the ring: roll back everything it covers
+                    return number - 1
+                return common
+            common = number
+        return None
+
+    def to_list(self) -> List[List]:
+        """Serializable form for checkpoints"""
+        return [[number, block_hash] for number, block_hash in self._hashes.items()]
+
+
+def detect_reorg(ring: BlockHashRing, fetch_hashes: Callable[[List[int]], Dict[int, Optional[str]]]) -> Optional[int]:
+    """
+    Check the recorded blocks against the canonical chain
+
+    Only the tip is fetched in the common case; a block hash commits to all
+    its ancestors, so a canonical tip means nothing below it was reorged.
+
+    Args:
+        ring: Recorded block hashes
+        fetch_hashes: Returns the canonical hash for each requested block number
+
+    Returns:
+        Last block shared with the canonical chain, or None if there was no reorg
+    """
+    tip = ring.tip
+    if tip is None:
+        return None
+    number, block_hash = tip
+    if (fetch_hashes([number]).get(number) or '').lower() == block_hash:
+        return None
+    return ring.find_fork(fetch_hashes(ring.numbers()))
@@ -0,0 +1,270 @@
+"""
+HTTP response cache for indexed governance reads
+
+Governance GET endpoints only change when the event indexer processes new
+blocks, so their serialized responses are cached per (path, query, last
+indexed block). Each response carries an ``ETag`` (a hash of its body):
+clients revalidating with ``If-None-Match`` get a bodyless 304 while the
+body is unchanged, even across blocks.
+
+Entries live in a bounded in-process LRU and, when several workers serve the
+API, optionally in a shared MongoDB collection (expired by a TTL index).
+Responses are only cached while an indexer runs; a reorg drops the entries
+of the orphaned blocks, whose numbers are indexed again.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class CachedResponse:
+    __slots__ = ('status', 'headers', 'body', 'etag')
+
+    def __init__(self, status: int, headers: Headers, body: bytes, etag: Optional[str] = None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag or '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """``If-None-Match`` comparison; weak validators match their strong form"""
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, optionally shared through MongoDB"""
+
+    def __init__(self, maxsize: int = 1000, max_body: int = 1 << 20, collection=None, ttl: float = 600):
+        """
+        Args:
+            maxsize: Maximum number of responses kept in memory
+            max_body: Larger responses are not cached
+            collection: Motor collection shared by workers, or None
+            ttl: Seconds a shared entry is kept
+        """
+        self.maxsize = maxsize
+        self.max_body = max_body
+        self.collection = collection
+        self.ttl = ttl
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[str, Tuple[int, CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def ensure_indexes(self) -> None:
+        """Expire shared entries and select them by block on reorgs"""
+        if self.collection is None:
+            return
+        await self.collection.create_index('expires_at', expireAfterSeconds=0)
+        await self.collection.create_index('block')
+
+    @staticmethod
+    def key(path: str, query: bytes, block: int) -> str:
+        # Parameter order does not matter to the routes
+        params = b'&'.join(sorted(query.split(b'&'))) if query else b''
+        return hashlib.blake2b(f'{block}|{path}|'.encode() + params, digest_size=20).hexdigest()
+
+    # ============ Lookup ============
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Cached response for a key, from memory or the shared collection"""
+        with self._lock:
+            found = self._entries.get(key)
+            if found is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return found[1]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({'_id': key})
+            except PyMongoError as e:
+                logger.warning(f"Shared response cache unavailable: {e}")
+                doc = None
+            if doc is not None:
+                response = CachedResponse(
+                    doc['status'], [(name.encode(), value.encode()) for name, value in doc['headers']],
+                    bytes(doc['body']), doc['etag']
+                )
+                self._remember(key, doc['block'], response)
+                self.shared_hits += 1
+                return response
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, block: int, response: CachedResponse) -> None:
+        """Store a response rendered at ``block``"""
+        self._remember(key, block, response)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one({'_id': key}, {
+                'block': block,
+                'status': response.status,
+                'headers': [(name.decode(), value.decode()) for name, value in response.headers],
+                'body': response.body,
+                'etag': response.etag,
+                'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+            }, upsert=True)
+        except PyMongoError as e:
+            logger.warning(f"Could not share cached response: {e}")
+
+    def _remember(self, key: str, block: int, response: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = (block, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # ============ Indexer projection ============
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Nothing to invalidate: responses of new blocks are stored under new keys"""
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Drop the responses rendered at orphaned blocks, whose numbers are indexed again"""
+        block = event['block_number']
+        with self._lock:
+            for key in [key for key, (stored, _) in self._entries.items() if stored >= block]:
+                del self._entries[key]
+        if self.collection is not None:
+            await self.collection.delete_many({'block': {'$gte': block}})
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and configuration"""
+        total = self.hits + self.shared_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_rate': (self.hits + self.shared_hits) / total if total else 0.0,
+            'evictions': self.evictions,
+            'shared': self.collection is not None,
+        }
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached GET responses with ETag revalidation"""
+
+    def __init__(
+        self,
+        app,
+        cache: ResponseCache,
+        version: Callable[[], Optional[int]],
+        prefixes: Sequence[str] = ('/api/governance/',),
+        exclude: Sequence[str] = (),
+        bypass: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        max_age: int = 0
+    ):
+        """
+        Args:
+            app: ASGI application
+            cache: Response store
+            version: Returns the last indexed block, or None to bypass the cache
+            prefixes: Paths whose GET responses are cached
+            exclude: Path prefixes never cached (streams, live counters)
+            bypass: Returns True for other requests not answered from the index,
+                e.g. reads of the chain head, which are never cached
+            max_age: ``Cache-Control`` max-age; 0 makes clients revalidate every time
+        """
+        self.app = app
+        self.cache = cache
+        self.version = version
+        self.prefixes = tuple(prefixes)
+        self.exclude = tuple(exclude)
+        self.bypass = bypass
+        self.cache_control = f'public, max-age={max_age}'.encode()
+
+    def _cacheable(self, scope) -> bool:
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return False
+        path = scope['path']
+        if not path.startswith(self.prefixes) or path.startswith(self.exclude):
+            return False
+        return self.bypass is None or not self.bypass(scope)
+
+    async def __call__(self, scope, receive, send):
+        block = self.version() if self._cacheable(scope) else None
+        if block is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.cache.key(scope['path'], scope['query_string'], block)
+        response = await self.cache.get(key)
+        if response is None:
+            response = await self._render(scope, receive, send)
+            if response is None:
+                # Already sent: not cacheable
+                return
+            await self.cache.set(key, block, response)
+        await self._send(scope, send, response)
+
+    async def _render(self, scope, receive, send) -> Optional[CachedResponse]:
+        """
+        Run the app and capture its response
+
+        Returns:
+            The response, or None if it was passed through because it is not a
+            200 or its body exceeds ``max_body``
+        """
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def capture(message):
+            nonlocal size, passthrough
+            if passthrough:
+                await send(message)
+            elif message['type'] == 'http.response.start':
+                start.update(message)
+                if message['status'] != 200:
+                    passthrough = True
+                    await send(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                size += len(chunks[-1])
+                if size > self.cache.max_body:
+                    passthrough = True
+                    await send(start)
+                    await send({**message, 'body': b''.join(chunks)})
+
+        await self.app(scope, receive, capture)
+        if passthrough or not start:
+            return None
+        return CachedResponse(start['status'], list(start.get('headers', [])), b''.join(chunks))
+
+    async def _send(self, scope, send, response: CachedResponse) -> None:
+        validators = [(b'etag', response.etag.encode()), (b'cache-control', self.cache_control)]
+        if_none_match = next((value for name, value in scope['headers'] if name == b'if-none-match'), None)
+        if if_none_match is not None and etag_matches(if_none_match.decode('latin-1'), response.etag):
+            self.cache.not_modified += 1
+            await send({'type': 'http.response.start', 'status': 304, 'headers': validators})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        headers = [(name, value) for name, value in response.headers if name.lower() not in (b'etag', b'cache-control')]
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers + validators})
+        await send({'type': 'http.response.body', 'body': response.body})
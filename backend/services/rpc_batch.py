@@ -0,0 +1,102 @@
+"""
+JSON-RPC batching helpers
+
+web3.py 6 sends one HTTP request per RPC call. For fan-out reads (block
+headers, receipts, eth_call matrices) the calls are independent, so they are
+sent as a single JSON-RPC 2.0 batch instead. Providers that implement
+``make_batch_request`` (services/rpc_pool.py) send the batch themselves.
+"""
+
+import itertools
+import threading
+from typing import Any, Iterator, List, Sequence, Tuple
+
+import requests
+
+# Public endpoints commonly cap batches at 100-1000 entries
+DEFAULT_MAX_BATCH_SIZE = 100
+
+_session_lock = threading.Lock()
+_sessions = {}
+_ids = itertools.count(1)
+
+
+def _session(endpoint_uri: str) -> requests.Session:
+    """Keep-alive session per endpoint"""
+    with _session_lock:
+        if endpoint_uri not in _sessions:
+            _sessions[endpoint_uri] = requests.Session()
+        return _sessions[endpoint_uri]
+
+
+def build_batches(calls: Sequence[Tuple[str, List[Any]]], max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> Iterator[List[dict]]:
+    """Split (method, params) calls into JSON-RPC batch payloads"""
+    for offset in range(0, len(calls), max_batch_size):
+        yield [
+            {'jsonrpc': '2.0', 'id': next(_ids), 'method': method, 'params': params}
+            for method, params in calls[offset:offset + max_batch_size]
+        ]
+
+
+def batch_request(
+    w3,
+    calls: Sequence[Tuple[str, List[Any]]],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    timeout: float = 30,
+    allow_errors: bool = False
+) -> List[Any]:
+    """
+    Execute several JSON-RPC calls as batches
+
+    Args:
+        w3: Web3 instance whose provider endpoint is used
+        calls: Sequence of (method, params) tuples
+        max_batch_size: Maximum number of calls per HTTP request
+        timeout: Request timeout in seconds
+        allow_errors: Return None for failed calls instead of raising
+
+    Returns:
+        Raw results in the same order as ``calls``
+
+    Raises:
+        ValueError: If any call returned a JSON-RPC error and allow_errors is False
+    """
+    provider = w3.provider
+    results: List[Any] = []
+
+    for payload in build_batches(calls, max_batch_size):
+        if hasattr(provider, 'make_batch_request'):
+            responses = provider.make_batch_request(payload)
+        else:
+            response = _session(provider.endpoint_uri).post(
+                provider.endpoint_uri,
+                json=payload,
+                timeout=timeout
+            )
+            response.raise_for_status()
+            responses = response.json()
+
+        results.extend(match_responses(payload, responses, allow_errors))
+
+    return results
+
+
+def match_responses(payload: List[dict], responses: Any, allow_errors: bool) -> List[Any]:
+    """Order batch responses like the requests and surface errors"""
+    if isinstance(responses, dict):
+        # Some nodes answer a rejected batch with a single error object
+        raise ValueError(responses.get('error', responses))
+
+    by_id = {item.get('id'): item for item in responses}
+    results = []
+    for request in payload:
+        item = by_id.get(request['id'])
+        if item is None:
+            raise ValueError(f"Missing response for {request['method']}")
+        if 'error' in item:
+            if not allow_errors:
+                raise ValueError(item['error'])
+            results.append(None)
+            continue
+        results.append(item.get('result'))
+    return results
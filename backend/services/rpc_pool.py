@@ -0,0 +1,521 @@
+"""
+Multi-endpoint JSON-RPC pool
+
+Spreads RPC traffic over several endpoints (``RPC_URLS``) instead of a
+single public node. Every endpoint keeps a moving average of its latency
+and error rate; each request goes to the healthiest endpoint, fails over to
+the next one on transport errors, and reads are hedged: if the first
+endpoint has not answered within a latency-derived delay, the request is
+also sent to the runner-up and the first answer wins. Endpoints that fail
+are benched with exponential backoff. Connections are kept alive per
+endpoint.
+
+``PooledHTTPProvider`` / ``AsyncPooledHTTPProvider`` plug a pool into
+web3, so contract calls, ``rpc_batch.batch_request`` and everything built on
+them use it transparently. Every round trip is counted and timed per
+method in services/metrics.py.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+
+from services.metrics import RPC_CALLS, RPC_DURATION, RPC_ERRORS, add_timing
+from services.rpc_batch import DEFAULT_MAX_BATCH_SIZE, build_batches, match_responses
+
+logger = logging.getLogger(__name__)
+
+# Never hedged: a duplicate send is harmless but wasteful, and nonces are
+# managed locally anyway
+WRITE_METHODS = frozenset({'eth_sendRawTransaction', 'eth_sendTransaction'})
+
+DEFAULT_RPC_URL = 'https://ethereum-sepolia-rpc.publicnode.com'
+
+
+class RPCEndpointError(ConnectionError):
+    """Transport-level failure of one endpoint (connection, timeout, HTTP 429/5xx)"""
+
+
+def parse_urls(urls: Union[str, Sequence[str]]) -> List[str]:
+    """Accept a list or a comma-separated string of RPC URLs"""
+    if isinstance(urls, str):
+        urls = urls.split(',')
+    return [url.strip() for url in urls if url and url.strip()]
+
+
+def rpc_urls_from_env(default: str = DEFAULT_RPC_URL) -> List[str]:
+    """RPC_URLS (comma-separated), falling back to RPC_URL"""
+    return parse_urls(os.getenv('RPC_URLS') or os.getenv('RPC_URL') or default)
+
+
+def _encode(payload: Union[bytes, Dict, List]) -> bytes:
+    return payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+
+
+def _requests(payload: Union[bytes, Dict, List]) -> List[Dict[str, Any]]:
+    if isinstance(payload, bytes):
+        payload = json.loads(payload)
+    return payload if isinstance(payload, list) else [payload]
+
+
+def _is_read(payload: Union[bytes, Dict, List]) -> bool:
+    return all(request.get('method') not in WRITE_METHODS for request in _requests(payload))
+
+
+def _record(requests_: List[Dict[str, Any]], response: Any, seconds: float) -> None:
+    """
+    Record one round trip in the RPC metrics
+
+    Args:
+        requests_: The request objects sent (one, or a batch)
+        response: Decoded response, or None when every endpoint failed
+        seconds: Wall time of the round trip, hedges and failovers included
+    """
+    RPC_DURATION.observe(seconds, method=requests_[0].get('method') if len(requests_) == 1 else 'batch')
+    if response is None:
+        failed = None
+    else:
+        responses = response if isinstance(response, list) else [response]
+        failed = {item.get('id') for item in responses if isinstance(item, dict) and 'error' in item}
+    for request in requests_:
+        method = request.get('method')
+        RPC_CALLS.inc(method=method)
+        if failed is None or request.get('id') in failed:
+            RPC_ERRORS.inc(method=method)
+    add_timing('rpc', seconds)
+
+
+class Endpoint:
+    """Health statistics of a single RPC endpoint"""
+
+    def __init__(self, url: str, alpha: float = 0.2):
+        """
+        Args:
+            url: JSON-RPC endpoint
+            alpha: Weight of the newest sample in the moving averages
+        """
+        self.url = url
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def score(self) -> float:
+        """Expected cost of a request; lower is better, untried endpoints first"""
+        return ((self.latency or 0.0) + 0.01) * (1 + 10 * self.error_rate)
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.latency = latency if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * latency
+        self.error_rate *= 1 - self.alpha
+        self.failures = 0
+
+    def record_failure(self, max_cooldown: float = 60) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        self.failures += 1
+        self.down_until = time.monotonic() + min(2 ** (self.failures - 1), max_cooldown)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'available': self.available(time.monotonic()),
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class _EndpointPool:
+    """Endpoint ranking and hedging policy shared by the sync and async pools"""
+
+    def __init__(
+        self,
+        urls: Union[str, Sequence[str]],
+        timeout: float = 30,
+        hedge_delay: Optional[float] = None,
+        min_hedge_delay: float = 0.05,
+        max_hedge_delay: float = 2.0
+    ):
+        """
+        Args:
+            urls: RPC endpoints (list or comma-separated string)
+            timeout: Per-request timeout in seconds
+            hedge_delay: Fixed delay before a read is hedged; None derives it
+                from the primary endpoint's latency
+            min_hedge_delay: Lower bound of the derived hedge delay
+            max_hedge_delay: Upper bound of the derived hedge delay
+        """
+        urls = parse_urls(urls)
+        if not urls:
+            raise ValueError("At least one RPC URL is required")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.timeout = timeout
+        self.fixed_hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.hedged = 0
+        self.hedges_won = 0
+        self.failovers = 0
+
+    @property
+    def endpoint_uri(self) -> str:
+        """Currently preferred endpoint"""
+        return self.ranked()[0].url
+
+    def ranked(self) -> List[Endpoint]:
+        """Available endpoints by score, then benched ones by time until they return"""
+        now = time.monotonic()
+        return sorted(
+            self.endpoints,
+            key=lambda e: (not e.available(now), e.score() if e.available(now) else e.down_until)
+        )
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        if self.fixed_hedge_delay is not None:
+            return self.fixed_hedge_delay
+        if endpoint.latency is None:
+            return self.max_hedge_delay
+        return min(max(2 * endpoint.latency, self.min_hedge_delay), self.max_hedge_delay)
+
+    def _check_response(self, status: int, endpoint: Endpoint) -> None:
+        if status == 429 or status >= 500:
+            raise RPCEndpointError(f"{endpoint.url} returned HTTP {status}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'endpoints': [endpoint.stats() for endpoint in self.ranked()],
+            'hedged': self.hedged,
+            'hedges_won': self.hedges_won,
+            'failovers': self.failovers,
+        }
+
+
+class RPCPool(_EndpointPool):
+    """Thread-safe pool over ``requests`` keep-alive sessions"""
+
+    def __init__(self, urls: Union[str, Sequence[str]], pool_size: int = 20, max_workers: int = 16, **kwargs):
+        """
+        Args:
+            urls: RPC endpoints (list or comma-separated string)
+            pool_size: Keep-alive connections per endpoint
+            max_workers: Threads available for hedged requests
+            **kwargs: See ``_EndpointPool``
+        """
+        super().__init__(urls, **kwargs)
+        self._sessions: Dict[str, requests.Session] = {}
+        for endpoint in self.endpoints:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._sessions[endpoint.url] = session
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rpc-hedge')
+        self._lock = threading.Lock()
+
+    def _post(self, endpoint: Endpoint, data: bytes) -> Any:
+        start = time.monotonic()
+        try:
+            response = self._sessions[endpoint.url].post(
+                endpoint.url,
+                data=data,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+            self._check_response(response.status_code, endpoint)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError, RPCEndpointError) as e:
+            with self._lock:
+                endpoint.record_failure()
+            raise e if isinstance(e, RPCEndpointError) else RPCEndpointError(f"{endpoint.url}: {e}") from e
+        with self._lock:
+            endpoint.record_success(time.monotonic() - start)
+        return result
+
+    def send(self, payload: Union[bytes, Dict, List], hedge: Optional[bool] = None) -> Any:
+        """
+        Send a JSON-RPC request or batch and return the decoded response
+
+        Args:
+            payload: Request object, batch list, or pre-encoded JSON
+            hedge: Hedge to a second endpoint when slow; defaults to True for reads
+
+        Raises:
+            RPCEndpointError: Every endpoint failed
+        """
+        requests_ = _requests(payload)
+        if hedge is None:
+            hedge = _is_read(requests_)
+        start = time.perf_counter()
+        try:
+            response = self._send(_encode(payload), hedge)
+        except RPCEndpointError:
+            _record(requests_, None, time.perf_counter() - start)
+            raise
+        _record(requests_, response, time.perf_counter() - start)
+        return response
+
+    def _send(self, data: bytes, hedge: bool) -> Any:
+        ranked = self.ranked()
+
+        if not hedge or len(ranked) == 1:
+            error = None
+            for attempt, endpoint in enumerate(ranked):
+                try:
+                    return self._post(endpoint, data)
+                except RPCEndpointError as e:
+                    error = e
+                    if attempt + 1 < len(ranked):
+                        self.failovers += 1
+            raise error
+
+        remaining = list(ranked)
+        primary = remaining.pop(0)
+        pending = {self._executor.submit(self._post, primary, data): primary}
+        delay = self.hedge_delay(primary)
+        # One speculative hedge per request; further endpoints are only tried on failure
+        can_hedge = True
+        error = None
+
+        while True:
+            timeout = delay if remaining and can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                endpoint = remaining.pop(0)
+                pending[self._executor.submit(self._post, endpoint, data)] = endpoint
+                can_hedge = False
+                self.hedged += 1
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except RPCEndpointError as e:
+                    error = e
+                    continue
+                if endpoint is not primary:
+                    self.hedges_won += 1
+                return result
+
+            if not pending:
+                if not remaining:
+                    raise error
+                endpoint = remaining.pop(0)
+                pending[self._executor.submit(self._post, endpoint, data)] = endpoint
+                self.failovers += 1
+
+    def batch_request(
+        self,
+        calls: Sequence[Tuple[str, List[Any]]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        allow_errors: bool = False
+    ) -> List[Any]:
+        """``rpc_batch.batch_request`` over the pool"""
+        results: List[Any] = []
+        for payload in build_batches(calls, max_batch_size):
+            results.extend(match_responses(payload, self.send(payload), allow_errors))
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        for session in self._sessions.values():
+            session.close()
+
+
+class AsyncRPCPool(_EndpointPool):
+    """Pool over a shared aiohttp session for AsyncWeb3"""
+
+    def __init__(
+        self,
+        urls: Union[str, Sequence[str]],
+        session: Optional[aiohttp.ClientSession] = None,
+        pool_size: int = 100,
+        **kwargs
+    ):
+        """
+        Args:
+            urls: RPC endpoints (list or comma-separated string)
+            session: aiohttp session to share with other clients (optional)
+            pool_size: Maximum concurrent connections of the owned session
+            **kwargs: See ``_EndpointPool``
+        """
+        super().__init__(urls, **kwargs)
+        self._owns_session = session is None
+        self.session = session
+        self.pool_size = pool_size
+        # Losing hedges keep running so their latency is still recorded
+        self._background: set = set()
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self.session
+
+    async def _post(self, endpoint: Endpoint, data: bytes) -> Any:
+        start = time.monotonic()
+        try:
+            async with self._ensure_session().post(
+                endpoint.url,
+                data=data,
+                headers={'Content-Type': 'application/json'}
+            ) as response:
+                self._check_response(response.status, endpoint)
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, RPCEndpointError) as e:
+            endpoint.record_failure()
+            raise e if isinstance(e, RPCEndpointError) else RPCEndpointError(f"{endpoint.url}: {e!r}") from e
+        endpoint.record_success(time.monotonic() - start)
+        return result
+
+    def _spawn(self, endpoint: Endpoint, data: bytes) -> asyncio.Task:
+        task = asyncio.ensure_future(self._post(endpoint, data))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        # Failures of abandoned hedges are already recorded in the endpoint stats
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def send(self, payload: Union[bytes, Dict, List], hedge: Optional[bool] = None) -> Any:
+        """Async ``RPCPool.send``"""
+        requests_ = _requests(payload)
+        if hedge is None:
+            hedge = _is_read(requests_)
+        start = time.perf_counter()
+        try:
+            response = await self._send(_encode(payload), hedge)
+        except RPCEndpointError:
+            _record(requests_, None, time.perf_counter() - start)
+            raise
+        _record(requests_, response, time.perf_counter() - start)
+        return response
+
+    async def _send(self, data: bytes, hedge: bool) -> Any:
+        ranked = self.ranked()
+
+        if not hedge or len(ranked) == 1:
+            error = None
+            for attempt, endpoint in enumerate(ranked):
+                try:
+                    return await self._post(endpoint, data)
+                except RPCEndpointError as e:
+                    error = e
+                    if attempt + 1 < len(ranked):
+                        self.failovers += 1
+            raise error
+
+        remaining = list(ranked)
+        primary = remaining.pop(0)
+        pending = {self._spawn(primary, data): primary}
+        delay = self.hedge_delay(primary)
+        can_hedge = True
+        error = None
+
+        while True:
+            timeout = delay if remaining and can_hedge else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                endpoint = remaining.pop(0)
+                pending[self._spawn(endpoint, data)] = endpoint
+                can_hedge = False
+                self.hedged += 1
+                continue
+
+            for task in done:
+                endpoint = pending.pop(task)
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                if endpoint is not primary:
+                    self.hedges_won += 1
+                return task.result()
+
+            if not pending:
+                if not remaining:
+                    raise error
+                endpoint = remaining.pop(0)
+                pending[self._spawn(endpoint, data)] = endpoint
+                self.failovers += 1
+
+    async def batch_request(
+        self,
+        calls: Sequence[Tuple[str, List[Any]]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        allow_errors: bool = False
+    ) -> List[Any]:
+        """``rpc_batch.batch_request`` over the pool"""
+        results: List[Any] = []
+        for payload in build_batches(calls, max_batch_size):
+            results.extend(match_responses(payload, await self.send(payload), allow_errors))
+        return results
+
+    async def close(self) -> None:
+        """Close the aiohttp session if this pool created it"""
+        for task in list(self._background):
+            task.cancel()
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """web3 provider sending every request through an ``RPCPool``"""
+
+    def __init__(self, pool: RPCPool):
+        super().__init__()
+        self.pool = pool
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.pool.endpoint_uri
+
+    def __str__(self) -> str:
+        return f"RPC pool {[endpoint.url for endpoint in self.pool.endpoints]}"
+
+    def make_request(self, method, params):
+        return self.pool.send(self.encode_rpc_request(method, params), hedge=method not in WRITE_METHODS)
+
+    def make_batch_request(self, payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Used by ``rpc_batch.batch_request``"""
+        return self.pool.send(payload)
+
+
+class AsyncPooledHTTPProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider sending every request through an ``AsyncRPCPool``"""
+
+    def __init__(self, pool: AsyncRPCPool):
+        super().__init__()
+        self.pool = pool
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.pool.endpoint_uri
+
+    def __str__(self) -> str:
+        return f"Async RPC pool {[endpoint.url for endpoint in self.pool.endpoints]}"
+
+    async def make_request(self, method, params):
+        return await self.pool.send(self.encode_rpc_request(method, params), hedge=method not in WRITE_METHODS)
@@ -0,0 +1,228 @@
+"""
+Versioned governance state
+
+Records how proposals, role assignments and the governance stats looked
+after every indexed block, so audit queries ("what was the state at block
+N?") are answered from MongoDB instead of an archive node.
+
+Each change produces a version document in ``state_versions``::
+
+    {kind, key, valid_from, valid_to, state}
+
+valid for blocks ``valid_from <= N < valid_to``; the current version has
+``valid_to = OPEN``. Lookups use the (kind, key, valid_from, valid_to)
+interval index. Changes within a block are coalesced into one version
+holding the state at the end of the block.
+
+History starts at the block the indexer had reached when it was enabled
+(``baseline`` versions the existing state there), recorded as
+``first_block`` in ``indexer_state``. A missing version before that block
+does not mean the record did not exist, so earlier blocks must not be
+queried.
+
+The projection reads the state maintained by the other projections, so it
+must be registered before them: when it sees the first event of a block,
+the others have not applied it yet and still hold the previous block's
+final state.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from web3 import Web3
+
+from services.contracts import ROLE_NAMES
+from services.governance_stats import STATS_ID
+
+logger = logging.getLogger(__name__)
+
+OPEN = 2 ** 63 - 1
+
+PROPOSAL = 'proposal'
+ROLES = 'roles'
+STATS = 'stats'
+
+HISTORY_ID = 'state_history'
+
+ROLE_BY_HASH = {Web3.to_hex(Web3.keccak(text=f'{name}_ROLE')): name for name in ROLE_NAMES}
+
+
+async def ensure_indexes(db) -> None:
+    """Create the interval index behind as-of-block lookups"""
+    await db.state_versions.create_index(
+        [('kind', ASCENDING), ('key', ASCENDING), ('valid_from', DESCENDING), ('valid_to', ASCENDING)]
+    )
+    # Reorg rollbacks select versions by block
+    await db.state_versions.create_index('valid_from')
+    await db.state_versions.create_index('valid_to')
+
+
+async def state_at(db, kind: str, key: Any, block: int) -> Optional[Dict[str, Any]]:
+    """
+    State of one record at the end of ``block``
+
+    Returns:
+        The stored state, or None if the record did not exist then (or was
+        not versioned yet)
+    """
+    version = await db.state_versions.find_one(
+        {'kind': kind, 'key': str(key), 'valid_from': {'$lte': block}, 'valid_to': {'$gt': block}},
+        {'_id': 0, 'state': 1},
+        sort=[('valid_from', DESCENDING)]
+    )
+    return version['state'] if version else None
+
+
+async def first_block(db) -> Optional[int]:
+    """First block whose state is versioned, or None if the history is not initialized"""
+    state = await db.indexer_state.find_one({'_id': HISTORY_ID})
+    return state['first_block'] if state else None
+
+
+class StateHistory:
+    """Indexer projection writing a version per changed record and block"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Motor database with the indexed ``proposals`` and ``governance_stats``
+        """
+        self.db = db
+        self._block: Optional[int] = None
+        self._proposals: Set[int] = set()
+        self._roles: Dict[str, List[Tuple[str, bool]]] = {}
+        self._stats = False
+
+    async def ensure_indexes(self) -> None:
+        await ensure_indexes(self.db)
+
+    # ============ Indexer projection ============
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Note what an event changes; versions are written once its block is complete"""
+        if self._block is not None and event['block_number'] != self._block:
+            await self.flush()
+        self._block = event['block_number']
+
+        args = event['args']
+        self._stats = True
+        if event['contract'] == 'ProposalManager' and 'proposalId' in args:
+            self._proposals.add(int(args['proposalId']))
+        elif event['contract'] == 'GovernanceCore' and event['event'] in ('RoleGranted', 'RoleRevoked'):
+            role = ROLE_BY_HASH.get(args['role'])
+            if role is not None:
+                self._roles.setdefault(args['account'], []).append((role, event['event'] == 'RoleGranted'))
+
+    async def checkpoint(self, block_number: int) -> None:
+        """Every projection has applied the page: record its last block"""
+        await self.flush()
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Drop the versions of orphaned blocks and reopen the ones they replaced"""
+        block = event['block_number']
+        await self.db.state_versions.delete_many({'valid_from': {'$gte': block}})
+        await self.db.state_versions.update_many(
+            {'valid_to': {'$gte': block, '$lt': OPEN}},
+            {'$set': {'valid_to': OPEN}}
+        )
+
+    # ============ Versions ============
+
+    async def flush(self) -> None:
+        """Write the versions of the pending block"""
+        if self._block is None:
+            return
+        block, self._block = self._block, None
+        changes: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+
+        if self._proposals:
+            docs = await self.db.proposals.find({'id': {'$in': list(self._proposals)}}, {'_id': 0}).to_list(None)
+            found = {doc['id']: doc for doc in docs}
+            changes.extend((PROPOSAL, str(pid), found.get(pid)) for pid in sorted(self._proposals))
+
+        for account, updates in self._roles.items():
+            roles = set((await state_at(self.db, ROLES, account, block - 1) or {}).get('roles', []))
+            for role, granted in updates:
+                (roles.add if granted else roles.discard)(role)
+            changes.append((ROLES, account, {'roles': [name for name in ROLE_NAMES if name in roles]}))
+
+        if self._stats:
+            stats = await self.db.governance_stats.find_one({'_id': STATS_ID}, {'_id': 0})
+            changes.append((STATS, STATS_ID, stats))
+
+        self._proposals, self._roles, self._stats = set(), {}, False
+        await self._write(block, changes)
+
+    async def _write(self, block: int, changes: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Close the open versions and open new ones at ``block``; a None state ends the record"""
+        operations = []
+        for kind, key, state in changes:
+            # Re-running a block after a crash replaces its version
+            operations.append(UpdateOne(
+                {'kind': kind, 'key': key, 'valid_to': OPEN, 'valid_from': {'$lt': block}},
+                {'$set': {'valid_to': block}}
+            ))
+            operations.append(UpdateOne(
+                {'kind': kind, 'key': key, 'valid_from': block},
+                {'$set': {'valid_to': OPEN, 'state': state}},
+                upsert=True
+            ) if state is not None else UpdateOne(
+                {'kind': kind, 'key': key, 'valid_from': block},
+                {'$set': {'valid_to': block}}
+            ))
+        if operations:
+            await self.db.state_versions.bulk_write(operations, ordered=True)
+
+    async def baseline(self, block: int) -> int:
+        """
+        Version the current state at ``block`` if nothing is versioned yet
+
+        Lets as-of queries work from ``block`` on for data indexed before
+        the history was enabled, and records the first versioned block.
+
+        Returns:
+            Number of versions written
+        """
+        if await first_block(self.db) is not None:
+            return 0
+        oldest = await self.db.state_versions.find_one({}, {'valid_from': 1}, sort=[('valid_from', ASCENDING)])
+        if oldest is not None:
+            # Versioned before the first block was recorded
+            await self._record_first_block(oldest['valid_from'])
+            return 0
+
+        changes = [
+            (PROPOSAL, str(doc['id']), doc)
+            async for doc in self.db.proposals.find({}, {'_id': 0})
+        ]
+        roles: Dict[str, Set[str]] = {}
+        cursor = self.db.events.find(
+            {'contract': 'GovernanceCore', 'event': {'$in': ['RoleGranted', 'RoleRevoked']}},
+            {'_id': 0, 'event': 1, 'args': 1}
+        ).sort([('block_number', ASCENDING), ('log_index', ASCENDING)])
+        async for event in cursor:
+            role = ROLE_BY_HASH.get(event['args']['role'])
+            if role is not None:
+                held = roles.setdefault(event['args']['account'], set())
+                (held.add if event['event'] == 'RoleGranted' else held.discard)(role)
+        changes.extend(
+            (ROLES, account, {'roles': [name for name in ROLE_NAMES if name in held]})
+            for account, held in roles.items()
+        )
+        stats = await self.db.governance_stats.find_one({'_id': STATS_ID}, {'_id': 0})
+        if stats is not None:
+            changes.append((STATS, STATS_ID, stats))
+
+        await self._write(block, changes)
+        await self._record_first_block(block)
+        if changes:
+            logger.info(f"Versioned {len(changes)} existing records at block {block}")
+        return len(changes)
+
+    async def _record_first_block(self, block: int) -> None:
+        await self.db.indexer_state.update_one(
+            {'_id': HISTORY_ID},
+            {'$setOnInsert': {'first_block': block}},
+            upsert=True
+        )
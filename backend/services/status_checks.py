@@ -0,0 +1,108 @@
+"""
+Status check storage
+
+Status checks are stored with a native BSON date in ``timestamp`` and read
+in (timestamp, id) order, so time ranges and keyset pagination are served
+by one index. Older documents stored the timestamp as an ISO string;
+``migrate_string_timestamps`` converts them in place.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from bson.codec_options import CodecOptions
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SORT = [('timestamp', ASCENDING), ('id', ASCENDING)]
+PROJECTION = {'_id': 0, 'id': 1, 'client_name': 1, 'timestamp': 1}
+
+
+def collection(db):
+    """``status_checks``, decoding dates as timezone-aware UTC datetimes"""
+    return db.status_checks.with_options(codec_options=CodecOptions(tz_aware=True))
+
+
+async def ensure_indexes(db) -> None:
+    """Create the index behind range queries and cursor pagination"""
+    await db.status_checks.create_index(SORT)
+
+
+async def migrate_string_timestamps(db, batch_size: int = 1000) -> int:
+    """
+    Convert ISO string timestamps to BSON dates
+
+    Args:
+        db: Motor database
+        batch_size: Documents converted per bulk write
+
+    Returns:
+        Number of documents converted
+    """
+    converted = 0
+    while True:
+        docs = await db.status_checks.find(
+            {'timestamp': {'$type': 'string'}}, {'timestamp': 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        await db.status_checks.bulk_write([
+            UpdateOne({'_id': doc['_id']}, {'$set': {'timestamp': _parse_timestamp(doc['timestamp'])}})
+            for doc in docs
+        ], ordered=False)
+        converted += len(docs)
+    if converted:
+        logger.info(f"Converted {converted} status check timestamps to BSON dates")
+    return converted
+
+
+def _parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+# ============ Cursors ============
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor after ``doc``: millisecond timestamp (BSON date precision) and id"""
+    return f"{int(doc['timestamp'].timestamp() * 1000)}_{doc['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Raises:
+        ValueError: Malformed cursor
+    """
+    millis, _, check_id = cursor.partition('_')
+    if not check_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), check_id
+
+
+def build_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Filter for status checks in ``[since, until)`` that come after ``cursor``
+
+    Raises:
+        ValueError: Malformed cursor
+    """
+    timestamp: Dict[str, Any] = {}
+    if since is not None:
+        timestamp['$gte'] = since
+    if until is not None:
+        timestamp['$lt'] = until
+    query: Dict[str, Any] = {'timestamp': timestamp} if timestamp else {}
+    if cursor:
+        after, after_id = decode_cursor(cursor)
+        keyset = {'$or': [
+            {'timestamp': {'$gt': after}},
+            {'timestamp': after, 'id': {'$gt': after_id}},
+        ]}
+        query = {'$and': [query, keyset]} if query else keyset
+    return query
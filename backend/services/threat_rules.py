@@ -0,0 +1,255 @@
+"""
+Threat rule engine for proposal screening
+
+Keyword rules are compiled into a single Aho-Corasick automaton. Each regex
+rule is compiled on its own, so every matching rule is reported even where
+rules overlap, and the automaton also holds the longest literal each regex
+requires: a regex only runs on descriptions containing its literal (regexes
+without one always run). The cost of screening a description therefore
+depends on its length and the rules that can match, not on the size of the
+rule set. Rules are loaded from a JSON or plain-text file that is re-read
+when it changes on disk.
+
+JSON format::
+
+    {"rules": [
+        {"id": "drain", "type": "keyword", "pattern": "drain", "score": 5},
+        {"id": "selfdestruct", "type": "regex", "pattern": "self-?destruct", "score": 8}
+    ]}
+
+Plain-text files hold one keyword per line (score 1, ``#`` comments).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Shorter required literals filter too little to be worth a prefilter entry
+MIN_LITERAL = 3
+
+
+class Rule(NamedTuple):
+    id: str
+    pattern: str
+    kind: str = 'keyword'
+    score: float = 1.0
+
+
+class RuleMatch(NamedTuple):
+    rule_id: str
+    score: float
+    matched: str
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        """
+        Args:
+            patterns: (lowercase pattern, payload) pairs; payload is returned on match
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(payload)
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0) if state else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> List[Any]:
+        """Payloads of every pattern occurring in ``text`` (each reported once)"""
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._out[state]:
+                found.update(self._out[state])
+        return sorted(found)
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    Longest lowercase ASCII literal that every match of ``pattern`` contains
+
+    Only literals at the top level of the pattern are considered, so the
+    result is None for alternations and anything shorter than
+    ``MIN_LITERAL``.
+    """
+    best, run = '', []
+    for op, arg in list(sre_parse.parse(pattern, re.IGNORECASE)) + [(None, None)]:
+        if op == sre_parse.LITERAL and arg < 128:
+            run.append(chr(arg).lower())
+            continue
+        if len(run) > len(best):
+            best = ''.join(run)
+        run = []
+    return best if len(best) >= MIN_LITERAL else None
+
+
+class CompiledRules:
+    """Immutable compiled form of a rule set"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.regexes: Dict[int, re.Pattern] = {
+            i: re.compile(rule.pattern, re.IGNORECASE) for i, rule in enumerate(rules) if rule.kind == 'regex'
+        }
+
+        # One automaton for keywords ('k', i) and the literals regexes need ('r', i)
+        patterns = [(rule.pattern.lower(), ('k', i)) for i, rule in enumerate(rules) if rule.kind == 'keyword']
+        self.unfiltered: List[int] = []
+        for i, regex in self.regexes.items():
+            literal = required_literal(regex.pattern)
+            if literal is None:
+                self.unfiltered.append(i)
+            else:
+                patterns.append((literal, ('r', i)))
+        self.automaton = AhoCorasick(patterns)
+
+    def match(self, text: str) -> List[RuleMatch]:
+        matches = {}
+        candidates = list(self.unfiltered)
+        for kind, index in self.automaton.search(text.lower()):
+            if kind == 'r':
+                candidates.append(index)
+                continue
+            rule = self.rules[index]
+            matches[index] = RuleMatch(rule.id, rule.score, rule.pattern)
+
+        for index in candidates:
+            found = self.regexes[index].search(text)
+            if found is not None:
+                rule = self.rules[index]
+                matches[index] = RuleMatch(rule.id, rule.score, found.group())
+
+        return [matches[index] for index in sorted(matches)]
+
+
+def load_rules(path: str) -> List[Rule]:
+    """Read rules from a JSON or plain-text rule file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+            items = data['rules'] if isinstance(data, dict) else data
+            return [
+                Rule(
+                    id=str(item.get('id', item['pattern'])),
+                    pattern=item['pattern'],
+                    kind=item.get('type', 'keyword'),
+                    score=float(item.get('score', 1))
+                )
+                for item in items
+            ]
+        return [
+            Rule(id=line, pattern=line)
+            for line in (raw.strip() for raw in f)
+            if line and not line.startswith('#')
+        ]
+
+
+class RuleEngine:
+    """Hot-reloadable compiled rule set"""
+
+    def __init__(self, rules: Optional[List[Rule]] = None, path: Optional[str] = None, reload_interval: float = 5):
+        """
+        Args:
+            rules: Rules used when no file is given or the file is missing
+            path: Rule file, re-read when its modification time changes
+            reload_interval: Minimum seconds between modification checks
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._fallback = rules or []
+        self._compiled = CompiledRules(self._fallback)
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str], **kwargs) -> "RuleEngine":
+        """Build an engine whose default rules are plain keywords"""
+        return cls([Rule(id=kw, pattern=kw) for kw in keywords], **kwargs)
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._compiled.rules)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recompile the rule file if it changed
+
+        A rule file that fails to parse or compile leaves the previous rule
+        set active.
+
+        Returns:
+            True if a new rule set was loaded
+        """
+        if not self.path:
+            return False
+        self._checked = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime and not force:
+            return False
+
+        try:
+            compiled = CompiledRules(load_rules(self.path))
+        except (OSError, ValueError, KeyError, re.error) as e:
+            print(f"Keeping previous threat rules, failed to load {self.path}: {e}")
+            self._mtime = mtime
+            return False
+
+        with self._lock:
+            self._compiled = compiled
+            self._mtime = mtime
+        print(f"Loaded {len(compiled.rules)} threat rules from {self.path}")
+        return True
+
+    def match(self, text: str) -> List[RuleMatch]:
+        """Every rule matching ``text``, with its score"""
+        if self.path and time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+        return self._compiled.match(text)
+
+    def score(self, text: str) -> Tuple[float, List[RuleMatch]]:
+        """Total score and matches for ``text``"""
+        matches = self.match(text)
+        return sum(match.score for match in matches), matches
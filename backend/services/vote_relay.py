@@ -0,0 +1,314 @@
+"""
+Batch vote relay
+
+Votes submitted through the API are queued and returned tracking IDs
+immediately.
+
+Every relayed vote carries the voter's EIP-712 signature of a ``Ballot``
+(proposal, support, weight) and is submitted through
+``ProposalManager.castVoteBySig``, so the contract checks the signature and
+credits the voter, not the relayer account that pays for the transaction.
+The signed weight must be the voter's effective power as resolved by the
+server. A voter with a queued, in-flight or confirmed relayed vote on a
+proposal is refused another one. A submitter task signs and sends queued
+votes in batches with pipelined nonces; a receipt poller checks all pending
+transactions with one JSON-RPC batch per new block instead of blocking on
+each receipt. Job status is stored in the ``vote_relay`` collection.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from pymongo import ASCENDING
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_SUBMITTED = 'submitted'
+STATUS_CONFIRMED = 'confirmed'
+STATUS_REVERTED = 'reverted'
+STATUS_FAILED = 'failed'
+STATUS_DROPPED = 'dropped'
+
+# Jobs holding a voter's vote on a proposal
+ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_SUBMITTED, STATUS_CONFIRMED]
+
+
+class InvalidVoteSignature(ValueError):
+    """The signature does not recover to the claimed voter"""
+
+
+class AlreadyRelayed(ValueError):
+    """The voter already has a relayed vote on the proposal"""
+
+
+def ballot(chain_id: int, contract: str, proposal_id: int, support: int, weight: int) -> Dict[str, Any]:
+    """EIP-712 typed data a voter signs to have a vote cast by ``castVoteBySig``"""
+    return {
+        'types': {
+            'EIP712Domain': [
+                {'name': 'name', 'type': 'string'},
+                {'name': 'version', 'type': 'string'},
+                {'name': 'chainId', 'type': 'uint256'},
+                {'name': 'verifyingContract', 'type': 'address'},
+            ],
+            'Ballot': [
+                {'name': 'proposalId', 'type': 'uint256'},
+                {'name': 'support', 'type': 'uint8'},
+                {'name': 'weight', 'type': 'uint256'},
+            ],
+        },
+        'primaryType': 'Ballot',
+        'domain': {'name': 'ProposalManager', 'version': '1', 'chainId': chain_id, 'verifyingContract': contract},
+        'message': {'proposalId': proposal_id, 'support': support, 'weight': weight},
+    }
+
+
+def recover_voter(typed_data: Dict[str, Any], signature: str) -> str:
+    """
+    Checksummed address that signed a ballot
+
+    Raises:
+        InvalidVoteSignature: Malformed signature
+    """
+    try:
+        return Account.recover_message(encode_typed_data(full_message=typed_data), signature=signature)
+    except Exception as e:
+        raise InvalidVoteSignature(f"Invalid signature: {e}") from e
+
+
+class VoteRelay:
+    """Queues, submits and tracks relayed votes"""
+
+    def __init__(
+        self,
+        chain,
+        db,
+        batch_size: int = 100,
+        poll_interval: float = 4,
+        receipt_timeout: float = 900
+    ):
+        """
+        Args:
+            chain: AsyncBlockchainService with a signing account
+            db: Motor database
+            batch_size: Maximum votes signed and sent per submission batch
+            poll_interval: Seconds between head checks of the receipt poller
+            receipt_timeout: Seconds after which an unmined vote is marked dropped
+        """
+        self.chain = chain
+        self.db = db
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # tx hash -> (tracking id, submitted at)
+        self._pending: Dict[str, tuple] = {}
+        self._last_polled_block: Optional[int] = None
+        self._tasks: List[asyncio.Task] = []
+        self._submit_lock = asyncio.Lock()
+        self._chain_id: Optional[int] = None
+
+    async def ensure_indexes(self) -> None:
+        await self.db.vote_relay.create_index('tracking_id', unique=True)
+        await self.db.vote_relay.create_index([('proposal_id', ASCENDING), ('voter', ASCENDING), ('status', ASCENDING)])
+        await self.db.vote_relay.create_index([('status', ASCENDING), ('created_at', ASCENDING)])
+
+    # ============ API ============
+
+    async def verify(self, voter: str, proposal_id: int, support: int, weight: int, signature: str) -> str:
+        """
+        Check that ``voter`` signed the ballot
+
+        Returns:
+            The checksummed voter address
+
+        Raises:
+            InvalidVoteSignature: The signature is malformed or by someone else
+        """
+        if self._chain_id is None:
+            self._chain_id = await self.chain.w3.eth.chain_id
+        voter = Web3.to_checksum_address(voter)
+        typed_data = ballot(self._chain_id, self.chain.proposal_manager.address, proposal_id, support, weight)
+        if recover_voter(typed_data, signature) != voter:
+            raise InvalidVoteSignature(f"Signature is not by {voter}")
+        return voter
+
+    async def submit(self, votes: List[Dict[str, Any]]) -> List[str]:
+        """
+        Queue verified votes for relaying
+
+        Args:
+            votes: Dicts with voter, proposal_id, support, weight, signature
+                and optional reason
+
+        Returns:
+            Tracking IDs in vote order
+
+        Raises:
+            AlreadyRelayed: A voter appears twice for a proposal or already
+                has an active relayed vote on it
+        """
+        keys = [(vote['proposal_id'], vote['voter']) for vote in votes]
+        async with self._submit_lock:
+            taken = {key for key in keys if keys.count(key) > 1}
+            active = self.db.vote_relay.find(
+                {'$or': [{'proposal_id': pid, 'voter': voter} for pid, voter in set(keys)],
+                 'status': {'$in': ACTIVE_STATUSES}},
+                {'_id': 0, 'proposal_id': 1, 'voter': 1}
+            )
+            taken.update([(job['proposal_id'], job['voter']) async for job in active])
+            if taken:
+                raise AlreadyRelayed(
+                    "Already relayed: " + ", ".join(f"{voter} on proposal {pid}" for pid, voter in sorted(taken))
+                )
+            return await self._enqueue(votes)
+
+    async def _enqueue(self, votes: List[Dict[str, Any]]) -> List[str]:
+        now = datetime.now(timezone.utc)
+        jobs = [
+            {
+                'tracking_id': str(uuid.uuid4()),
+                'voter': vote['voter'],
+                'proposal_id': vote['proposal_id'],
+                'support': vote['support'],
+                'weight': int(vote['weight']),
+                'signature': vote['signature'],
+                'reason': vote.get('reason'),
+                'status': STATUS_QUEUED,
+                'transaction_hash': None,
+                'block_number': None,
+                'error': None,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for vote in votes
+        ]
+        await self.db.vote_relay.insert_many([dict(job) for job in jobs])
+        for job in jobs:
+            self._queue.put_nowait(job)
+        return [job['tracking_id'] for job in jobs]
+
+    async def get(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a relayed vote"""
+        return await self.db.vote_relay.find_one({'tracking_id': tracking_id}, {'_id': 0})
+
+    # ============ Workers ============
+
+    async def _update(self, tracking_id: str, **fields) -> None:
+        fields['updated_at'] = datetime.now(timezone.utc)
+        await self.db.vote_relay.update_one({'tracking_id': tracking_id}, {'$set': fields})
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _submit_loop(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                hashes = await self.chain.cast_votes_by_sig([
+                    (job['proposal_id'], job['support'], job['weight'], job['voter'], job['signature'])
+                    for job in batch
+                ])
+            except Exception as e:
+                logger.error(f"Vote relay batch of {len(batch)} failed: {e}")
+                hashes = [None] * len(batch)
+
+            submitted_at = time.monotonic()
+            for job, tx_hash in zip(batch, hashes):
+                if tx_hash is not None:
+                    self._pending[tx_hash] = (job['tracking_id'], submitted_at)
+                try:
+                    if tx_hash is None:
+                        await self._update(job['tracking_id'], status=STATUS_FAILED, error='rejected by node')
+                    else:
+                        await self._update(job['tracking_id'], status=STATUS_SUBMITTED, transaction_hash=tx_hash)
+                except Exception as e:
+                    # The receipt poller still settles submitted votes
+                    logger.error(f"Could not record relay status of {job['tracking_id']}: {e}")
+
+    async def _poll_receipts(self) -> None:
+        """Check every pending transaction once per new block"""
+        if not self._pending:
+            return
+
+        head = await self.chain.w3.eth.block_number
+        if head == self._last_polled_block:
+            return
+        self._last_polled_block = head
+
+        hashes = list(self._pending)
+        receipts = await self.chain.pool.batch_request(
+            [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes],
+            allow_errors=True
+        )
+
+        now = time.monotonic()
+        for tx_hash, receipt in zip(hashes, receipts):
+            tracking_id, submitted_at = self._pending[tx_hash]
+            if receipt is None:
+                if now - submitted_at > self.receipt_timeout:
+                    await self._settle(tx_hash, status=STATUS_DROPPED, error='receipt timeout')
+                continue
+
+            succeeded = int(receipt['status'], 16) == 1
+            await self._settle(
+                tx_hash,
+                status=STATUS_CONFIRMED if succeeded else STATUS_REVERTED,
+                block_number=int(receipt['blockNumber'], 16),
+                gas_used=int(receipt['gasUsed'], 16)
+            )
+
+    async def _settle(self, tx_hash: str, **fields) -> None:
+        """Record the final status of a transaction; it stays pending until that is stored"""
+        tracking_id, _ = self._pending[tx_hash]
+        try:
+            await self._update(tracking_id, **fields)
+        except Exception as e:
+            logger.error(f"Could not record relay status of {tracking_id}, will retry: {e}")
+            # Retried on the next poll, even without a new block
+            self._last_polled_block = None
+            return
+        del self._pending[tx_hash]
+
+    async def _receipt_loop(self) -> None:
+        while True:
+            try:
+                await self._poll_receipts()
+            except Exception as e:
+                logger.error(f"Receipt polling failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _recover(self) -> None:
+        """Resume jobs left unfinished by a previous process"""
+        async for job in self.db.vote_relay.find({'status': STATUS_SUBMITTED}):
+            self._pending[job['transaction_hash']] = (job['tracking_id'], time.monotonic())
+        async for job in self.db.vote_relay.find({'status': STATUS_QUEUED}).sort('created_at', 1):
+            self._queue.put_nowait(job)
+
+    async def start(self) -> None:
+        """Recover unfinished jobs and start the worker tasks"""
+        await self.ensure_indexes()
+        await self._recover()
+        self._tasks = [
+            asyncio.create_task(self._submit_loop()),
+            asyncio.create_task(self._receipt_loop()),
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; unfinished jobs are recovered on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,291 @@
+"""
+Off-chain vote tallies
+
+Keeps the for/against/abstain totals of every proposal in NumPy columns,
+built once from the indexed VoteCast events and then updated per
+VoteCast event by the event indexer, so live tallies for any number of
+proposals are served from memory instead of one ``eth_call`` each.
+
+Vote weights are uint256. Totals are stored as int64 multiples of a common
+unit (the GCD of all weights seen, e.g. 10**18 for whole-token voting
+power), which keeps the columns exact and vectorized for realistic values.
+A total that would not fit switches the columns to Python integers (object
+dtype): still exact, just slower.
+
+Quorum mirrors ``ProposalManager.finalizeProposal``: the weighted total of
+all votes must reach ``totalCitizens * quorumPercentage / 10000``, where
+quorumPercentage is in basis points.
+"""
+
+import asyncio
+import logging
+from math import gcd
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from services.event_indexer import PROPOSAL_STATES, chain_position
+from services.governance_stats import STATS_ID
+
+logger = logging.getLogger(__name__)
+
+# Vote support values index the columns: 0 = against, 1 = for, 2 = abstain
+SUPPORT_FIELDS = ('against_votes', 'for_votes', 'abstain_votes')
+
+BASIS_POINTS = 10000
+# Largest int64 total per column such that the sum of the three still fits
+INT64_LIMIT = 2 ** 61
+
+
+class VoteTally:
+    """In-memory per-proposal vote totals, maintained as an indexer projection"""
+
+    def __init__(self, db, service=None, quorum_bps: Optional[int] = None, capacity: int = 256):
+        """
+        Args:
+            db: Motor database with the indexed ``events``, ``proposals`` and
+                ``governance_stats`` collections
+            service: BlockchainService used to read the quorum parameter
+            quorum_bps: Quorum in basis points; read from the chain on load if None
+            capacity: Initial number of proposal rows
+        """
+        self.db = db
+        self.service = service
+        self.quorum_bps = quorum_bps
+        self.electorate = 0
+        self.unit = 0
+        # Chain position of the last applied event; apply and revert skip what
+        # they already handled when the indexer retries an interrupted page
+        self._position = -1
+        self._index: Dict[int, int] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._states = np.zeros(capacity, dtype=np.int8)
+        self._voters = np.zeros(capacity, dtype=np.int64)
+        self._votes = np.zeros((capacity, 3), dtype=np.int64)
+
+    @property
+    def exact_int64(self) -> bool:
+        """False once totals outgrew int64 and are held as Python integers"""
+        return self._votes.dtype == np.int64
+
+    # ============ Loading ============
+
+    async def load(self) -> None:
+        """Build the tallies from the indexed collections"""
+        proposals = await self.db.proposals.find({}, {'_id': 0, 'id': 1, 'state': 1}).to_list(None)
+        for proposal in proposals:
+            self._set_state(proposal['id'], proposal.get('state', 'DRAFT'))
+
+        # Votes are counted from the indexed events the indexer finished applying;
+        # events of an interrupted rollback count until they are reverted
+        rows, supports, weights = [], [], []
+        query = {'contract': 'ProposalManager', 'event': 'VoteCast', 'pending': {'$ne': True}}
+        async for event in self.db.events.find(query, {'_id': 0, 'args': 1}):
+            rows.append(self._row(int(event['args']['proposalId'])))
+            supports.append(int(event['args']['support']))
+            weights.append(int(event['args']['weight']))
+        self._add_many(rows, supports, weights)
+        last = await self.db.events.find_one(
+            {'pending': {'$ne': True}}, {'block_number': 1, 'log_index': 1},
+            sort=[('block_number', -1), ('log_index', -1)]
+        )
+        self._position = chain_position(last) if last else -1
+
+        await self._refresh_electorate()
+        if self.quorum_bps is None and self.service is not None:
+            params = await asyncio.to_thread(self.service.get_governance_params)
+            self.quorum_bps = params['quorum_percentage']
+        logger.info(f"Loaded vote tallies for {len(self._index)} proposals from {len(weights)} votes")
+
+    async def _refresh_electorate(self) -> None:
+        stats = await self.db.governance_stats.find_one({'_id': STATS_ID}, {'total_citizens': 1})
+        self.electorate = (stats or {}).get('total_citizens', 0)
+
+    # ============ Storage ============
+
+    def _row(self, proposal_id: int) -> int:
+        row = self._index.get(proposal_id)
+        if row is not None:
+            return row
+        row = len(self._index)
+        if row == len(self._ids):
+            self._grow()
+        self._index[proposal_id] = row
+        self._ids[row] = proposal_id
+        return row
+
+    def _grow(self) -> None:
+        def padded(array):
+            grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self._ids = padded(self._ids)
+        self._states = padded(self._states)
+        self._voters = padded(self._voters)
+        self._votes = padded(self._votes)
+
+    def _units(self, weight: int) -> int:
+        # The unit is 0 until the first non-zero weight
+        return weight // self.unit if self.unit else 0
+
+    def _promote(self) -> None:
+        """Switch to exact Python integers, with totals in wei rather than units"""
+        logger.info("Vote totals exceed int64, switching to arbitrary precision")
+        self._votes = self._votes.astype(object) * (self.unit or 1)
+        self.unit = 1
+
+    def _rebase(self, weights: Iterable[int]) -> None:
+        """Lower the unit so every weight is a multiple of it"""
+        unit = self.unit
+        for weight in weights:
+            unit = gcd(unit, abs(weight))
+        if unit == self.unit or not self.exact_int64:
+            return
+        factor = self.unit // unit if self.unit else 1
+        if factor > 1 and int(np.abs(self._votes).max(initial=0)) * factor > INT64_LIMIT:
+            self._promote()
+            return
+        self._votes *= factor
+        self.unit = unit
+
+    def _add_many(self, rows: List[int], supports: List[int], weights: List[int]) -> None:
+        """Add votes to the tallies in one vectorized update"""
+        if not weights:
+            return
+        self._rebase(weights)
+        if self.exact_int64:
+            units = [self._units(weight) for weight in weights]
+            # The per-column sum bounds every resulting total
+            if max(abs(u) for u in units) > INT64_LIMIT or \
+                    int(np.abs(self._votes).max(initial=0)) + sum(abs(u) for u in units) > INT64_LIMIT:
+                self._promote()
+        if self.exact_int64:
+            np.add.at(self._votes, (rows, supports), np.array(units, dtype=np.int64))
+        else:
+            np.add.at(self._votes, (rows, supports), np.array(weights, dtype=object))
+        np.add.at(self._voters, rows, [1 if weight >= 0 else -1 for weight in weights])
+
+    def add_vote(self, proposal_id: int, support: int, weight: int) -> None:
+        """
+        Add one vote; a negative weight removes it again
+
+        Args:
+            proposal_id: Proposal voted on
+            support: 0 = against, 1 = for, 2 = abstain
+            weight: Voting power of the vote
+        """
+        row = self._row(proposal_id)
+        self._rebase([weight])
+        if self.exact_int64:
+            if abs(int(self._votes[row, support]) + self._units(weight)) > INT64_LIMIT:
+                self._promote()
+        if self.exact_int64:
+            self._votes[row, support] += self._units(weight)
+        else:
+            self._votes[row, support] += weight
+        self._voters[row] += 1 if weight >= 0 else -1
+
+    def _set_state(self, proposal_id: int, state: str) -> None:
+        self._states[self._row(proposal_id)] = PROPOSAL_STATES.index(state)
+
+    # ============ Indexer projection ============
+
+    async def apply(self, event: Dict[str, Any]) -> None:
+        """Apply a single indexed event"""
+        await self._handle(event, sign=1)
+
+    async def revert(self, event: Dict[str, Any]) -> None:
+        """Undo an event from an orphaned block"""
+        await self._handle(event, sign=-1)
+
+    async def checkpoint(self, block_number: int) -> None:
+        """Pick up citizen registrations and revocations counted by the stats projection"""
+        await self._refresh_electorate()
+
+    async def _handle(self, event: Dict[str, Any], sign: int) -> None:
+        position = chain_position(event)
+        if sign > 0 and position <= self._position or sign < 0 and position > self._position:
+            return
+        self._position = position if sign > 0 else position - 1
+        args = event['args']
+        name = f"{event['contract']}.{event['event']}"
+        if name == 'ProposalManager.VoteCast':
+            self.add_vote(int(args['proposalId']), int(args['support']), sign * int(args['weight']))
+        elif name == 'ProposalManager.ProposalCreated':
+            self._set_state(int(args['proposalId']), 'DRAFT')
+        elif name == 'ProposalManager.ProposalStateChanged':
+            state = args['newState'] if sign > 0 else args['oldState']
+            self._set_state(int(args['proposalId']), PROPOSAL_STATES[int(state)])
+        elif name == 'GovernanceCore.GovernanceParamsUpdated':
+            if sign > 0:
+                self.quorum_bps = int(args['quorumPercentage'])
+            elif self.service is not None:
+                # The previous value is not part of the event
+                params = await asyncio.to_thread(self.service.get_governance_params)
+                self.quorum_bps = params['quorum_percentage']
+
+    # ============ Queries ============
+
+    def quorum_required(self) -> int:
+        """Weighted votes needed for quorum, rounded down like the contract"""
+        return self.electorate * (self.quorum_bps or 0) // BASIS_POINTS
+
+    def tallies(
+        self,
+        proposal_ids: Optional[Iterable[int]] = None,
+        state: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Tallies with quorum and turnout, computed over all selected proposals at once
+
+        Args:
+            proposal_ids: Proposals to return; all known proposals if None.
+                Unknown IDs are skipped.
+            state: Only return proposals in this state (e.g. "ACTIVE")
+
+        Returns:
+            One dict per proposal, ordered by proposal ID
+        """
+        count = len(self._index)
+        if proposal_ids is None:
+            rows = np.arange(count)
+        else:
+            rows = np.array([self._index[pid] for pid in proposal_ids if pid in self._index], dtype=np.int64)
+        if state is not None:
+            rows = rows[self._states[rows] == PROPOSAL_STATES.index(state)]
+        rows = rows[np.argsort(self._ids[rows], kind='stable')]
+
+        votes = self._votes[rows]
+        totals = votes.sum(axis=1)
+        required = self.quorum_required()
+        if self.exact_int64:
+            # Compare in units; a requirement beyond int64 can never be met there
+            required_units = min(-(-required // self.unit) if self.unit else required, 2 ** 63 - 1)
+            reached = totals >= required_units
+        else:
+            reached = totals >= required
+        passing = reached & (votes[:, 1] > votes[:, 0])
+        voters = self._voters[rows]
+        turnout = voters / self.electorate if self.electorate else np.zeros(len(rows))
+        unit = self.unit or 1
+
+        return [
+            {
+                'id': int(self._ids[row]),
+                'state': PROPOSAL_STATES[self._states[row]],
+                **{field: str(int(votes[i, column]) * unit) for column, field in enumerate(SUPPORT_FIELDS)},
+                'total_votes': str(int(totals[i]) * unit),
+                'voters': int(voters[i]),
+                'quorum_required': str(required),
+                'quorum_reached': bool(reached[i]),
+                'passing': bool(passing[i]),
+                'turnout': float(turnout[i]),
+            }
+            for i, row in enumerate(rows)
+        ]
+
+    def tally(self, proposal_id: int) -> Optional[Dict[str, Any]]:
+        """Tally of a single proposal, or None if it is unknown"""
+        result = self.tallies([proposal_id])
+        return result[0] if result else None
@@ -4,6 +4,7 @@ pragma solidity ^0.8.20;
 import "@openzeppelin/contracts-upgradeable/proxy/utils/Initializable.sol";
 import "@openzeppelin/contracts-upgradeable/access/AccessControlUpgradeable.sol";
 import "@openzeppelin/contracts-upgradeable/security/PausableUpgradeable.sol";
+import "@openzeppelin/contracts/utils/cryptography/ECDSA.sol";
 
 /**
  * @title ProposalManager
@@ -27,6 +28,12 @@ contract ProposalManager is
     bytes32 public constant ADMINISTRATOR_ROLE = keccak256("ADMINISTRATOR_ROLE");
     bytes32 public constant EXECUTOR_ROLE = keccak256("EXECUTOR_ROLE");
 
+    /// @notice EIP-712 type of a vote signed by its voter, which anyone may submit
+    bytes32 public constant BALLOT_TYPEHASH = keccak256("Ballot(uint256 proposalId,uint8 support,uint256 weight)");
+
+    bytes32 private constant DOMAIN_TYPEHASH =
+        keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)");
+
     // ============ Enums ============
 
     /// @notice Types of proposals supported by the system
@@ -125,6 +132,7 @@ contract ProposalManager is
     error VotingNotActive();
     error NotProposerOrAdmin();
     error CannotCancelExecuted();
+    error InvalidSignature();
 
     // ============ Initialization ============
 
@@ -347,6 +355,55 @@ contract ProposalManager is
         uint8 support,
         uint256 weight
     ) external whenNotPaused {
+        _castVote(proposalId, msg.sender, support, weight);
+    }
+
+    /**
+     * @notice Cast a vote signed by the voter, e.g. submitted by a relayer
+     * @param proposalId ID of proposal
+     * @param support 0 = against, 1 = for, 2 = abstain
+     * @param weight Voting weight of the voter
+     * @param voter Address credited with the vote
+     * @param signature EIP-712 signature of the Ballot by the voter
+     */
+    function castVoteBySig(
+        uint256 proposalId,
+        uint8 support,
+        uint256 weight,
+        address voter,
+        bytes calldata signature
+    ) external whenNotPaused {
+        bytes32 structHash = keccak256(abi.encode(BALLOT_TYPEHASH, proposalId, support, weight));
+        bytes32 digest = keccak256(abi.encodePacked("\x19\x01", domainSeparator(), structHash));
+        if (voter == address(0) || ECDSA.recover(digest, signature) != voter) {
+            revert InvalidSignature();
+        }
+
+        _castVote(proposalId, voter, support, weight);
+    }
+
+    /**
+     * @notice EIP-712 domain separator of signed votes
+     */
+    function domainSeparator() public view returns (bytes32) {
+        return keccak256(abi.encode(
+            DOMAIN_TYPEHASH,
+            keccak256("ProposalManager"),
+            keccak256("1"),
+            block.chainid,
+            address(this)
+        ));
+    }
+
+    /**
+     * @notice Record a vote of an authenticated voter
+     */
+    function _castVote(
+        uint256 proposalId,
+        address voter,
+        uint8 support,
+        uint256 weight
+    ) internal {
         Proposal storage proposal = proposals[proposalId];
 
         // Check proposal is active
@@ -360,12 +417,12 @@ contract ProposalManager is
         }
 
         // Check hasn't voted
-        if (hasVoted[proposalId][msg.sender]) {
+        if (hasVoted[proposalId][voter]) {
             revert AlreadyVoted();
         }
 
         // Record vote
-        hasVoted[proposalId][msg.sender] = true;
+        hasVoted[proposalId][voter] = true;
 
         if (support == 0) {
             proposal.againstVotes += weight;
@@ -375,7 +432,7 @@ contract ProposalManager is
             proposal.abstainVotes += weight;
         }
 
-        emit VoteCast(proposalId, msg.sender, support, weight);
+        emit VoteCast(proposalId, voter, support, weight);
     }
 
     // ============ View Functions ============
@@ -4,6 +4,7 @@ pragma solidity ^0.8.20;
 import "https://github.com/OpenZeppelin/openzeppelin-contracts-upgradeable/blob/v5.0.0/contracts/proxy/utils/Initializable.sol";
 import "https://github.com/OpenZeppelin/openzeppelin-contracts-upgradeable/blob/v5.0.0/contracts/access/AccessControlUpgradeable.sol";
 import "https://github.com/OpenZeppelin/openzeppelin-contracts-upgradeable/blob/v5.0.0/contracts/utils/PausableUpgradeable.sol";
+import "https://github.com/OpenZeppelin/openzeppelin-contracts/blob/v5.0.0/contracts/utils/cryptography/ECDSA.sol";
 
 /**
  * @title ProposalManager
@@ -18,6 +19,11 @@ contract ProposalManager is
     bytes32 public constant ADMINISTRATOR_ROLE = keccak256("ADMINISTRATOR_ROLE");
     bytes32 public constant EXECUTOR_ROLE = keccak256("EXECUTOR_ROLE");
 
+    bytes32 public constant BALLOT_TYPEHASH = keccak256("Ballot(uint256 proposalId,uint8 support,uint256 weight)");
+
+    bytes32 private constant DOMAIN_TYPEHASH =
+        keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)");
+
     enum ProposalType {
         POLICY_DECISION,
         BUDGET_ALLOCATION,
@@ -92,6 +98,7 @@ contract ProposalManager is
     error VotingNotActive();
     error NotProposerOrAdmin();
     error CannotCancelExecuted();
+    error InvalidSignature();
 
     /// @custom:oz-upgrades-unsafe-allow constructor
     constructor() {
@@ -177,6 +184,41 @@ contract ProposalManager is
         uint8 support,
         uint256 weight
     ) external whenNotPaused {
+        _castVote(proposalId, msg.sender, support, weight);
+    }
+
+    function castVoteBySig(
+        uint256 proposalId,
+        uint8 support,
+        uint256 weight,
+        address voter,
+        bytes calldata signature
+    ) external whenNotPaused {
+        bytes32 structHash = keccak256(abi.encode(BALLOT_TYPEHASH, proposalId, support, weight));
+        bytes32 digest = keccak256(abi.encodePacked("\x19\x01", domainSeparator(), structHash));
+        if (voter == address(0) || ECDSA.recover(digest, signature) != voter) {
+            revert InvalidSignature();
+        }
+
+        _castVote(proposalId, voter, support, weight);
+    }
+
+    function domainSeparator() public view returns (bytes32) {
+        return keccak256(abi.encode(
+            DOMAIN_TYPEHASH,
+            keccak256("ProposalManager"),
+            keccak256("1"),
+            block.chainid,
+            address(this)
+        ));
+    }
+
+    function _castVote(
+        uint256 proposalId,
+        address voter,
+        uint8 support,
+        uint256 weight
+    ) internal {
         Proposal storage proposal = proposals[proposalId];
 
         if (proposal.state != ProposalState.ACTIVE) {
@@ -187,11 +229,11 @@ contract ProposalManager is
             revert VotingNotActive();
         }
 
-        if (hasVoted[proposalId][msg.sender]) {
+        if (hasVoted[proposalId][voter]) {
             revert AlreadyVoted();
         }
 
-        hasVoted[proposalId][msg.sender] = true;
+        hasVoted[proposalId][voter] = true;
 
         // Fixed: Use explicit addition instead of +=
         if (support == 0) {
@@ -202,7 +244,7 @@ contract ProposalManager is
             proposal.abstainVotes = proposal.abstainVotes + weight;
         }
 
-        emit VoteCast(proposalId, msg.sender, support, weight);
+        emit VoteCast(proposalId, voter, support, weight);
     }
 
     function getProposal(uint256 proposalId) external view returns (Proposal memory) {
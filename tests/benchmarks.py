@@ -0,0 +1,526 @@
+"""
+Governance backend benchmarks
+
+Runs the backend against an in-process stub chain (tests/stub_chain.py)
+and measures latency percentiles and throughput of:
+- BlockchainService reads (single, multicall-batched and event scans)
+- Event indexing into MongoDB
+- The HTTP API (/api/governance/*, /api/status) under concurrent load
+- Emergency snapshot export
+- Monitor log scanning
+
+Results are written as JSON (``--output``) so runs of different versions
+can be compared (``--compare BASELINE``). Scenarios that need MongoDB are
+skipped, and reported as skipped, when ``MONGO_URL`` is unreachable.
+
+Usage (from the repository root):
+    python -m tests.benchmarks --proposals 500 --votes 25 --citizens 2000 --output bench.json
+    python -m tests.benchmarks --output bench.json --compare bench-main.json --fail-on-regression
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tests.stub_chain import BACKEND_DIR, StubChain, StubRPCServer, write_abis
+
+RESULTS_VERSION = 1
+DEFAULT_MONGO_URL = 'mongodb://localhost:27017'
+DEFAULT_DB = 'nexus_benchmark'
+
+
+# ============ Measurement ============
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(name: str, samples: List[float], wall: float, items: Optional[int] = None,
+              unit: str = 'requests', errors: int = 0) -> Dict[str, Any]:
+    """
+    Build a result record
+
+    Args:
+        name: Scenario name, the key used when comparing runs
+        samples: Per-operation durations in seconds
+        wall: Wall-clock duration of the whole scenario in seconds
+        items: Units of work done (defaults to the number of samples)
+        unit: What ``items`` counts (requests, events, proposals, ...)
+        errors: Failed operations, not included in ``samples``
+    """
+    items = len(samples) if items is None else items
+    return {
+        'name': name,
+        'unit': unit,
+        'count': items,
+        'operations': len(samples),
+        'errors': errors,
+        'wall_s': round(wall, 4),
+        'throughput': round(items / wall, 2) if wall > 0 else None,
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else None,
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(samples, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3) if samples else None,
+    }
+
+
+def timed(samples: List[float], fn: Callable) -> Callable:
+    """Wrap a function so every call's duration is appended to ``samples``"""
+    if asyncio.iscoroutinefunction(fn):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def measure(name: str, operations: Iterable[Callable[[], Any]], unit: str = 'requests') -> Dict[str, Any]:
+    """Run blocking operations one after another and time each"""
+    samples = []
+    start = time.perf_counter()
+    for operation in operations:
+        timed(samples, operation)()
+    return summarize(name, samples, time.perf_counter() - start, unit=unit)
+
+
+def chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ============ Environment ============
+
+def mongo_available(url: str) -> Optional[str]:
+    """None if MongoDB answers at ``url``, otherwise the reason it does not"""
+    from pymongo import MongoClient
+
+    client = MongoClient(url, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+        return None
+    except Exception as e:
+        return f"MongoDB unavailable at {url} ({type(e).__name__})"
+    finally:
+        client.close()
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ============ Scenarios ============
+
+def bench_blockchain_service(chain: StubChain, args) -> List[Dict[str, Any]]:
+    """Uncached single reads, multicall-batched reads and paged event scans"""
+    from services.blockchain_service import BlockchainService
+
+    service = BlockchainService(
+        rpc_url=os.environ['RPC_URL'],
+        governance_core_address=os.environ['GOVERNANCE_CORE_ADDRESS'],
+        proposal_manager_address=os.environ['PROPOSAL_MANAGER_ADDRESS']
+    )
+    ids = list(chain.proposals)
+    sample = ids[:args.requests]
+    addresses = chain.citizens[:args.requests]
+
+    results = [
+        measure('blockchain.get_proposal', [lambda pid=pid: service.get_proposal(pid) for pid in sample]),
+        measure('blockchain.get_vote_counts', [lambda pid=pid: service.get_vote_counts(pid) for pid in sample]),
+        measure('blockchain.get_proposals[100]', [lambda batch=batch: service.get_proposals(batch)
+                                                  for batch in chunks(ids, 100)]),
+        measure('blockchain.get_roles_for_addresses[50]', [
+            lambda batch=batch: service.get_roles_for_addresses(batch) for batch in chunks(addresses, 50)
+        ]),
+    ]
+
+    start = time.perf_counter()
+    events = len(list(service.listen_to_events('VoteCast', 0, confirmations=0)))
+    wall = time.perf_counter() - start
+    results.append(summarize('blockchain.listen_to_events(VoteCast)', [wall], wall, items=events, unit='events'))
+    service.pool.close()
+    return results
+
+
+async def bench_indexer(db, args) -> Dict[str, Any]:
+    """Full sync of the stub chain into MongoDB with the server's projections"""
+    import server
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import GovernanceStatsProjection
+
+    service = await asyncio.to_thread(server._build_blockchain_service)
+    indexer = EventIndexer(
+        service,
+        db,
+        server._indexed_contracts(service),
+        page_size=args.page_size,
+        confirmations=12
+    )
+    indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+    await indexer.ensure_indexes()
+
+    pages = []
+    indexer.index_range = timed(pages, indexer.index_range)
+    start = time.perf_counter()
+    await indexer.sync()
+    wall = time.perf_counter() - start
+    events = await db.events.count_documents({})
+    service.pool.close()
+    return summarize('indexer.sync', pages, wall, items=events, unit='events')
+
+
+class APIServer:
+    """Runs the FastAPI app with uvicorn on a background thread"""
+
+    def __init__(self, app):
+        import uvicorn
+
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, name='api-server', daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "APIServer":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+
+
+async def load(name: str, session, requests: List[tuple], concurrency: int) -> Dict[str, Any]:
+    """
+    Send requests with ``concurrency`` concurrent workers and time each response
+
+    Args:
+        requests: (method, url, JSON body or None) tuples
+    """
+    samples: List[float] = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in queue:
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, json=body) as response:
+                    await response.read()
+                    ok = response.status < 400
+            except Exception:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, samples, time.perf_counter() - start, errors=errors)
+
+
+async def bench_api(chain: StubChain, base_url: str, args) -> List[Dict[str, Any]]:
+    """Concurrent load against the main API endpoints"""
+    import aiohttp
+
+    api = f"{base_url}/api"
+    ids = list(chain.proposals)
+    wallets = chain.citizens
+    n = range(args.requests)
+
+    endpoints: List[tuple] = [
+        # Writes first, so the status history read below is not empty
+        ('POST /api/status', [('POST', f"{api}/status", {'client_name': f"bench-{i % 10}"}) for i in n]),
+        ('GET /api/status', [('GET', f"{api}/status", None) for _ in n]),
+        ('GET /api/governance/proposals', [('GET', f"{api}/governance/proposals?limit=50", None) for _ in n]),
+        ('GET /api/governance/proposals/{id}', [
+            ('GET', f"{api}/governance/proposals/{ids[i % len(ids)]}", None) for i in n
+        ]),
+        ('GET /api/governance/proposals/{id}/votes', [
+            ('GET', f"{api}/governance/proposals/{ids[i % len(ids)]}/votes", None) for i in n
+        ]),
+        ('GET /api/governance/stats', [('GET', f"{api}/governance/stats", None) for _ in n]),
+        ('GET /api/governance/params', [('GET', f"{api}/governance/params", None) for _ in n]),
+        ('GET /api/governance/users/{address}/roles', [
+            ('GET', f"{api}/governance/users/{wallets[i % len(wallets)]}/roles", None) for i in n
+        ]),
+        ('GET /api/governance/users/{address}/votes', [
+            ('GET', f"{api}/governance/users/{wallets[i % len(wallets)]}/votes", None) for i in n
+        ]),
+        ('GET /api/governance/events', [('GET', f"{api}/governance/events?limit=100", None) for _ in n]),
+    ]
+
+    results = []
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.concurrency)) as session:
+        for name, requests in endpoints:
+            results.append(await load(name, session, requests, args.concurrency))
+    return results
+
+
+async def bench_database(chain: StubChain, args) -> List[Dict[str, Any]]:
+    """Index the chain into a scratch database, then load-test the API over it"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db)
+    try:
+        results = [await bench_indexer(client[args.db], args)]
+        if 'api' in args.scenarios:
+            import server
+
+            with APIServer(server.app) as api:
+                results += await bench_api(chain, api.url, args)
+        return results
+    finally:
+        if not args.keep_db:
+            await client.drop_database(args.db)
+        client.close()
+
+
+def bench_snapshot(chain: StubChain, args) -> Dict[str, Any]:
+    """Full snapshot export; samples are the aggregated batch reads"""
+    import emergency_snapshot
+
+    batches: List[float] = []
+    read_batch = emergency_snapshot.read_batch
+    emergency_snapshot.read_batch = timed(batches, read_batch)
+    try:
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            manifest = emergency_snapshot.export_snapshot(
+                os.path.join(directory, 'snapshot'),
+                workers=args.workers,
+                fmt=args.snapshot_format
+            )
+            wall = time.perf_counter() - start
+    finally:
+        emergency_snapshot.read_batch = read_batch
+    if manifest is None:
+        raise RuntimeError("Snapshot export failed")
+    return summarize(f"snapshot.export({args.snapshot_format})", batches, wall,
+                     items=len(chain.proposals), unit='proposals')
+
+
+def bench_monitor(chain: StubChain, args) -> Dict[str, Any]:
+    """Scan the whole chain with the monitor's poller and rules"""
+    import monitoring_service as monitor
+
+    poller = monitor.LogPoller(monitor.w3)
+    poller.watch(monitor.PROPOSAL_MANAGER_ADDR, monitor.PROPOSAL_MANAGER_ABI)
+    poller.watch(monitor.TREASURY_MANAGER_ADDR, monitor.TREASURY_MANAGER_ABI)
+    poller.watch(monitor.GOVERNANCE_CORE_ADDR, monitor.GOVERNANCE_CORE_ABI)
+    poller.handlers = monitor.poller.handlers
+
+    polls: List[float] = []
+    poll = timed(polls, poller.poll)
+    logs = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for from_block in range(0, chain.head + 1, args.page_size):
+            logs += poll(from_block, min(from_block + args.page_size - 1, chain.head))
+        wall = time.perf_counter() - start
+    monitor.alerts.close()
+    return summarize('monitor.poll', polls, wall, items=logs, unit='logs')
+
+
+# ============ Runner ============
+
+SCENARIOS = ('blockchain', 'indexer', 'api', 'snapshot', 'monitor')
+
+
+def run(args) -> Dict[str, Any]:
+    """Run the selected scenarios and return the report"""
+    started = time.perf_counter()
+    chain = StubChain(
+        proposals=args.proposals,
+        votes_per_proposal=args.votes,
+        citizens=args.citizens,
+        events_per_block=args.events_per_block,
+        seed=args.seed
+    )
+    report: Dict[str, Any] = {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': {
+            'proposals': args.proposals,
+            'votes_per_proposal': args.votes,
+            'citizens': args.citizens,
+            'logs': chain.log_count,
+            'blocks': chain.head,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'rpc_latency_ms': args.rpc_latency * 1000,
+        },
+        'results': [],
+        'skipped': {},
+    }
+
+    with tempfile.TemporaryDirectory() as abi_dir, StubRPCServer(chain, latency=args.rpc_latency) as rpc:
+        # Module-level configuration of server.py and the scripts is read at import
+        os.environ.update(rpc.env(write_abis(abi_dir)))
+        os.environ.update({
+            'MONGO_URL': args.mongo_url,
+            'DB_NAME': args.db,
+            'INDEXER_ENABLED': 'false',
+            'SLACK_WEBHOOK_URL': '',
+            'TELEGRAM_BOT_TOKEN': '',
+        })
+
+        if 'blockchain' in args.scenarios:
+            report['results'] += bench_blockchain_service(chain, args)
+        if 'snapshot' in args.scenarios:
+            report['results'].append(bench_snapshot(chain, args))
+        if 'monitor' in args.scenarios:
+            report['results'].append(bench_monitor(chain, args))
+
+        database = [name for name in ('indexer', 'api') if name in args.scenarios]
+        if database:
+            reason = mongo_available(args.mongo_url)
+            if reason:
+                report['skipped'].update({name: reason for name in database})
+            else:
+                report['results'] += asyncio.run(bench_database(chain, args))
+
+        report['rpc'] = {'http_requests': rpc.requests, 'calls': dict(rpc.calls)}
+    report['duration_s'] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Print the change against a baseline report
+
+    Returns:
+        Names of the scenarios whose median latency rose, or throughput
+        fell, by more than ``tolerance`` (a fraction)
+    """
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    regressions = []
+    print(f"\nCompared with {(baseline.get('git') or {}).get('commit') or 'baseline'}:")
+    for result in report['results']:
+        base = previous.get(result['name'])
+        if base is None or not base.get('p50_ms') or not base.get('throughput') or not result.get('throughput'):
+            continue
+        latency = result['p50_ms'] / base['p50_ms'] - 1
+        throughput = result['throughput'] / base['throughput'] - 1
+        regressed = latency > tolerance or throughput < -tolerance / (1 + tolerance)
+        if regressed:
+            regressions.append(result['name'])
+        print(f"  {'REGRESSED' if regressed else 'ok':9} {result['name']:48} "
+              f"p50 {latency:+7.1%}  throughput {throughput:+7.1%}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'scenario':48} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'errors':>6}  throughput")
+    for result in report['results']:
+        print(f"{result['name']:48} {result['count']:>7} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{result['errors']:>6}  {result['throughput'] or 0:.1f} {result['unit']}/s")
+    for name, reason in report['skipped'].items():
+        print(f"{name:48} skipped: {reason}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the governance backend against a stub chain")
+    scale = parser.add_argument_group('chain scale')
+    scale.add_argument("--proposals", type=int, default=500)
+    scale.add_argument("--votes", type=int, default=20, help="VoteCast events per proposal")
+    scale.add_argument("--citizens", type=int, default=1000)
+    scale.add_argument("--events-per-block", type=int, default=10)
+    scale.add_argument("--seed", type=int, default=1)
+    scale.add_argument("--rpc-latency", type=float, default=0.0, help="Seconds added to every stub RPC request")
+
+    load_ = parser.add_argument_group('load')
+    load_.add_argument("--scenarios", nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    load_.add_argument("--requests", type=int, default=200, help="Requests per endpoint / single-read scenario")
+    load_.add_argument("--concurrency", type=int, default=16, help="Concurrent API clients")
+    load_.add_argument("--page-size", type=int, default=2000, help="Blocks per eth_getLogs page")
+    load_.add_argument("--workers", type=int, default=4, help="Snapshot export workers")
+    load_.add_argument("--snapshot-format", default='ndjson.gz')
+
+    database = parser.add_argument_group('database')
+    database.add_argument("--mongo-url", default=os.environ.get('MONGO_URL', DEFAULT_MONGO_URL))
+    database.add_argument("--db", default=DEFAULT_DB, help="Scratch database, dropped before and after the run")
+    database.add_argument("--keep-db", action="store_true", help="Keep the scratch database after the run")
+
+    output = parser.add_argument_group('output')
+    output.add_argument("--output", help="Write the JSON report to this file")
+    output.add_argument("--compare", metavar="BASELINE", help="JSON report of an earlier run to compare with")
+    output.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown when comparing")
+    output.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    print_report(report)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report['comparison'] = {'baseline': args.compare, 'tolerance': args.tolerance, 'regressions': regressions}
+        if regressions and args.fail_on_regression:
+            status = 1
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
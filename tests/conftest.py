@@ -0,0 +1,65 @@
+"""
+Shared fixtures
+
+A small stub chain (tests/stub_chain.py) served over HTTP, with its ABIs
+exported through ``ABI_DIR`` so the backend services load them unchanged.
+Tests that need MongoDB use ``scratch_db`` and are skipped when ``MONGO_URL``
+(default mongodb://localhost:27017) is unreachable.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from tests.stub_chain import StubChain, StubRPCServer, write_abis
+
+
+@pytest.fixture(scope='session')
+def chain():
+    return StubChain(proposals=30, votes_per_proposal=5, citizens=40)
+
+
+@pytest.fixture(scope='session')
+def rpc(chain):
+    with StubRPCServer(chain) as server:
+        yield server
+
+
+@pytest.fixture
+def chain_env(rpc, tmp_path, monkeypatch):
+    """Point the backend's environment variables at the stub chain"""
+    for key, value in rpc.env(write_abis(tmp_path / 'abi')).items():
+        monkeypatch.setenv(key, value)
+    return rpc
+
+
+@pytest.fixture
+def service(chain_env):
+    from services.blockchain_service import BlockchainService
+
+    service = BlockchainService(
+        rpc_url=os.environ['RPC_URL'],
+        governance_core_address=os.environ['GOVERNANCE_CORE_ADDRESS'],
+        proposal_manager_address=os.environ['PROPOSAL_MANAGER_ADDRESS']
+    )
+    yield service
+    service.pool.close()
+
+
+@pytest.fixture
+def scratch_db():
+    """(MONGO_URL, name) of a scratch database, dropped after the test"""
+    from pymongo import MongoClient
+
+    from tests.benchmarks import DEFAULT_MONGO_URL, mongo_available
+
+    url = os.environ.get('MONGO_URL', DEFAULT_MONGO_URL)
+    reason = mongo_available(url)
+    if reason:
+        pytest.skip(reason)
+
+    name = f"nexus_test_{uuid.uuid4().hex[:8]}"
+    yield url, name
+    with MongoClient(url) as client:
+        client.drop_database(name)
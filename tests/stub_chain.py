@@ -0,0 +1,778 @@
+"""
+In-process stub Ethereum JSON-RPC chain
+
+A deterministic, synthetic governance chain served over HTTP on localhost:
+citizens are registered, approved and granted roles, proposals are created
+and voted on, and the treasury receives deposits and pays out withdrawals.
+Every event is emitted as a real ABI-encoded log of the deployed contract
+addresses, and ``eth_call`` answers the view functions the backend reads
+(directly or through Multicall3 ``aggregate3``), so the unmodified services,
+the event indexer, the snapshot tool and the monitor run against it.
+
+Contract reads reflect the state after all generated events. ``update()``
+mines a block that changes that state; ``eth_call`` and ``eth_getBalance``
+pinned to an earlier block still see the state as of that block.
+``reorg()`` replaces the hashes of recent blocks and ``mine()`` appends
+empty blocks. Raw transactions are recorded in
+``transactions`` and get a successful receipt once a block is mined after
+them, without changing any state.
+
+Usage::
+
+    chain = StubChain(proposals=200, votes_per_proposal=20, citizens=500)
+    with StubRPCServer(chain) as server:
+        os.environ.update(server.env(abi_dir))
+        ...
+"""
+
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector, keccak, to_checksum_address
+from eth_utils.abi import collapse_if_tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from services.multicall import MULTICALL3_ABI, MULTICALL3_ADDRESS  # noqa: E402
+
+# Addresses of the Sepolia deployment, also hardcoded in monitoring_service.py
+DEFAULT_ADDRESSES = {
+    'GovernanceCore': '0xd9145CCE52D386f254917e481eB44e9943F39138',
+    'ProposalManager': '0xd8b934580fcE35a11B58C6D73aDeE468a2833fa8',
+    'CitizenRegistry': '0x7EF2e0048f5bAeDe046f6BF797943daF4ED8CB47',
+    'TreasuryManager': '0x9D7f74d0C41E726EC95884E0e97Fa6129e3b5E99',
+    'Multicall3': MULTICALL3_ADDRESS,
+}
+
+CHAIN_ID = 11155111
+GENESIS_TIME = 1_700_000_000
+BLOCK_TIME = 12
+NATIVE_TOKEN = '0x' + '00' * 20
+ETHER = 10 ** 18
+
+ROLES = ['CITIZEN', 'DELEGATE', 'ADMINISTRATOR', 'AUDITOR', 'GUARDIAN', 'UPGRADER']
+DEFAULT_ADMIN_ROLE = b'\x00' * 32
+
+
+def role_hash(name: str) -> bytes:
+    return keccak(text=f"{name}_ROLE")
+
+
+# ============ ABIs ============
+
+def _fn(name, inputs=(), outputs=(), mutability='view'):
+    return {
+        'type': 'function',
+        'name': name,
+        'inputs': [{'name': n, 'type': t} for n, t in inputs],
+        'outputs': [{'name': n, 'type': t} for n, t in outputs],
+        'stateMutability': mutability,
+    }
+
+
+def _event(name, *inputs):
+    return {
+        'type': 'event',
+        'name': name,
+        'anonymous': False,
+        'inputs': [{'name': n, 'type': t, 'indexed': indexed} for n, t, indexed in inputs],
+    }
+
+
+PROPOSAL_COMPONENTS = [
+    ('id', 'uint256'), ('proposer', 'address'), ('proposalType', 'uint8'), ('state', 'uint8'),
+    ('startBlock', 'uint256'), ('endBlock', 'uint256'), ('executionTime', 'uint256'),
+    ('metadataHash', 'string'), ('forVotes', 'uint256'), ('againstVotes', 'uint256'),
+    ('abstainVotes', 'uint256'), ('createdAt', 'uint256'),
+]
+
+ABIS: Dict[str, List[Dict]] = {
+    'GovernanceCore': [
+        {
+            **_fn('getGovernanceParams'),
+            'outputs': [{
+                'name': '',
+                'type': 'tuple',
+                'components': [
+                    {'name': 'votingPeriod', 'type': 'uint256'},
+                    {'name': 'executionDelay', 'type': 'uint256'},
+                    {'name': 'quorumPercentage', 'type': 'uint256'},
+                    {'name': 'proposalThreshold', 'type': 'uint256'},
+                ],
+            }],
+        },
+        _fn('getProposalCount', outputs=[('', 'uint256')]),
+        _fn('checkRole', [('role', 'bytes32'), ('account', 'address')], [('', 'bool')]),
+        _fn('DEFAULT_ADMIN_ROLE', outputs=[('', 'bytes32')]),
+        *[_fn(f"{name}_ROLE", outputs=[('', 'bytes32')]) for name in ROLES],
+        _event('RoleGranted', ('role', 'bytes32', True), ('account', 'address', True), ('sender', 'address', True)),
+        _event('RoleRevoked', ('role', 'bytes32', True), ('account', 'address', True), ('sender', 'address', True)),
+        _event('GovernanceParamsUpdated', ('votingPeriod', 'uint256', False), ('executionDelay', 'uint256', False),
+               ('quorumPercentage', 'uint256', False), ('proposalThreshold', 'uint256', False)),
+    ],
+    'ProposalManager': [
+        {
+            **_fn('getProposal', [('proposalId', 'uint256')]),
+            'outputs': [{
+                'name': '',
+                'type': 'tuple',
+                'components': [{'name': n, 'type': t} for n, t in PROPOSAL_COMPONENTS],
+            }],
+        },
+        _fn('getVoteCounts', [('proposalId', 'uint256')],
+            [('forVotes', 'uint256'), ('againstVotes', 'uint256'), ('abstainVotes', 'uint256')]),
+        _fn('hasVotedOnProposal', [('proposalId', 'uint256'), ('voter', 'address')], [('', 'bool')]),
+        _fn('proposalCount', outputs=[('', 'uint256')]),
+        _fn('createProposal', [('proposalType', 'uint8'), ('metadataHash', 'string'), ('votingPeriod', 'uint256')],
+            [('', 'uint256')], mutability='nonpayable'),
+        _fn('castVote', [('proposalId', 'uint256'), ('support', 'uint8'), ('weight', 'uint256')],
+            mutability='nonpayable'),
+        _fn('castVoteBySig', [('proposalId', 'uint256'), ('support', 'uint8'), ('weight', 'uint256'),
+                              ('voter', 'address'), ('signature', 'bytes')], mutability='nonpayable'),
+        _fn('cancelProposal', [('proposalId', 'uint256')], mutability='nonpayable'),
+        _event('ProposalCreated', ('proposalId', 'uint256', True), ('proposer', 'address', True),
+               ('proposalType', 'uint8', False), ('metadataHash', 'string', False)),
+        _event('ProposalStateChanged', ('proposalId', 'uint256', True), ('oldState', 'uint8', False),
+               ('newState', 'uint8', False)),
+        _event('VoteCast', ('proposalId', 'uint256', True), ('voter', 'address', True), ('support', 'uint8', False),
+               ('weight', 'uint256', False)),
+        _event('ProposalCancelled', ('proposalId', 'uint256', True), ('canceller', 'address', True)),
+    ],
+    'CitizenRegistry': [
+        _fn('getTotalCitizens', outputs=[('', 'uint256')]),
+        _fn('getEffectiveVotingPower', [('wallet', 'address')], [('', 'uint256')]),
+        _event('CitizenRegistered', ('wallet', 'address', True), ('votingPower', 'uint256', False),
+               ('timestamp', 'uint256', False)),
+        _event('CitizenshipApproved', ('wallet', 'address', True), ('approver', 'address', True),
+               ('timestamp', 'uint256', False)),
+        _event('CitizenshipRevoked', ('wallet', 'address', True), ('revoker', 'address', True),
+               ('timestamp', 'uint256', False)),
+        _event('VotingPowerDelegated', ('from', 'address', True), ('to', 'address', True), ('power', 'uint256', False)),
+        _event('DelegationRevoked', ('from', 'address', True), ('to', 'address', True)),
+    ],
+    'TreasuryManager': [
+        _event('Deposit', ('token', 'address', True), ('from', 'address', True), ('amount', 'uint256', False),
+               ('timestamp', 'uint256', False)),
+        # Emitted by the deployed treasury and watched by monitoring_service.py
+        _event('Withdrawal', ('token', 'address', True), ('to', 'address', True), ('amount', 'uint256', False),
+               ('timestamp', 'uint256', False)),
+        _event('EmergencyFreeze', ('freezer', 'address', True), ('timestamp', 'uint256', False)),
+    ],
+}
+
+# Read by emergency_snapshot.py with its own, older ProposalManager layout
+SNAPSHOT_FUNCTIONS = [
+    _fn('getProposalCount', outputs=[('', 'uint256')]),
+    _fn('proposals', [('', 'uint256')], [
+        ('id', 'uint256'), ('proposer', 'address'), ('description', 'string'), ('forVotes', 'uint256'),
+        ('againstVotes', 'uint256'), ('abstainVotes', 'uint256'), ('startTime', 'uint256'),
+        ('endTime', 'uint256'), ('status', 'uint8'),
+    ]),
+]
+
+
+def write_abis(directory) -> str:
+    """Write the stub ABIs as artifacts loadable through ``ABI_DIR``"""
+    os.makedirs(directory, exist_ok=True)
+    for name, abi in ABIS.items():
+        with open(os.path.join(directory, f"{name}.json"), 'w') as f:
+            json.dump({'contractName': name, 'abi': abi}, f)
+    return str(directory)
+
+
+# ============ Chain ============
+
+class Log(NamedTuple):
+    address: str
+    topics: Tuple[str, ...]
+    data: str
+    block_number: int
+    transaction_hash: str
+    transaction_index: int
+    log_index: int
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class StubChain:
+    """Deterministic synthetic governance chain"""
+
+    def __init__(
+        self,
+        proposals: int = 100,
+        votes_per_proposal: int = 20,
+        citizens: int = 200,
+        events_per_block: int = 10,
+        seed: int = 1,
+        addresses: Optional[Dict[str, str]] = None,
+        max_logs: Optional[int] = None,
+        quorum_percentage: int = 1000
+    ):
+        """
+        Args:
+            proposals: Number of proposals created
+            votes_per_proposal: VoteCast events per proposal (capped at ``citizens``)
+            citizens: Number of registered and approved citizens
+            events_per_block: Logs per block; blocks hold one transaction per log
+            seed: Seed of the generated accounts, votes and block hashes
+            addresses: Contract addresses, defaults to the Sepolia deployment
+            max_logs: Reject eth_getLogs results larger than this, like hosted nodes do
+            quorum_percentage: Quorum in basis points returned by getGovernanceParams
+        """
+        self.seed = seed
+        self.addresses = {name: to_checksum_address(a) for name, a in (addresses or DEFAULT_ADDRESSES).items()}
+        self.max_logs = max_logs
+        self.events_per_block = events_per_block
+        self.params = (50400, 172800, quorum_percentage, 1)
+        rng = random.Random(seed)
+
+        self.citizens = [self._account('citizen', i) for i in range(citizens)]
+        self.admin = self.citizens[0] if self.citizens else self._account('admin', 0)
+        self.delegates = self.citizens[::10]
+        self.voting_power = {wallet: ETHER * (1 + i % 5) for i, wallet in enumerate(self.citizens)}
+        self.roles: Dict[bytes, set] = {DEFAULT_ADMIN_ROLE: {self.admin}}
+        self.proposals: Dict[int, Dict[str, Any]] = {}
+        self.voted: set = set()
+        self.balances: Dict[str, int] = Counter()
+
+        self._events: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._generate(proposals, min(votes_per_proposal, citizens), rng)
+
+        self._topics = {}
+        for contract, abi in ABIS.items():
+            for item in abi:
+                if item['type'] == 'event':
+                    self._topics[(contract, item['name'])] = item
+        self._functions = self._build_functions()
+
+        self._logs: Dict[int, List[Log]] = {}
+        self._pack_logs()
+        self.head = (max(self._logs) if self._logs else 0) + 64
+        self._epochs: Dict[int, int] = {}
+        # (last block, state) of the state before each update(), oldest first
+        self._states: List[Tuple[int, "StubChain"]] = []
+        self._lock = threading.Lock()
+        # tx hash -> (raw transaction, head when it was sent)
+        self.transactions: Dict[str, Tuple[str, int]] = {}
+
+    def _account(self, kind: str, index: int) -> str:
+        return to_checksum_address(keccak(text=f"{kind}-{self.seed}-{index}")[-20:])
+
+    # ============ Generation ============
+
+    def _emit(self, contract: str, event: str, **args) -> None:
+        self._events.append((contract, event, args))
+
+    def _grant(self, role: bytes, account: str) -> None:
+        self.roles.setdefault(role, set()).add(account)
+        self._emit('GovernanceCore', 'RoleGranted', role=role, account=account, sender=self.admin)
+
+    def _generate(self, proposal_count: int, votes_per_proposal: int, rng: random.Random) -> None:
+        for role in (role_hash('ADMINISTRATOR'), role_hash('GUARDIAN')):
+            self._grant(role, self.admin)
+
+        for i, wallet in enumerate(self.citizens):
+            self._emit('CitizenRegistry', 'CitizenRegistered', wallet=wallet, votingPower=self.voting_power[wallet])
+            self._emit('CitizenRegistry', 'CitizenshipApproved', wallet=wallet, approver=self.admin)
+            self._grant(role_hash('CITIZEN'), wallet)
+            if i % 10 == 0:
+                self._grant(role_hash('DELEGATE'), wallet)
+            elif i % 7 == 0:
+                self._emit('CitizenRegistry', 'VotingPowerDelegated', **{
+                    'from': wallet, 'to': self.delegates[i // 10], 'power': self.voting_power[wallet]
+                })
+
+        self._emit('TreasuryManager', 'Deposit', token=NATIVE_TOKEN, amount=1000 * ETHER, **{'from': self.admin})
+        self.balances[self.addresses['TreasuryManager']] += 1000 * ETHER
+
+        for proposal_id in range(1, proposal_count + 1):
+            proposer = self.delegates[proposal_id % len(self.delegates)] if self.delegates else self.admin
+            proposal = {
+                'id': proposal_id,
+                'proposer': proposer,
+                'type': proposal_id % 6,
+                'state': 1,
+                'start_block': 0,
+                'end_block': 0,
+                'metadata_hash': f"ipfs://proposal-{self.seed}-{proposal_id}",
+                'votes': [0, 0, 0],
+                'created_at': 0,
+            }
+            self.proposals[proposal_id] = proposal
+            self._emit('ProposalManager', 'ProposalCreated', proposalId=proposal_id, proposer=proposer,
+                       proposalType=proposal['type'], metadataHash=proposal['metadata_hash'])
+            self._emit('ProposalManager', 'ProposalStateChanged', proposalId=proposal_id, oldState=0, newState=1)
+
+            for voter in rng.sample(self.citizens, votes_per_proposal):
+                support = rng.choice((0, 1, 1, 2))
+                weight = self.voting_power[voter]
+                # ProposalManager.castVote: 0 = against, 1 = for, 2 = abstain
+                proposal['votes'][(1, 0, 2)[support]] += weight
+                self.voted.add((proposal_id, voter))
+                self._emit('ProposalManager', 'VoteCast', proposalId=proposal_id, voter=voter, support=support,
+                           weight=weight)
+
+            # Older proposals are decided; the newest third stays active
+            if proposal_id <= proposal_count * 2 // 3:
+                proposal['state'] = 2 if proposal['votes'][0] > proposal['votes'][1] else 3
+                self._emit('ProposalManager', 'ProposalStateChanged', proposalId=proposal_id, oldState=1,
+                           newState=proposal['state'])
+
+            if proposal_id % 25 == 0:
+                recipient = rng.choice(self.citizens) if self.citizens else self.admin
+                amount = rng.choice((ETHER // 10, 2 * ETHER))
+                self.balances[self.addresses['TreasuryManager']] -= amount
+                self._emit('TreasuryManager', 'Withdrawal', token=NATIVE_TOKEN, to=recipient, amount=amount)
+
+    def _pack_logs(self) -> None:
+        """Place the generated events into blocks and ABI-encode them"""
+        for index, (contract, event, args) in enumerate(self._events):
+            block_number, position = divmod(index, self.events_per_block)
+            block_number += 1
+            abi = self._topics[(contract, event)]
+            if 'timestamp' in [item['name'] for item in abi['inputs']]:
+                args['timestamp'] = self.timestamp(block_number)
+            if event == 'ProposalCreated':
+                proposal = self.proposals[args['proposalId']]
+                proposal.update(start_block=block_number, end_block=block_number + self.params[0],
+                                created_at=self.timestamp(block_number))
+
+            topics = [event_abi_to_log_topic(abi)]
+            data_types, data_values = [], []
+            for item in abi['inputs']:
+                value = args[item['name']]
+                if item['indexed']:
+                    topics.append(encode([item['type']], [value]))
+                else:
+                    data_types.append(item['type'])
+                    data_values.append(value)
+
+            self._logs.setdefault(block_number, []).append(Log(
+                address=self.addresses[contract],
+                topics=tuple('0x' + topic.hex() for topic in topics),
+                data='0x' + encode(data_types, data_values).hex(),
+                block_number=block_number,
+                transaction_hash='0x' + keccak(text=f"tx-{self.seed}-{index}").hex(),
+                transaction_index=position,
+                log_index=position,
+            ))
+        self._log_blocks = sorted(self._logs)
+        self.log_count = len(self._events)
+
+    # ============ Blocks ============
+
+    def timestamp(self, block_number: int) -> int:
+        return GENESIS_TIME + block_number * BLOCK_TIME
+
+    def block_hash(self, block_number: int) -> str:
+        epoch = self._epochs.get(block_number, 0)
+        return '0x' + keccak(text=f"block-{self.seed}-{block_number}-{epoch}").hex()
+
+    def block(self, block_number: int) -> Optional[Dict[str, Any]]:
+        """JSON-RPC block header without transactions"""
+        if not 0 <= block_number <= self.head:
+            return None
+        zero = '0x' + '00' * 32
+        return {
+            'number': hex(block_number),
+            'hash': self.block_hash(block_number),
+            'parentHash': self.block_hash(block_number - 1) if block_number else zero,
+            'timestamp': hex(self.timestamp(block_number)),
+            'nonce': '0x0000000000000000',
+            'sha3Uncles': zero,
+            'logsBloom': '0x' + '00' * 256,
+            'transactionsRoot': zero,
+            'stateRoot': zero,
+            'receiptsRoot': zero,
+            'miner': NATIVE_TOKEN,
+            'difficulty': '0x0',
+            'totalDifficulty': '0x0',
+            'extraData': '0x',
+            'size': '0x220',
+            'gasLimit': hex(30_000_000),
+            'gasUsed': '0x0',
+            'baseFeePerGas': hex(10 ** 9),
+            'transactions': [log.transaction_hash for log in self._logs.get(block_number, [])],
+            'uncles': [],
+        }
+
+    def mine(self, blocks: int = 1) -> int:
+        """Append empty blocks and return the new head"""
+        with self._lock:
+            self.head += blocks
+            return self.head
+
+    def update(self, change: Callable[["StubChain"], None]) -> int:
+        """
+        Mine a block whose state is changed by ``change(chain)``
+
+        Reads pinned to earlier blocks keep seeing the previous state.
+
+        Returns:
+            The new head, the first block with the changed state
+        """
+        with self._lock:
+            self._states.append((self.head, self._copy_state()))
+            self.head += 1
+            change(self)
+            return self.head
+
+    def _copy_state(self) -> "StubChain":
+        """Chain answering contract reads from a copy of the current state"""
+        state = copy.copy(self)
+        for name in ('params', 'citizens', 'voting_power', 'roles', 'proposals', 'voted', 'balances'):
+            setattr(state, name, copy.deepcopy(getattr(self, name)))
+        state._functions = state._build_functions()
+        return state
+
+    def state_at(self, tag: Any) -> "StubChain":
+        """Chain answering contract reads as of a block"""
+        number = self._block_number(tag)
+        for last_block, state in self._states:
+            if number <= last_block:
+                return state
+        return self
+
+    def reorg(self, depth: int) -> int:
+        """
+        Replace the last ``depth`` blocks with blocks of different hashes
+
+        The logs stay in their blocks, as if the same transactions were
+        re-included on the new branch.
+
+        Returns:
+            The last block both branches share
+        """
+        with self._lock:
+            fork_block = self.head - depth
+            for number in range(fork_block + 1, self.head + 1):
+                self._epochs[number] = self._epochs.get(number, 0) + 1
+            return fork_block
+
+    def _block_number(self, tag: Any) -> int:
+        if tag in (None, 'latest', 'pending', 'safe', 'finalized'):
+            return self.head
+        if tag == 'earliest':
+            return 0
+        return int(tag, 16) if isinstance(tag, str) else int(tag)
+
+    # ============ Logs ============
+
+    def logs(self, from_block: int, to_block: int, addresses=None, topics=None) -> List[Dict[str, Any]]:
+        """Logs in a block range, filtered like eth_getLogs"""
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {a.lower() for a in addresses} if addresses else None
+        wanted = []
+        for position in (topics or []):
+            if position is None:
+                wanted.append(None)
+            else:
+                wanted.append({t.lower() for t in ([position] if isinstance(position, str) else position)})
+
+        result = []
+        start = bisect_left(self._log_blocks, from_block)
+        end = bisect_right(self._log_blocks, min(to_block, self.head))
+        for block_number in self._log_blocks[start:end]:
+            block_hash = self.block_hash(block_number)
+            for log in self._logs[block_number]:
+                if addresses is not None and log.address.lower() not in addresses:
+                    continue
+                if any(
+                    choices is not None and (i >= len(log.topics) or log.topics[i] not in choices)
+                    for i, choices in enumerate(wanted)
+                ):
+                    continue
+                result.append({
+                    'address': log.address,
+                    'topics': list(log.topics),
+                    'data': log.data,
+                    'blockNumber': hex(block_number),
+                    'blockHash': block_hash,
+                    'transactionHash': log.transaction_hash,
+                    'transactionIndex': hex(log.transaction_index),
+                    'logIndex': hex(log.log_index),
+                    'removed': False,
+                })
+                if self.max_logs is not None and len(result) > self.max_logs:
+                    raise RPCError(-32005, f"query returned more than {self.max_logs} results")
+        return result
+
+    # ============ Contract calls ============
+
+    def _proposal(self, proposal_id: int) -> Dict[str, Any]:
+        return self.proposals.get(proposal_id) or {
+            'id': 0, 'proposer': NATIVE_TOKEN, 'type': 0, 'state': 0, 'start_block': 0, 'end_block': 0,
+            'metadata_hash': '', 'votes': [0, 0, 0], 'created_at': 0,
+        }
+
+    def _get_proposal(self, proposal_id):
+        p = self._proposal(proposal_id)
+        return ((p['id'], p['proposer'], p['type'], p['state'], p['start_block'], p['end_block'], 0,
+                 p['metadata_hash'], *p['votes'], p['created_at']),)
+
+    def _snapshot_proposal(self, proposal_id):
+        p = self._proposal(proposal_id)
+        return (p['id'], p['proposer'], p['metadata_hash'], *p['votes'],
+                self.timestamp(p['start_block']), self.timestamp(p['end_block']), p['state'])
+
+    def _build_functions(self) -> Dict[Tuple[str, bytes], Tuple[List[str], List[str], Any]]:
+        """(address, selector) -> (input types, output types, handler)"""
+        count = lambda: (len(self.proposals),)  # noqa: E731
+        handlers = {
+            'GovernanceCore': {
+                'getGovernanceParams': lambda: (self.params,),
+                'getProposalCount': count,
+                'checkRole': lambda role, account: (to_checksum_address(account) in self.roles.get(role, ()),),
+                'DEFAULT_ADMIN_ROLE': lambda: (DEFAULT_ADMIN_ROLE,),
+                **{f"{name}_ROLE": (lambda name=name: (role_hash(name),)) for name in ROLES},
+            },
+            'ProposalManager': {
+                'getProposal': self._get_proposal,
+                'getVoteCounts': lambda proposal_id: tuple(self._proposal(proposal_id)['votes']),
+                'hasVotedOnProposal': lambda proposal_id, voter: (
+                    (proposal_id, to_checksum_address(voter)) in self.voted,
+                ),
+                'proposalCount': count,
+                'getProposalCount': count,
+                'proposals': self._snapshot_proposal,
+            },
+            'CitizenRegistry': {
+                'getTotalCitizens': lambda: (len(self.citizens),),
+                'getEffectiveVotingPower': lambda wallet: (self.voting_power.get(to_checksum_address(wallet), 0),),
+            },
+            'Multicall3': {
+                'aggregate3': lambda calls: ([self._try_call(target, data) for target, _, data in calls],),
+                'getEthBalance': lambda address: (self.balances.get(to_checksum_address(address), 0),),
+            },
+        }
+        abis = {**ABIS, 'Multicall3': MULTICALL3_ABI}
+        abis['ProposalManager'] = ABIS['ProposalManager'] + SNAPSHOT_FUNCTIONS
+
+        functions = {}
+        for contract, names in handlers.items():
+            for item in abis[contract]:
+                if item['type'] == 'function' and item['name'] in names:
+                    functions[(self.addresses[contract].lower(), function_abi_to_4byte_selector(item))] = (
+                        [collapse_if_tuple(i) for i in item['inputs']],
+                        [collapse_if_tuple(o) for o in item['outputs']],
+                        names[item['name']],
+                    )
+        return functions
+
+    def call(self, to: str, data: bytes) -> bytes:
+        """Execute a view function; raises RPCError on unknown functions"""
+        function = self._functions.get((to.lower(), bytes(data[:4])))
+        if function is None:
+            raise RPCError(3, 'execution reverted')
+        input_types, output_types, handler = function
+        return encode(output_types, list(handler(*decode(input_types, bytes(data[4:])))))
+
+    def _try_call(self, target: str, data: bytes) -> Tuple[bool, bytes]:
+        try:
+            return True, self.call(target, data)
+        except RPCError:
+            return False, b''
+
+    # ============ JSON-RPC ============
+
+    def handle(self, payload: Any) -> Any:
+        """Answer a JSON-RPC request or batch"""
+        if isinstance(payload, list):
+            return [self.handle(request) for request in payload]
+        response = {'jsonrpc': '2.0', 'id': payload.get('id')}
+        method = getattr(self, f"rpc_{payload.get('method')}", None)
+        try:
+            if method is None:
+                raise RPCError(-32601, f"the method {payload.get('method')} does not exist/is not available")
+            response['result'] = method(*payload.get('params', []))
+        except RPCError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+        except Exception as e:
+            response['error'] = {'code': -32602, 'message': f"invalid params: {e}"}
+        return response
+
+    def rpc_web3_clientVersion(self):
+        return 'StubChain/v1'
+
+    def rpc_net_version(self):
+        return str(CHAIN_ID)
+
+    def rpc_eth_chainId(self):
+        return hex(CHAIN_ID)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.head)
+
+    def rpc_eth_gasPrice(self):
+        return hex(10 ** 9)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(10 ** 8)
+
+    def rpc_eth_getTransactionCount(self, address, block='latest'):
+        return '0x0'
+
+    def rpc_eth_estimateGas(self, transaction, block='latest'):
+        return hex(100_000)
+
+    def rpc_eth_getBalance(self, address, block='latest'):
+        return hex(self.state_at(block).balances.get(to_checksum_address(address), 0))
+
+    def rpc_eth_getBlockByNumber(self, tag, full_transactions=False):
+        return self.block(self._block_number(tag))
+
+    def rpc_eth_getLogs(self, criteria):
+        return self.logs(
+            self._block_number(criteria.get('fromBlock', 'latest')),
+            self._block_number(criteria.get('toBlock', 'latest')),
+            criteria.get('address'),
+            criteria.get('topics'),
+        )
+
+    def rpc_eth_call(self, transaction, block='latest'):
+        state = self.state_at(block)
+        return '0x' + state.call(transaction['to'], bytes.fromhex(transaction.get('data', '0x')[2:])).hex()
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        tx_hash = '0x' + keccak(hexstr=raw).hex()
+        with self._lock:
+            self.transactions[tx_hash] = (raw, self.head)
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        # Mined into the first block after it was sent
+        raw, sent_at = self.transactions.get(tx_hash, (None, self.head))
+        if raw is None or sent_at >= self.head:
+            return None
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockNumber': hex(sent_at + 1),
+            'blockHash': self.block_hash(sent_at + 1),
+            'status': '0x1',
+            'gasUsed': hex(60_000),
+            'cumulativeGasUsed': hex(60_000),
+            'effectiveGasPrice': hex(10 ** 9),
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'type': '0x2',
+        }
+
+
+# ============ HTTP server ============
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like hosted nodes
+    # Send headers and body in one segment; split writes stall on delayed ACKs
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server: "StubRPCServer" = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        payload = json.loads(body)
+        server.record(payload)
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.down:
+            self._reply(503, b'{"error": "service unavailable"}')
+            return
+        self._reply(200, json.dumps(server.chain.handle(payload)).encode())
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubRPCServer:
+    """Serves a StubChain over HTTP on a background thread"""
+
+    def __init__(self, chain: StubChain, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        """
+        Args:
+            chain: Chain answering the requests
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+            latency: Seconds every HTTP request is delayed, to emulate a remote node
+        """
+        self.chain = chain
+        self.latency = latency
+        self.down = False
+        self.requests = 0
+        self.calls: Counter = Counter()
+        self._counter_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, payload: Any) -> None:
+        requests = payload if isinstance(payload, list) else [payload]
+        with self._counter_lock:
+            self.requests += 1
+            self.calls.update(request.get('method') for request in requests)
+
+    def env(self, abi_dir: Optional[str] = None) -> Dict[str, str]:
+        """Environment variables pointing the backend at this chain"""
+        env = {
+            'RPC_URL': self.url,
+            'CHAIN_ID': str(CHAIN_ID),
+            'GOVERNANCE_CORE_ADDRESS': self.chain.addresses['GovernanceCore'],
+            'PROPOSAL_MANAGER_ADDRESS': self.chain.addresses['ProposalManager'],
+            'CITIZEN_REGISTRY_ADDRESS': self.chain.addresses['CitizenRegistry'],
+            'TREASURY_MANAGER_ADDRESS': self.chain.addresses['TreasuryManager'],
+            'MULTICALL_ADDRESS': self.chain.addresses['Multicall3'],
+        }
+        if abi_dir is not None:
+            env['ABI_DIR'] = str(abi_dir)
+        return env
+
+    def start(self) -> "StubRPCServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name='stub-rpc', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubRPCServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
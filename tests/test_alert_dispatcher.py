@@ -0,0 +1,203 @@
+"""
+Alert dispatcher against a stub webhook: rate limits, coalescing, retries
+and non-blocking enqueueing
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.alert_dispatcher import AlertDispatcher, SlackChannel, retry_after
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(stub.latency)
+        status, headers = stub.respond(body['text'])
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWebhook:
+    """Slack-style webhook recording (time, text) of every request, answering scripted statuses"""
+
+    def __init__(self, responses=(), latency: float = 0.0):
+        """
+        Args:
+            responses: (status, headers) answered in order, then 200
+            latency: Seconds every request is delayed
+        """
+        self.responses = list(responses)
+        self.latency = latency
+        self.received = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/hook"
+
+    def respond(self, text):
+        with self._lock:
+            self.received.append((time.monotonic(), text))
+            return self.responses.pop(0) if self.responses else (200, {})
+
+    def texts(self):
+        with self._lock:
+            return [text for _, text in self.received]
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.texts()) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.texts()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def webhook():
+    with StubWebhook() as stub:
+        yield stub
+
+
+def dispatcher(webhook, rate=100.0, burst=100, **kwargs):
+    return AlertDispatcher([SlackChannel(webhook.url, rate=rate, burst=burst)], **kwargs)
+
+
+def test_channel_rate_limit(webhook):
+    alerts = dispatcher(webhook, rate=20, burst=2)
+    for i in range(6):
+        alerts.send(f'alert {i}')
+    alerts.close()
+
+    times = [at for at, _ in webhook.received]
+    assert webhook.texts() == [f'alert {i}' for i in range(6)]
+    # Two from the burst, then one every 1/20 s
+    assert times[-1] - times[1] >= 4 / 20 * 0.9
+    assert alerts.stats()['sent'] == 6
+
+
+def test_alerts_with_a_dedup_key_are_coalesced(webhook):
+    alerts = dispatcher(webhook, coalesce_window=0.2)
+    for text in ('withdrawal 1', 'withdrawal 2', 'withdrawal 3'):
+        alerts.send(text, dedup_key='withdrawal:0xabc')
+    alerts.send('new proposal')
+
+    texts = webhook.wait_for(3)
+    alerts.close()
+
+    assert texts[:2] == ['withdrawal 1', 'new proposal']
+    assert texts[2].startswith('withdrawal 3\n(+1 more similar alerts')
+    assert alerts.stats()['coalesced'] == 2
+
+    # A new window starts once the previous one was flushed
+    alerts = dispatcher(webhook, coalesce_window=0.2)
+    alerts.send('withdrawal 4', dedup_key='withdrawal:0xabc')
+    alerts.close()
+    assert webhook.texts()[-1] == 'withdrawal 4'
+
+
+def test_failed_deliveries_are_retried_with_backoff(webhook):
+    webhook.responses = [(429, {'Retry-After': '0.05'}), (503, {})]
+    alerts = dispatcher(webhook)
+    alerts.send('treasury drained')
+    alerts.close()
+
+    times = [at for at, _ in webhook.received]
+    assert webhook.texts() == ['treasury drained'] * 3
+    # Retry-After is honoured, then the delay doubles
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 0.1
+    assert alerts.stats()['sent'] == 1 and alerts.stats()['failed'] == 0
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    soon = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+
+    assert retry_after('2.5', 1) == 2.5
+    assert 28 <= retry_after(soon, 1) <= 30
+    assert retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 1) == 0
+    assert retry_after('soon', 1) == retry_after(None, 1) == 1
+
+
+def test_http_date_retry_after_is_honoured(webhook):
+    past = format_datetime(datetime(2015, 10, 21, tzinfo=timezone.utc), usegmt=True)
+    webhook.responses = [(429, {'Retry-After': past})]
+    alerts = dispatcher(webhook)
+    alerts.send('quorum reached')
+    alerts.close()
+
+    assert webhook.texts() == ['quorum reached'] * 2
+    assert alerts.stats()['sent'] == 1
+
+
+class FlakyChannel(SlackChannel):
+    """Channel whose request building fails for one message"""
+
+    def request(self, message):
+        if message == 'malformed':
+            raise KeyError('text')
+        return super().request(message)
+
+
+def test_worker_survives_a_failing_delivery(webhook):
+    alerts = AlertDispatcher([FlakyChannel(webhook.url, rate=100, burst=100)])
+    for text in ('first', 'malformed', 'last'):
+        alerts.send(text)
+    alerts.close()
+
+    assert webhook.texts() == ['first', 'last']
+    assert alerts.stats()['sent'] == 2 and alerts.stats()['failed'] == 1
+
+
+def test_deliveries_give_up_on_client_errors_and_after_max_retries(webhook):
+    webhook.responses = [(429, {'Retry-After': '0'}), (429, {'Retry-After': '0'}), (403, {})]
+    alerts = dispatcher(webhook, max_retries=2)
+    alerts.send('first')
+    alerts.send('second')
+    alerts.close()
+
+    # 'first' exhausts its two attempts, 'second' is rejected for good
+    assert webhook.texts() == ['first', 'first', 'second']
+    assert alerts.stats()['sent'] == 0 and alerts.stats()['failed'] == 2
+
+
+def test_send_never_blocks_on_a_slow_webhook(webhook):
+    webhook.latency = 0.3
+    alerts = dispatcher(webhook, queue_size=2)
+
+    started = time.monotonic()
+    for i in range(50):
+        alerts.send(f'alert {i}')
+    elapsed = time.monotonic() - started
+    texts = webhook.wait_for(1)
+    alerts.close(timeout=0)
+
+    assert elapsed < 0.1
+    assert texts == ['alert 0']
+    # At most one in flight and two queued; the rest overflowed the queue
+    assert alerts.stats()['dropped'] in (47, 48)
@@ -0,0 +1,84 @@
+"""
+Async blockchain service against the stub chain: reads match the chain,
+concurrent calls overlap their round-trips and role reads fall back to none
+when the node is down
+"""
+
+import asyncio
+import time
+
+from services.async_blockchain_service import AsyncBlockchainService
+from tests.stub_chain import StubRPCServer, write_abis
+
+
+def connect(chain, rpc):
+    return AsyncBlockchainService.create(
+        rpc_url=rpc.url,
+        governance_core_address=chain.addresses['GovernanceCore'],
+        proposal_manager_address=chain.addresses['ProposalManager']
+    )
+
+
+def test_async_reads_match_chain_state(chain, chain_env):
+    async def run():
+        service = await connect(chain, chain_env)
+        try:
+            voter = next(iter(chain.voted))
+            return (
+                await service.get_proposal(3),
+                await service.get_vote_counts(3),
+                await service.has_voted(*voter),
+                await service.get_user_roles(chain.citizens[10]),
+                await service.get_proposal_count(),
+            )
+        finally:
+            await service.close()
+
+    proposal, votes, voted, roles, count = asyncio.run(run())
+
+    assert proposal['proposer'] == chain.proposals[3]['proposer']
+    assert votes['for_votes'] == str(chain.proposals[3]['votes'][0])
+    assert voted is True
+    assert roles == ['CITIZEN', 'DELEGATE']
+    assert count == len(chain.proposals)
+
+
+def test_concurrent_reads_overlap(chain, tmp_path, monkeypatch):
+    monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+    latency, reads = 0.1, 20
+
+    async def run(rpc):
+        service = await connect(chain, rpc)
+        try:
+            started = time.perf_counter()
+            proposals = await asyncio.gather(*(service.get_proposal(pid) for pid in range(1, reads + 1)))
+            return proposals, time.perf_counter() - started
+        finally:
+            await service.close()
+
+    with StubRPCServer(chain, latency=latency) as rpc:
+        proposals, elapsed = asyncio.run(run(rpc))
+
+    assert [p['proposer'] for p in proposals] == [chain.proposals[pid]['proposer'] for pid in range(1, reads + 1)]
+    # One after another this would take reads * latency
+    assert elapsed < reads * latency / 4
+
+
+def test_roles_fall_back_to_none_when_the_node_is_down(chain, tmp_path, monkeypatch):
+    from routes.governance import get_user_roles
+
+    monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+
+    async def run(rpc):
+        service = await connect(chain, rpc)
+        try:
+            rpc.down = True
+            return await service.get_user_roles(chain.admin), await get_user_roles(chain.admin, None, service, None)
+        finally:
+            await service.close()
+
+    with StubRPCServer(chain) as rpc:
+        roles, response = asyncio.run(run(rpc))
+
+    assert roles == []
+    assert response['roles'] == [] and response['is_citizen'] is False
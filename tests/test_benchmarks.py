@@ -0,0 +1,52 @@
+"""
+Smoke run of the benchmark suite at a tiny scale
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from tests.benchmarks import compare, percentile, summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([3.0], 0.99) == 3
+    assert percentile([], 0.5) == 0
+
+
+def test_compare_flags_regressions():
+    baseline = {'results': [summarize('a', [0.010] * 10, 1.0), summarize('b', [0.010] * 10, 1.0)]}
+    report = {'results': [summarize('a', [0.011] * 10, 1.1), summarize('b', [0.020] * 10, 2.0)]}
+
+    assert compare(report, baseline, tolerance=0.2) == ['b']
+
+
+def test_benchmark_report(tmp_path):
+    output = tmp_path / 'bench.json'
+    subprocess.run(
+        [
+            sys.executable, '-m', 'tests.benchmarks',
+            '--proposals', '12', '--votes', '3', '--citizens', '20', '--requests', '5',
+            '--scenarios', 'blockchain', 'snapshot', 'monitor',
+            '--output', str(output),
+        ],
+        cwd=ROOT,
+        check=True,
+        capture_output=True
+    )
+    report = json.loads(output.read_text())
+
+    names = {result['name'] for result in report['results']}
+    assert {'blockchain.get_proposal', 'snapshot.export(ndjson.gz)', 'monitor.poll'} <= names
+    for result in report['results']:
+        assert result['errors'] == 0
+        assert result['count'] > 0
+        assert result['p99_ms'] >= result['p50_ms'] > 0
+    assert report['scale']['proposals'] == 12
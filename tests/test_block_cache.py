@@ -0,0 +1,43 @@
+"""
+Block header cache: batched fetches, LRU eviction and reorg invalidation
+"""
+
+from web3 import Web3
+
+from services.block_cache import BlockHeaderCache
+from tests.stub_chain import StubRPCServer
+
+
+def test_missing_headers_are_fetched_in_one_batch(chain):
+    with StubRPCServer(chain) as rpc:
+        cache = BlockHeaderCache(Web3(Web3.HTTPProvider(rpc.url)))
+        blocks = [1, 2, 2, 3, 5, 8, 8]
+
+        timestamps = cache.get_timestamps(blocks)
+        assert timestamps == {number: chain.timestamp(number) for number in set(blocks)}
+        assert rpc.requests == 1 and rpc.calls['eth_getBlockByNumber'] == 5
+
+        # Cached blocks cost nothing, new ones share one more request
+        assert cache.get_timestamp(3) == chain.timestamp(3)
+        cache.get_timestamps([1, 13, 21])
+        assert rpc.requests == 2 and rpc.calls['eth_getBlockByNumber'] == 7
+        assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 7
+
+
+def test_lru_eviction_and_invalidation(chain):
+    with StubRPCServer(chain) as rpc:
+        cache = BlockHeaderCache(Web3(Web3.HTTPProvider(rpc.url)), maxsize=3)
+
+        cache.get_timestamps([1, 2, 3])
+        cache.get_timestamp(1)  # 1 is now the most recently used
+        cache.get_timestamp(4)
+        assert cache.stats()['size'] == 3
+        assert sorted(cache._headers) == [1, 3, 4]
+
+        cache.invalidate_from(3)
+        assert sorted(cache._headers) == [1]
+
+        # Hash lookups always ask the node, cached or not
+        before = rpc.calls['eth_getBlockByNumber']
+        assert cache.get_hashes([1]) == {1: chain.block_hash(1)}
+        assert rpc.calls['eth_getBlockByNumber'] == before + 1
@@ -0,0 +1,94 @@
+"""
+Delegation graph: transitive power, cycles, historical queries and reorgs
+"""
+
+import asyncio
+
+from services.delegation_graph import DelegationGraph
+
+A, B, C, D = (f'0x{n * 40}' for n in 'abcd')
+
+
+def events():
+    """Citizens A-D with power 1-4; A -> B in block 2, B -> C in block 3"""
+    log = []
+
+    def emit(block, name, **args):
+        log.append({'contract': 'CitizenRegistry', 'event': name, 'args': args,
+                    'block_number': block, 'log_index': len(log)})
+
+    for power, wallet in enumerate((A, B, C, D), start=1):
+        emit(1, 'CitizenRegistered', wallet=wallet, votingPower=power)
+        emit(1, 'CitizenshipApproved', wallet=wallet)
+    emit(2, 'VotingPowerDelegated', **{'from': A, 'to': B, 'power': 1})
+    emit(3, 'VotingPowerDelegated', **{'from': B, 'to': C, 'power': 2})
+    return log
+
+
+def build(transitive=True):
+    graph = DelegationGraph(transitive=transitive)
+    for event in events():
+        graph.apply_event(event)
+    return graph
+
+
+def test_transitive_power_and_history():
+    graph = build()
+
+    assert [graph.effective_power(x) for x in (A, B, C, D)] == [0, 0, 6, 4]
+    assert graph.effective_power(B, block=2) == 3
+    assert graph.effective_power(C, block=2) == 3
+    assert build(transitive=False).effective_power(C) == 5
+
+
+def test_memoized_power_follows_updates_and_reverts():
+    graph = build()
+    assert graph.effective_power(C) == 6
+
+    revocation = {'contract': 'CitizenRegistry', 'event': 'CitizenshipRevoked', 'args': {'wallet': A},
+                  'block_number': 4, 'log_index': 0}
+    graph.apply_event(revocation)
+    assert graph.effective_power(C) == 5
+
+    graph.revert_event(revocation)
+    assert graph.effective_power(C) == 6
+
+
+def test_cycles_are_detected_and_carry_no_power():
+    graph = build()
+    graph.apply_event({'contract': 'CitizenRegistry', 'event': 'VotingPowerDelegated',
+                       'args': {'from': C, 'to': A, 'power': 3}, 'block_number': 4, 'log_index': 0})
+
+    assert graph.cycles() == [[A, B, C]]
+    assert graph.cycles(block=3) == []
+    assert graph.describe(B)['in_cycle']
+    assert [graph.effective_power(x) for x in (A, B, C, D)] == [0, 0, 0, 4]
+
+
+def test_graph_loads_from_indexed_events(chain, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        registry = service.load_contract('CitizenRegistry', chain.addresses['CitizenRegistry'])
+        indexer = EventIndexer(service, db, {'CitizenRegistry': registry}, confirmations=0)
+        await indexer.sync()
+        graph = DelegationGraph(db)
+        await graph.load()
+        return graph
+
+    graph = asyncio.run(run())
+    delegated = dict.fromkeys(chain.citizens)
+    for i, wallet in enumerate(chain.citizens):
+        if i % 10 and i % 7 == 0:
+            delegated[wallet] = chain.delegates[i // 10]
+
+    for wallet in chain.citizens:
+        expected = 0 if delegated[wallet] else chain.voting_power[wallet] + sum(
+            chain.voting_power[other] for other, to in delegated.items() if to == wallet
+        )
+        assert graph.effective_power(wallet) == expected
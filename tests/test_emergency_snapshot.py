@@ -0,0 +1,193 @@
+"""
+Snapshot export: every format restores the same records, failed reads are
+retried, interrupted runs resume without losing or duplicating records and
+every read is pinned to the snapshot block
+"""
+
+import os
+
+import pytest
+from web3 import Web3
+
+import emergency_snapshot
+from emergency_snapshot import (
+    CHECKPOINT_FILE,
+    MANIFEST_FILE,
+    DatasetWriter,
+    flatten_record,
+    read_batch,
+    read_json,
+    restore,
+    unflatten_record,
+    write_json,
+)
+from tests.stub_chain import StubChain, StubRPCServer
+
+PROPOSALS = [
+    {"id": i, "proposer": "0x" + "ab" * 20, "description": f"Proposal {i}",
+     "votes": {"for": 10 ** 30 * i, "against": 2 ** 255 + i, "abstain": 0},
+     "timeline": {"start": 1700000000 + i, "end": 1700086400 + i}, "status": i % 4}
+    for i in range(1, 6)
+]
+VOTES = [{"proposal_id": 2, "voter": "0x" + "cd" * 20, "support": 1, "weight": 2 ** 128,
+          "block_number": 120, "log_index": 3, "transaction_hash": "0x" + "ef" * 32}]
+
+
+def export(directory, fmt):
+    files = {}
+    for name, records in (("proposals", PROPOSALS), ("votes", VOTES), ("citizens", [])):
+        state = {"records": 0, "bytes": 0, "parts": 0}
+        writer = DatasetWriter(str(directory), name, fmt, state)
+        writer.append(records[:3])
+        writer.append(records[3:])
+        writer.close()
+        files[name] = {"path": state["path"], "records": state["records"]}
+    write_json(str(directory / MANIFEST_FILE), {"type": "full", "format": fmt, "block_number": 120, "files": files})
+    return restore(str(directory))
+
+
+def test_flattened_rows_round_trip():
+    row = flatten_record(PROPOSALS[0])
+
+    assert row["votes.against"] == str(2 ** 255 + 1) and row["status"] == 1
+    assert unflatten_record(row) == PROPOSALS[0]
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "ndjson.gz", "ndjson.zst", "parquet"])
+def test_formats_restore_the_same_records(tmp_path, fmt):
+    pytest.importorskip({"ndjson.zst": "zstandard", "parquet": "pyarrow"}.get(fmt, "json"))
+
+    state = export(tmp_path, fmt)
+
+    assert state["proposals"] == {proposal["id"]: proposal for proposal in PROPOSALS}
+    assert state["votes"] == VOTES
+    assert state["citizens"] == {}
+
+
+# ============ Export ============
+
+class FlakyReader:
+    """Aggregated reads whose listed proposals fail the first ``failures`` times"""
+
+    def __init__(self, failing, failures=1):
+        self.failing = failing
+        self.failures = failures
+        self.reads = []
+
+    def aggregate(self, calls, block_identifier):
+        ids = [proposal_id for _, proposal_id in calls]
+        self.reads.append(ids)
+        fail = len(self.reads) <= self.failures
+        return [None if fail and proposal_id in self.failing else PROPOSAL_ROWS[proposal_id] for proposal_id in ids]
+
+
+PROPOSAL_ROWS = {
+    p["id"]: (p["id"], p["proposer"], p["description"], p["votes"]["for"], p["votes"]["against"],
+              p["votes"]["abstain"], p["timeline"]["start"], p["timeline"]["end"], p["status"])
+    for p in PROPOSALS
+}
+
+
+def test_failed_proposal_reads_are_retried(monkeypatch):
+    monkeypatch.setattr(emergency_snapshot, "encode_call", lambda pm, name, proposal_id: (name, proposal_id))
+    monkeypatch.setattr(emergency_snapshot.time, "sleep", lambda seconds: None)
+
+    reader = FlakyReader({2, 4})
+    assert read_batch(reader, None, [1, 2, 3, 4, 5], 120) == PROPOSALS
+    # Only the failed proposals are read again
+    assert reader.reads == [[1, 2, 3, 4, 5], [2, 4]]
+
+    # Still missing after the last attempt: the batch fails instead of shrinking
+    reader = FlakyReader({3}, failures=emergency_snapshot.MAX_RETRIES)
+    with pytest.raises(RuntimeError, match=r"\[3\]"):
+        read_batch(reader, None, [1, 2, 3], 120)
+
+
+def point_at(monkeypatch, chain, rpc, batch_size):
+    """Export snapshots of the stub chain served by ``rpc``"""
+    monkeypatch.setattr(emergency_snapshot, "w3", Web3(Web3.HTTPProvider(rpc.url)))
+    monkeypatch.setattr(emergency_snapshot, "BATCH_SIZE", batch_size)
+    for name in ("ProposalManager", "CitizenRegistry", "TreasuryManager"):
+        monkeypatch.setitem(emergency_snapshot.CONTRACTS, name, chain.addresses[name])
+
+
+def test_interrupted_export_resumes_where_it_stopped(chain, tmp_path, monkeypatch):
+    directory = str(tmp_path / "snapshot")
+    with StubRPCServer(chain) as rpc:
+        point_at(monkeypatch, chain, rpc, batch_size=7)
+
+        batches = []
+
+        def interrupted(reader, pm, batch, block_number):
+            batches.append(batch[0])
+            if batch[0] == 15:
+                raise ConnectionError("node unavailable")
+            return read_batch(reader, pm, batch, block_number)
+
+        monkeypatch.setattr(emergency_snapshot, "read_batch", interrupted)
+        assert emergency_snapshot.export_snapshot(directory, workers=1, fmt="ndjson.gz") is None
+        checkpoint = read_json(os.path.join(directory, CHECKPOINT_FILE))
+        completed = set(checkpoint["completed"])
+        # A batch written after the last checkpoint, cut short by the crash
+        with open(os.path.join(directory, "proposals.ndjson.gz"), "ab") as f:
+            f.write(b"\x1f\x8b partial batch")
+
+        def resumed(reader, pm, batch, block_number):
+            batches.append(batch[0])
+            return read_batch(reader, pm, batch, block_number)
+
+        batches.clear()
+        monkeypatch.setattr(emergency_snapshot, "read_batch", resumed)
+        assert emergency_snapshot.export_snapshot(directory, workers=1, fmt="ndjson.gz")
+
+    assert 2 not in completed and len(completed) < 5
+    # Completed batches are not read again
+    assert sorted(batches) == [1 + 7 * index for index in range(5) if index not in completed]
+    state = restore(directory)
+    assert sorted(state["proposals"]) == sorted(chain.proposals)
+    assert state["manifest"]["files"]["proposals"]["records"] == len(chain.proposals)
+
+
+@pytest.mark.parametrize("multicall", [True, False], ids=["multicall", "rpc-batch"])
+def test_reads_are_pinned_to_the_snapshot_block(tmp_path, monkeypatch, multicall):
+    chain = StubChain(proposals=10, votes_per_proposal=3, citizens=10)
+    treasury = chain.addresses["TreasuryManager"]
+    votes = {proposal_id: list(proposal["votes"]) for proposal_id, proposal in chain.proposals.items()}
+    balance = chain.balances[treasury]
+
+    def change(chain):
+        chain.proposals[11] = dict(chain.proposals[10], id=11)
+        chain.proposals[3]["votes"][0] += 10 ** 18
+        chain.balances[treasury] -= 10 ** 18
+        chain.citizens.append(chain.admin)
+
+    with StubRPCServer(chain) as rpc:
+        point_at(monkeypatch, chain, rpc, batch_size=4)
+        monkeypatch.setattr(emergency_snapshot, "MULTICALL_ADDRESS", chain.addresses["Multicall3"] if multicall else "")
+
+        def racing(reader, pm, batch, block_number):
+            # The chain moves on while the snapshot is being read
+            if batch[0] == 1:
+                chain.update(change)
+            return read_batch(reader, pm, batch, block_number)
+
+        monkeypatch.setattr(emergency_snapshot, "read_batch", racing)
+        assert emergency_snapshot.export_snapshot(str(tmp_path), workers=1, fmt="ndjson")
+        state = restore(str(tmp_path))
+
+        block = state["manifest"]["block_number"]
+        w3 = emergency_snapshot.w3
+        pm = w3.eth.contract(address=chain.addresses["ProposalManager"], abi=emergency_snapshot.ABIS["ProposalManager"])
+        cr = w3.eth.contract(address=chain.addresses["CitizenRegistry"], abi=emergency_snapshot.ABIS["CitizenRegistry"])
+        reader = emergency_snapshot.MulticallReader(
+            w3, None, pm, multicall_address=emergency_snapshot.MULTICALL_ADDRESS or None
+        )
+        now = emergency_snapshot.read_state(reader, pm, cr, chain.head)
+
+    assert block == chain.head - 1
+    assert state["manifest"]["data"] == {"proposal_count": 10, "citizens_count": 10, "treasury_balance": balance}
+    assert now == {"proposal_count": 11, "citizens_count": 11, "treasury_balance": balance - 10 ** 18}
+    assert {
+        proposal_id: [record["votes"]["for"], record["votes"]["against"], record["votes"]["abstain"]]
+        for proposal_id, record in state["proposals"].items()
+    } == votes
@@ -0,0 +1,145 @@
+"""
+Live event feed: filters, reverts, resume and slow-subscriber catch-up,
+including reverts that arrive while a subscriber is behind
+"""
+
+import asyncio
+import json
+
+from services.event_feed import EventFeed, format_sse, parse_event_id
+
+
+def vote(block, log_index, proposal_id=1):
+    return {'contract': 'ProposalManager', 'event': 'VoteCast', 'block_number': block, 'log_index': log_index,
+            'args': {'proposalId': proposal_id, 'voter': '0x' + 'a' * 40, 'support': 1, 'weight': 1}}
+
+
+def frames(chunks):
+    """(event name, id, data) of the non-comment frames"""
+    parsed = []
+    for chunk in chunks:
+        if chunk.startswith(':'):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        parsed.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return parsed
+
+
+async def collect(stream, count=None, until=None):
+    """Frames of a stream up to a number of frames or an event ID"""
+    chunks = []
+    async for chunk in stream:
+        if not chunk.startswith(':'):
+            chunks.append(chunk)
+        if len(chunks) == count or (until and f'id: {until}\n' in chunk):
+            break
+    await stream.aclose()
+    return frames(chunks)
+
+
+def test_filters_and_reverts():
+    async def run():
+        feed = EventFeed(db=None, keepalive=0.05)
+        stream = feed.stream(topics=['VoteCast'], proposal_ids=[2])
+        received = asyncio.ensure_future(collect(stream, 2))
+        while not feed.subscribers:
+            await asyncio.sleep(0)
+
+        await feed.apply(vote(10, 0, proposal_id=1))
+        await feed.apply({'contract': 'ProposalManager', 'event': 'ProposalCreated', 'block_number': 10,
+                          'log_index': 1, 'args': {'proposalId': 2}})
+        await feed.apply(vote(10, 2, proposal_id=2))
+        # Not a feed event even though the name would match a topic
+        await feed.apply({**vote(10, 3, proposal_id=2), 'contract': 'VotingEngine'})
+        await feed.revert(vote(10, 2, proposal_id=2))
+        result = await received
+        return result, feed.stats()
+
+    result, stats = asyncio.run(run())
+
+    assert [(name, id_) for name, id_, _ in result] == [('VoteCast', '10-2'), ('reverted', None)]
+    assert result[1][2]['id'] == '10-2'
+    assert stats['subscribers'] == 0
+
+
+def test_event_ids():
+    assert parse_event_id('120-7') == (120, 7)
+    assert 'id: 120-7\n' in format_sse(vote(120, 7))
+
+
+def test_resume_and_lagging_subscriber_catch_up(chain, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+        await indexer.sync()
+        events = await db.events.find({}, {'_id': 0}).sort([('block_number', 1), ('log_index', 1)]).to_list(None)
+        ids = [f"{e['block_number']}-{e['log_index']}" for e in events]
+        feed = EventFeed(db, buffer_size=4, keepalive=0.05)
+
+        # Resuming replays everything after the last seen event
+        resumed = await collect(feed.stream(after=parse_event_id(ids[9])), until=ids[-1])
+
+        # Publishing faster than the client reads overflows its buffer
+        lagging = asyncio.ensure_future(collect(feed.stream(), until=ids[-1]))
+        while not feed.subscribers:
+            await asyncio.sleep(0)
+        half = len(events) // 2
+        for event in events[half:]:
+            await feed.apply(event)
+        lagged = next(iter(feed.subscribers)).lagged
+        return ids, half, resumed, lagged, await lagging
+
+    ids, half, resumed, lagged, caught_up = asyncio.run(run())
+
+    assert [id_ for _, id_, _ in resumed] == ids[10:]
+    assert lagged
+    assert [id_ for _, id_, _ in caught_up] == ids[half:]
+
+
+def test_lagging_subscriber_hears_of_reverted_events_it_was_sent(chain, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+        await indexer.sync()
+        events = await db.events.find({}, {'_id': 0}).sort([('block_number', 1), ('log_index', 1)]).to_list(None)
+        ids = [f"{e['block_number']}-{e['log_index']}" for e in events]
+        feed = EventFeed(db, buffer_size=4, keepalive=0.05)
+
+        received = asyncio.ensure_future(collect(feed.stream(), until=ids[-1]))
+        while not feed.subscribers:
+            await asyncio.sleep(0)
+        subscriber = next(iter(feed.subscribers))
+        for event in events[:3]:
+            await feed.apply(event)
+            # Let the client read it
+            for _ in range(100):
+                if subscriber.queue.empty():
+                    break
+                await asyncio.sleep(0.01)
+
+        # The client falls behind, then the last event it was sent is orphaned
+        # and re-included at the same position
+        for event in events[3:10]:
+            await feed.apply(event)
+        lagged = subscriber.lagged
+        await feed.revert(events[2])
+        return ids, lagged, await received
+
+    ids, lagged, result = asyncio.run(run())
+
+    assert lagged
+    # Announced on catch-up, which then replays from before the orphaned event
+    assert [id_ for _, id_, _ in result] == ids[:3] + [None] + ids[2:]
+    assert result[3][0] == 'reverted' and result[3][2]['id'] == ids[2]
@@ -0,0 +1,71 @@
+"""
+Metrics registry, RPC call accounting, and the HTTP middleware
+"""
+
+import asyncio
+
+from services import metrics
+from services.metrics import MetricsMiddleware, Registry, Timings, request_timings
+from services.rpc_pool import RPCPool
+from tests.stub_chain import StubRPCServer
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value, route='/a"b')
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a\\"b"} 4' in lines
+
+
+def test_pool_counts_calls_and_errors_per_method(chain):
+    calls = metrics.RPC_CALLS.value(method='eth_blockNumber')
+    errors = metrics.RPC_ERRORS.value(method='eth_noSuchMethod')
+    batches = metrics.RPC_DURATION.count(method='batch')
+
+    with StubRPCServer(chain) as server:
+        pool = RPCPool(server.url)
+        timings = Timings()
+        token = request_timings.set(timings)
+        pool.send({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []})
+        pool.send([
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []},
+            {'jsonrpc': '2.0', 'id': 2, 'method': 'eth_noSuchMethod', 'params': []},
+        ])
+        request_timings.reset(token)
+        pool.close()
+
+    assert metrics.RPC_CALLS.value(method='eth_blockNumber') == calls + 2
+    assert metrics.RPC_ERRORS.value(method='eth_noSuchMethod') == errors + 1
+    assert metrics.RPC_DURATION.count(method='batch') == batches + 1
+    assert timings.header().startswith('rpc;dur=') and 'desc="2 calls"' in timings.header()
+
+
+def test_middleware_records_route_and_server_timing():
+    async def app(scope, receive, send):
+        metrics.add_timing('mongo', 0.002)
+        await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/nowhere', 'headers': []}
+    before = metrics.HTTP_REQUEST_DURATION.count(method='GET', route='unmatched', status='204')
+    asyncio.run(MetricsMiddleware(app, server_timing=True)(scope, receive, send))
+
+    headers = dict(sent[0]['headers'])
+    assert headers[b'server-timing'].startswith(b'mongo;dur=2.00;desc="1 calls", total;dur=')
+    assert metrics.HTTP_REQUEST_DURATION.count(method='GET', route='unmatched', status='204') == before + 1
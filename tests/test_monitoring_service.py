@@ -0,0 +1,77 @@
+"""
+Monitor log poller: one eth_getLogs per poll dispatched to rule handlers,
+recorded block hashes and retries after a failed poll
+"""
+
+from collections import Counter
+
+import pytest
+from web3 import Web3
+
+from services.rpc_pool import PooledHTTPProvider, RPCPool
+from tests.stub_chain import StubRPCServer
+
+
+def test_one_log_request_per_poll_feeds_every_rule(chain, chain_env):
+    import monitoring_service as monitor
+
+    with StubRPCServer(chain) as rpc:
+        poller = monitor.LogPoller(Web3(Web3.HTTPProvider(rpc.url)))
+        poller.watch(chain.addresses['ProposalManager'], monitor.PROPOSAL_MANAGER_ABI)
+        poller.watch(chain.addresses['TreasuryManager'], monitor.TREASURY_MANAGER_ABI)
+        poller.watch(chain.addresses['GovernanceCore'], monitor.GOVERNANCE_CORE_ABI)
+        dispatched = Counter()
+
+        @poller.on('ProposalStateChanged')
+        def broken_rule(event):
+            raise KeyError('oldState')
+
+        for name in ('ProposalStateChanged', 'Withdrawal', 'RoleGranted'):
+            poller.on(name)(lambda event: dispatched.update([event['event']]))
+
+        end = chain.head - 64
+        count = poller.poll(0, end)
+        # A re-scan after a reorg does not dispatch the same logs twice
+        poller.ring.truncate(end // 2)
+        poller.poll(end // 2 + 1, end)
+
+    names = {topic: event.event_name for (_, topic), event in poller.events.items()}
+    expected = Counter(
+        names[log['topics'][0]] for log in chain.logs(0, end, poller.addresses) if log['topics'][0] in names
+    )
+    assert rpc.calls['eth_getLogs'] == 2
+    assert count == sum(expected.values())
+    rules = ('ProposalStateChanged', 'Withdrawal', 'RoleGranted')
+    assert dispatched == Counter({name: expected[name] for name in rules})
+    assert dispatched['ProposalStateChanged'] >= len(chain.proposals) and dispatched['Withdrawal'] > 0
+
+
+def test_failed_poll_can_be_retried_with_a_smaller_window(chain, chain_env):
+    import monitoring_service as monitor
+
+    pool = RPCPool(chain_env.url)
+    try:
+        poller = monitor.LogPoller(Web3(PooledHTTPProvider(pool)))
+        poller.watch(chain.addresses['ProposalManager'], monitor.PROPOSAL_MANAGER_ABI)
+        poller.watch(chain.addresses['GovernanceCore'], monitor.GOVERNANCE_CORE_ABI)
+        # Logs fill all but the last 64 blocks
+        middle = (chain.head - 64) // 2
+
+        assert poller.poll(0, middle - 1) > 0
+        get_hashes = poller.headers.get_hashes
+
+        def unavailable(numbers):
+            raise ConnectionError('node unavailable')
+
+        poller.headers.get_hashes = unavailable
+        with pytest.raises(ConnectionError):
+            poller.poll(middle, chain.head)
+        assert poller.ring.tip[0] == middle - 1
+
+        # The monitor retries the same start block with a smaller window
+        poller.headers.get_hashes = get_hashes
+        assert poller.poll(middle, middle + 10) > 0
+        assert poller.ring.tip == (middle + 10, chain.block_hash(middle + 10).lower())
+        assert poller.check_reorg() is None
+    finally:
+        pool.close()
@@ -0,0 +1,97 @@
+"""
+Nonce manager and gas price cache: concurrent reservations, resyncs and one
+eth_gasPrice per block
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.nonce_manager import GasPriceCache, NonceManager
+
+ACCOUNT = '0x' + 'ab' * 20
+
+
+def test_concurrent_reservations_never_share_a_nonce():
+    manager = NonceManager(ACCOUNT)
+    reads = []
+
+    def fetch():
+        reads.append(1)
+        return 7
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        ranges = list(pool.map(lambda count: manager.reserve(fetch, count=count), [1, 2, 3] * 50))
+
+    nonces = [nonce for reserved in ranges for nonce in reserved]
+    assert sorted(nonces) == list(range(7, 7 + 300))
+    assert len(reads) == 1
+
+
+def test_async_reservations_read_the_chain_once():
+    manager = NonceManager(ACCOUNT)
+    reads = []
+
+    async def fetch():
+        reads.append(1)
+        await asyncio.sleep(0.01)
+        return 3
+
+    async def run():
+        return await asyncio.gather(*(manager.areserve(fetch, count=2) for _ in range(20)))
+
+    nonces = [nonce for reserved in asyncio.run(run()) for nonce in reserved]
+    assert sorted(nonces) == list(range(3, 43))
+    assert len(reads) == 1
+
+    manager.resync()
+    assert manager.needs_sync
+    assert list(asyncio.run(manager.areserve(fetch))) == [3]
+
+
+class ResyncOnRelease:
+    """Lock letting a resync from another thread in the first time it is released"""
+
+    def __init__(self, manager):
+        self.lock = threading.Lock()
+        self.manager = manager
+        self.armed = True
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        if self.armed:
+            self.armed = False
+            self.manager.resync()
+
+
+def test_a_resync_never_lands_between_seeding_and_reserving():
+    async def fetch():
+        return 5
+
+    sync_manager, async_manager = NonceManager(ACCOUNT), NonceManager(ACCOUNT)
+    sync_manager._lock = ResyncOnRelease(sync_manager)
+    async_manager._lock = ResyncOnRelease(async_manager)
+
+    assert list(sync_manager.reserve(lambda: 5, count=2)) == [5, 6]
+    assert list(asyncio.run(async_manager.areserve(fetch, count=2))) == [5, 6]
+    # The resync took effect after the reservation
+    assert sync_manager.needs_sync and async_manager.needs_sync
+
+
+def test_gas_price_is_fetched_once_per_block():
+    prices = iter(range(100, 200))
+    fetch = lambda: next(prices)
+    cache = GasPriceCache(max_age=3600)
+
+    cache.observe_head(10)
+    assert [cache.get(fetch), cache.get(fetch)] == [100, 100]
+
+    # A receipt from an older block does not expire the price
+    cache.observe_head(9)
+    assert cache.get(fetch) == 100
+
+    cache.observe_head(11)
+    assert [cache.get(fetch), cache.get(fetch)] == [101, 101]
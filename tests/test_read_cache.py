@@ -0,0 +1,82 @@
+"""
+Read-through cache: prefix invalidation, expiry, eviction and load coalescing
+"""
+
+import asyncio
+
+from services.read_cache import CacheInvalidator, ReadThroughCache
+
+
+def filled(**kwargs):
+    cache = ReadThroughCache(**kwargs)
+    cache.set(('GovernanceCore', 'getGovernanceParams'), {'quorum_percentage': 1000})
+    cache.set(('GovernanceCore', 'getProposalCount'), 30)
+    for proposal_id in range(1, 6):
+        cache.set(('ProposalManager', 'getProposal', proposal_id), {'id': proposal_id})
+        cache.set(('ProposalManager', 'getVoteCounts', proposal_id), {'for_votes': '0'})
+    return cache
+
+
+def test_invalidation_drops_only_matching_keys():
+    cache = filled()
+
+    assert cache.invalidate('ProposalManager', 'getProposal', 3) == 1
+    assert cache.get(('ProposalManager', 'getProposal', 3)) == (False, None)
+    assert cache.get(('ProposalManager', 'getProposal', 4)) == (True, {'id': 4})
+    assert cache.invalidate('ProposalManager', 'getProposal', 3) == 0
+
+    assert cache.invalidate('ProposalManager') == 9
+    assert cache.get(('GovernanceCore', 'getProposalCount')) == (True, 30)
+    assert cache.invalidate() == 2
+    assert cache.stats()['size'] == 0 and cache.stats()['invalidations'] == 12
+    # The prefix index is emptied along with the entries
+    assert cache._prefixes == {}
+
+
+def test_expired_and_evicted_entries_leave_the_index():
+    cache = filled(maxsize=4, max_block_age=10)
+
+    assert cache.stats()['evictions'] == 8
+    assert set(cache._prefixes[('ProposalManager',)]) == set(cache._entries)
+
+    cache.observe_head(5)
+    cache.set(('GovernanceCore', 'getProposalCount'), 31)
+    cache.observe_head(20)
+    assert cache.get(('GovernanceCore', 'getProposalCount')) == (False, None)
+    assert ('GovernanceCore',) not in cache._prefixes
+    assert cache.invalidate('ProposalManager', 'getVoteCounts') == 2
+
+
+def test_events_invalidate_affected_reads():
+    cache = filled()
+    invalidator = CacheInvalidator(cache)
+
+    async def run():
+        await invalidator.apply({'contract': 'ProposalManager', 'event': 'VoteCast', 'args': {'proposalId': 2}})
+        await invalidator.revert({'contract': 'ProposalManager', 'event': 'ProposalCreated', 'args': {'proposalId': 5}})
+        await invalidator.checkpoint(120)
+
+    asyncio.run(run())
+
+    assert {key for key in cache._entries if key[-1] in (2, 5)} == set()
+    assert cache.get(('GovernanceCore', 'getProposalCount')) == (False, None)
+    assert cache.get(('GovernanceCore', 'getGovernanceParams'))[0]
+    assert cache.head_block == 120
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        key = ('GovernanceCore', 'getProposalCount')
+        return await asyncio.gather(*(cache.aget_or_load(key, load) for _ in range(10)))
+
+    assert asyncio.run(run()) == [42] * 10
+    assert len(loads) == 1
+    assert cache.get(('GovernanceCore', 'getProposalCount')) == (True, 42)
@@ -0,0 +1,125 @@
+"""
+Response cache middleware: hits, ETag revalidation, bypasses and reorgs
+"""
+
+import asyncio
+
+from services.response_cache import ResponseCache, ResponseCacheMiddleware
+
+
+class App:
+    """ASGI app answering /api/governance/* with a body set by the test"""
+
+    def __init__(self):
+        self.body = b'{"proposals":[]}'
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        status = 404 if scope['path'].endswith('/missing') else 200
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def request(middleware, path='/api/governance/proposals', query=b'', etag=None):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    headers = [(b'if-none-match', etag.encode())] if etag else []
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': headers}
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def build(block=100, bypass=None):
+    app = App()
+    head = {'block': block}
+    cache = ResponseCache(maxsize=2)
+    middleware = ResponseCacheMiddleware(app, cache, lambda: head['block'], exclude=('/api/governance/rpc/',),
+                                         bypass=bypass)
+    return app, head, cache, middleware
+
+
+def test_repeat_requests_are_served_from_cache():
+    app, head, cache, middleware = build()
+
+    status, headers, body = request(middleware, query=b'limit=10&status=ACTIVE')
+    assert (status, body, app.calls) == (200, app.body, 1)
+    assert headers[b'cache-control'] == b'public, max-age=0'
+
+    # Parameter order does not matter
+    assert request(middleware, query=b'status=ACTIVE&limit=10')[2] == app.body
+    assert request(middleware, query=b'limit=20')[0] == 200
+    assert app.calls == 2
+
+    etag = headers[b'etag'].decode()
+    assert request(middleware, query=b'limit=10&status=ACTIVE', etag=f'W/{etag}') == (304, {
+        b'etag': etag.encode(), b'cache-control': b'public, max-age=0'
+    }, b'')
+    assert cache.stats()['hits'] == 2
+
+
+def test_new_blocks_rerender_but_unchanged_bodies_stay_valid():
+    app, head, cache, middleware = build()
+    _, headers, _ = request(middleware)
+    etag = headers[b'etag'].decode()
+
+    head['block'] = 101
+    assert request(middleware, etag=etag)[0] == 304
+    app.body = b'{"proposals":[1]}'
+    head['block'] = 102
+    status, headers, body = request(middleware, etag=etag)
+
+    assert (status, body, app.calls) == (200, app.body, 3)
+    assert headers[b'etag'].decode() != etag
+
+
+def test_uncacheable_requests_pass_through():
+    app, head, cache, middleware = build()
+    for _ in range(2):
+        assert request(middleware, path='/api/governance/missing')[0] == 404
+        request(middleware, path='/api/governance/rpc/stats')
+        request(middleware, path='/api/status')
+    head['block'] = None
+    request(middleware)
+    request(middleware)
+
+    assert app.calls == 8
+    assert cache.stats()['size'] == 0
+
+
+def test_chain_head_reads_are_never_cached():
+    def reads_chain_head(scope):
+        return scope['path'] == '/api/governance/params' and b'at_block' not in scope['query_string']
+
+    app, head, cache, middleware = build(bypass=reads_chain_head)
+    for _ in range(2):
+        _, headers, _ = request(middleware, path='/api/governance/params')
+        assert b'etag' not in headers
+    assert app.calls == 2
+
+    # Pinned to a block the answer no longer moves with the head
+    request(middleware, path='/api/governance/params', query=b'at_block=90')
+    request(middleware, path='/api/governance/params', query=b'at_block=90')
+    assert app.calls == 3 and cache.stats()['size'] == 1
+
+
+def test_reorg_drops_responses_of_orphaned_blocks():
+    app, head, cache, middleware = build()
+    request(middleware)
+    head['block'] = 101
+    request(middleware)
+
+    asyncio.run(cache.revert({'block_number': 101}))
+    app.body = b'{"proposals":[2]}'
+
+    assert request(middleware)[2] == app.body
+    head['block'] = 100
+    assert request(middleware)[2] == b'{"proposals":[]}'
+    assert app.calls == 3
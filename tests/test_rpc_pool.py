@@ -0,0 +1,67 @@
+"""
+RPC pool against stub chain endpoints: failover, hedging and batching
+"""
+
+import time
+
+from web3 import Web3
+
+from services.rpc_pool import PooledHTTPProvider, RPCPool
+from tests.stub_chain import StubRPCServer
+
+BLOCK_NUMBER = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+
+
+def test_pool_fails_over_from_unavailable_endpoint(chain):
+    with StubRPCServer(chain) as down, StubRPCServer(chain) as healthy:
+        down.down = True
+        pool = RPCPool([down.url, healthy.url])
+        try:
+            w3 = Web3(PooledHTTPProvider(pool))
+
+            assert w3.eth.block_number == chain.head
+            assert w3.eth.block_number == chain.head
+            assert pool.failovers == 1
+            # The failed endpoint is benched, so the healthy one is preferred
+            assert pool.endpoint_uri == healthy.url
+        finally:
+            pool.close()
+
+
+def test_pool_hedges_slow_reads(chain):
+    with StubRPCServer(chain, latency=1.0) as slow, StubRPCServer(chain) as fast:
+        pool = RPCPool([slow.url, fast.url], hedge_delay=0.05)
+        try:
+            start = time.monotonic()
+            response = pool.send(BLOCK_NUMBER)
+
+            assert time.monotonic() - start < 0.9
+            assert int(response['result'], 16) == chain.head
+            assert (pool.hedged, pool.hedges_won) == (1, 1)
+        finally:
+            pool.close()
+
+
+def test_pool_never_hedges_writes(chain):
+    with StubRPCServer(chain, latency=0.3) as slow, StubRPCServer(chain) as fast:
+        pool = RPCPool([slow.url, fast.url], hedge_delay=0.01)
+        try:
+            pool.send({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_sendRawTransaction', 'params': ['0x1234']})
+
+            assert slow.calls['eth_sendRawTransaction'] + fast.calls['eth_sendRawTransaction'] == 1
+            assert pool.hedged == 0
+        finally:
+            pool.close()
+
+
+def test_pool_batches_split_by_size(chain):
+    with StubRPCServer(chain) as server:
+        pool = RPCPool(server.url)
+        try:
+            blocks = pool.batch_request([('eth_getBlockByNumber', [hex(n), False]) for n in range(25)],
+                                        max_batch_size=10)
+
+            assert [int(block['number'], 16) for block in blocks] == list(range(25))
+            assert server.requests == 3
+        finally:
+            pool.close()
@@ -0,0 +1,109 @@
+"""
+Versioned governance state: as-of-block proposals, roles and stats
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from services import state_history
+from services.governance_stats import STATS_ID, GovernanceStatsProjection
+from services.state_history import StateHistory
+
+
+def test_state_at_every_block_matches_replayed_events(chain, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        contracts = {'GovernanceCore': service.governance_core, 'ProposalManager': service.proposal_manager}
+        indexer = EventIndexer(service, db, contracts, page_size=40, confirmations=0)
+        await indexer.ensure_indexes()
+        await state_history.ensure_indexes(db)
+        history = StateHistory(db)
+        indexer.projections.insert(0, history)
+        indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+        await indexer.sync()
+
+        events = await db.events.find({}, {'_id': 0}).sort([('block_number', 1), ('log_index', 1)]).to_list(None)
+        votes = [e for e in events if e['event'] == 'VoteCast']
+        middle = votes[len(votes) // 2]['block_number']
+        proposal_id = int(votes[len(votes) // 2]['args']['proposalId'])
+        grant = next(e for e in events if e['event'] == 'RoleGranted' and e['args']['account'] == chain.citizens[10])
+
+        current = await db.proposals.find_one({'id': proposal_id}, {'_id': 0})
+        latest = await state_history.state_at(db, 'proposal', proposal_id, chain.head)
+        # A rollback past the middle block reopens the versions it replaced
+        await history.revert({'block_number': middle + 1})
+
+        return {
+            'votes_until_middle': [e for e in votes if e['block_number'] <= middle],
+            'proposal_id': proposal_id,
+            'proposal': await state_history.state_at(db, 'proposal', proposal_id, middle),
+            'stats': await state_history.state_at(db, 'stats', STATS_ID, middle),
+            'roles_before': await state_history.state_at(db, 'roles', chain.citizens[10], grant['block_number'] - 1),
+            'roles_after': await state_history.state_at(db, 'roles', chain.citizens[10], chain.head),
+            'current': current,
+            'latest': latest,
+            'rolled_back': await state_history.state_at(db, 'proposal', proposal_id, chain.head),
+        }
+
+    result = asyncio.run(run())
+    votes = [e for e in result['votes_until_middle'] if int(e['args']['proposalId']) == result['proposal_id']]
+
+    assert result['proposal']['for_votes'] == str(sum(int(e['args']['weight']) for e in votes if e['args']['support'] == 1))
+    assert result['stats']['total_votes'] == len(result['votes_until_middle'])
+    assert result['roles_before'] is None
+    assert result['roles_after'] == {'roles': ['CITIZEN', 'DELEGATE']}
+    assert result['latest'] == result['current']
+    assert result['rolled_back'] == result['proposal']
+
+
+def test_as_of_queries_start_at_the_first_versioned_block(service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from routes.governance import require_indexed
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+
+    async def rejected(request, at_block):
+        with pytest.raises(HTTPException) as e:
+            await require_indexed(request, at_block)
+        return e.value.status_code
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        contracts = {'GovernanceCore': service.governance_core, 'ProposalManager': service.proposal_manager}
+        indexer = EventIndexer(service, db, contracts, confirmations=0)
+        indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(indexer=indexer, db=db)))
+        # Indexed before the history was enabled
+        head = await indexer.sync()
+        before_baseline = await rejected(request, head)
+
+        history = StateHistory(db)
+        versioned = await history.baseline(head)
+        return {
+            'before_baseline': before_baseline,
+            'versioned': versioned,
+            'again': await history.baseline(head + 1),
+            'first_block': await state_history.first_block(db),
+            'earlier': await rejected(request, head - 1),
+            'at_baseline': await require_indexed(request, head),
+            'stats': await state_history.state_at(db, 'stats', STATS_ID, head),
+            'head': head,
+        }
+
+    result = asyncio.run(run())
+
+    assert result['before_baseline'] == 400 and result['earlier'] == 400
+    assert result['versioned'] > 0 and result['again'] == 0
+    assert result['first_block'] == result['at_baseline'] == result['head']
+    assert result['stats']['total_votes'] > 0
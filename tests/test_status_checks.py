@@ -0,0 +1,52 @@
+"""
+Status check storage: timestamp migration, range queries and cursor pagination
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import status_checks
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_cursor_round_trip():
+    doc = {'id': 'abc', 'timestamp': START + timedelta(milliseconds=1500)}
+
+    assert status_checks.decode_cursor(status_checks.encode_cursor(doc)) == (doc['timestamp'], 'abc')
+    with pytest.raises(ValueError):
+        status_checks.build_query(cursor='12345')
+
+
+def test_migrated_checks_page_by_cursor_within_range(scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        # Legacy documents with ISO strings, two sharing a timestamp
+        await db.status_checks.insert_many([
+            {'id': f'{i:03d}', 'client_name': 'probe', 'timestamp': (START + timedelta(minutes=i // 2)).isoformat()}
+            for i in range(20)
+        ])
+        converted = await status_checks.migrate_string_timestamps(db, batch_size=7)
+        await status_checks.ensure_indexes(db)
+
+        pages, cursor = [], None
+        while True:
+            query = status_checks.build_query(since=START + timedelta(minutes=1), cursor=cursor)
+            page = await status_checks.collection(db).find(query, status_checks.PROJECTION) \
+                .sort(status_checks.SORT).limit(3).to_list(3)
+            if not page:
+                return converted, pages
+            pages.append(page)
+            cursor = status_checks.encode_cursor(page[-1])
+
+    converted, pages = asyncio.run(run())
+
+    assert converted == 20
+    assert [doc['id'] for page in pages for doc in page] == [f'{i:03d}' for i in range(2, 20)]
+    assert pages[0][0]['timestamp'] == START + timedelta(minutes=1)
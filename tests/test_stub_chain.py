@@ -0,0 +1,332 @@
+"""
+Backend services against the stub chain: contract reads, event scans,
+reorg rollback and crash recovery in the event indexer, and proposal listing
+"""
+
+import asyncio
+
+from tests.stub_chain import StubChain, StubRPCServer, role_hash, write_abis
+
+
+# ============ Contract reads ============
+
+def test_single_reads_match_chain_state(chain, service):
+    proposal = chain.proposals[3]
+    result = service.get_proposal(3)
+
+    assert result['proposer'] == proposal['proposer']
+    assert result['metadata_hash'] == proposal['metadata_hash']
+    assert result['for_votes'] == str(proposal['votes'][0])
+    assert service.get_vote_counts(3)['against_votes'] == str(proposal['votes'][1])
+    assert service.get_proposal_count() == len(chain.proposals)
+    assert service.get_governance_params()['quorum_percentage'] == chain.params[2]
+
+
+def test_multicall_reads_match_single_reads(chain, service):
+    ids = list(chain.proposals)
+    batched = service.get_proposals(ids)
+
+    assert [batched[pid]['for_votes'] for pid in ids] == [str(chain.proposals[pid]['votes'][0]) for pid in ids]
+    roles = service.get_roles_for_addresses(chain.citizens[:11])
+    assert roles[chain.citizens[10]] == ['CITIZEN', 'DELEGATE']
+    assert roles[chain.citizens[1]] == ['CITIZEN']
+    assert service.has_role('GUARDIAN', chain.admin)
+
+
+def test_roles_fall_back_to_none_when_the_node_is_down(chain, chain_env, service):
+    chain_env.down = True
+    try:
+        assert service.get_user_roles(chain.admin) == []
+    finally:
+        chain_env.down = False
+
+
+def test_event_scan_returns_every_vote(chain, service):
+    votes = list(service.listen_to_events('VoteCast', 0, page_size=7, confirmations=0))
+
+    assert len(votes) == len(chain.voted)
+    assert {(v['args']['proposalId'], v['args']['voter']) for v in votes} == chain.voted
+    assert all(v['timestamp'] == chain.timestamp(v['block_number']) for v in votes)
+
+
+def test_roles_granted_by_events(chain):
+    assert chain.citizens[20] in chain.roles[role_hash('DELEGATE')]
+    assert chain.citizens[21] not in chain.roles[role_hash('DELEGATE')]
+
+
+# ============ Indexer ============
+
+def test_indexer_rolls_back_reorged_blocks(tmp_path, monkeypatch, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.blockchain_service import BlockchainService
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+    # A chain of its own: the reorg changes its block hashes
+    chain = StubChain(proposals=10, votes_per_proposal=3, citizens=10, events_per_block=2)
+    monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+
+    with StubRPCServer(chain) as rpc:
+        service = BlockchainService(
+            rpc_url=rpc.url,
+            governance_core_address=chain.addresses['GovernanceCore'],
+            proposal_manager_address=chain.addresses['ProposalManager']
+        )
+
+        async def run():
+            db = AsyncIOMotorClient(url)[name]
+            indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+            await indexer.ensure_indexes()
+            await indexer.sync()
+            last = await db.events.find_one(sort=[('block_number', -1)])
+
+            fork_block = chain.reorg(chain.head - last['block_number'] + 3)
+            await indexer.sync()
+
+            reindexed = await db.events.find_one({'_id': last['_id']}) or await db.events.find_one(
+                {'transaction_hash': last['transaction_hash']}
+            )
+            proposal = await db.proposals.find_one({'id': 10})
+            return last, fork_block, reindexed, proposal, await db.votes.count_documents({})
+
+        last, fork_block, reindexed, proposal, votes = asyncio.run(run())
+        service.pool.close()
+
+    assert fork_block < last['block_number']
+    assert reindexed['block_hash'] == chain.block_hash(last['block_number']) != last['block_hash']
+    assert votes == len(chain.voted)
+    assert proposal['for_votes'] == str(chain.proposals[10]['votes'][0])
+
+
+class Crash:
+    """Projection failing on the nth VoteCast, after the others applied it"""
+
+    def __init__(self, nth):
+        self.remaining = nth
+
+    async def apply(self, event):
+        if event['event'] == 'VoteCast':
+            self.remaining -= 1
+            if self.remaining == 0:
+                raise RuntimeError('crash')
+
+
+def test_indexer_resumes_projections_interrupted_by_a_crash(chain, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import STATS_ID, GovernanceStatsProjection
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+        await indexer.ensure_indexes()
+        indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+        crash = Crash(nth=40)
+        indexer.add_projection(crash)
+        try:
+            await indexer.sync()
+        except RuntimeError:
+            pass
+        pending = await db.events.count_documents({'pending': True})
+
+        indexer.projections.remove(crash)
+        await indexer.sync()
+        return (
+            pending,
+            await db.events.count_documents({'pending': True}),
+            await db.governance_stats.find_one({'_id': STATS_ID}),
+            await db.proposals.find({}, {'_id': 0}).to_list(None),
+        )
+
+    pending_after_crash, pending, stats, proposals = asyncio.run(run())
+
+    assert pending_after_crash > 0 and pending == 0
+    assert stats['total_votes'] == len(chain.voted)
+    for proposal in proposals:
+        assert proposal['for_votes'] == str(chain.proposals[proposal['id']]['votes'][0])
+
+
+class RevertCrash:
+    """Projection failing on the nth reverted VoteCast, after the others reverted it"""
+
+    def __init__(self, nth):
+        self.remaining = nth
+
+    async def apply(self, event):
+        pass
+
+    async def revert(self, event):
+        if event['event'] == 'VoteCast':
+            self.remaining -= 1
+            if self.remaining == 0:
+                raise RuntimeError('crash')
+
+
+def test_interrupted_rollback_reverts_nothing_twice(tmp_path, monkeypatch, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.blockchain_service import BlockchainService
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import STATS_ID, GovernanceStatsProjection
+    from services.vote_tally import VoteTally
+
+    url, name = scratch_db
+    chain = StubChain(proposals=10, votes_per_proposal=3, citizens=10, events_per_block=2)
+    monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+
+    with StubRPCServer(chain) as rpc:
+        service = BlockchainService(
+            rpc_url=rpc.url,
+            governance_core_address=chain.addresses['GovernanceCore'],
+            proposal_manager_address=chain.addresses['ProposalManager']
+        )
+
+        async def run():
+            db = AsyncIOMotorClient(url)[name]
+            indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+            await indexer.ensure_indexes()
+            crash = RevertCrash(nth=3)
+            indexer.projections.insert(0, crash)
+            indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+            await indexer.sync()
+
+            last = await db.events.find_one(sort=[('block_number', -1)])
+            chain.reorg(chain.head - last['block_number'] + 6)
+            try:
+                await indexer.sync()
+            except RuntimeError:
+                pass
+            reverting = await db.events.count_documents({'reverting': True})
+
+            # A restarted process rebuilds its in-memory tallies mid-rollback
+            tally = VoteTally(db, quorum_bps=0)
+            await tally.load()
+            indexer.projections.remove(crash)
+            indexer.add_projection(tally)
+            await indexer.sync()
+            return (
+                reverting,
+                await db.governance_stats.find_one({'_id': STATS_ID}),
+                await db.proposals.find({}, {'_id': 0}).to_list(None),
+                tally,
+            )
+
+        reverting, stats, proposals, tally = asyncio.run(run())
+        service.pool.close()
+
+    assert reverting > 0
+    assert stats['total_votes'] == len(chain.voted)
+    for proposal in proposals:
+        votes = chain.proposals[proposal['id']]['votes']
+        assert proposal['for_votes'] == str(votes[0])
+        assert tally.tally(proposal['id'])['for_votes'] == str(votes[0])
+
+
+def test_citizen_counts_survive_crashes_between_status_and_count(tmp_path, monkeypatch, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.blockchain_service import BlockchainService
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import STATS_ID, GovernanceStatsProjection
+
+    class CountCrash(GovernanceStatsProjection):
+        """Stats failing once after storing a citizen's status, before counting it"""
+        crash_on = None
+
+        async def _inc(self, event, changes, revert=False):
+            if 'total_citizens' in changes and self.crash_on == ('revert' if revert else 'apply'):
+                self.crash_on = None
+                raise RuntimeError('crash')
+            await super()._inc(event, changes, revert=revert)
+
+    url, name = scratch_db
+    chain = StubChain(proposals=2, votes_per_proposal=1, citizens=8, events_per_block=2)
+    monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+
+    with StubRPCServer(chain) as rpc:
+        service = BlockchainService(
+            rpc_url=rpc.url,
+            governance_core_address=chain.addresses['GovernanceCore'],
+            proposal_manager_address=chain.addresses['ProposalManager']
+        )
+        registry = service.load_contract('CitizenRegistry', chain.addresses['CitizenRegistry'])
+
+        async def citizens(db):
+            return (await db.governance_stats.find_one({'_id': STATS_ID}))['total_citizens']
+
+        async def sync_after_crash(indexer, stats, crash_on):
+            stats.crash_on = crash_on
+            try:
+                await indexer.sync()
+            except RuntimeError:
+                pass
+            assert stats.crash_on is None
+            await indexer.sync()
+
+        async def run():
+            db = AsyncIOMotorClient(url)[name]
+            indexer = EventIndexer(service, db, {'CitizenRegistry': registry}, confirmations=0)
+            await indexer.ensure_indexes()
+            stats = CountCrash(db, reconcile_interval=0)
+            indexer.add_projection(stats)
+            await sync_after_crash(indexer, stats, 'apply')
+            applied = await citizens(db)
+
+            # Orphan the second half of the approvals; the same logs are re-included
+            approvals = await db.events.find({'event': 'CitizenshipApproved'}).sort('block_number', 1).to_list(None)
+            chain.reorg(chain.head - approvals[len(approvals) // 2]['block_number'] + 1)
+            await sync_after_crash(indexer, stats, 'revert')
+            return applied, await citizens(db), await db.citizens.count_documents({'status': 'ACTIVE'})
+
+        applied, reindexed, active = asyncio.run(run())
+        service.pool.close()
+
+    assert applied == reindexed == active == len(chain.citizens)
+
+
+# ============ Proposal listing ============
+
+def test_list_proposals_pages_by_cursor(chain, service, scratch_db):
+    from fastapi import Response
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from routes.governance import ProposalState, list_proposals
+    from services.event_indexer import EventIndexer
+
+    url, name = scratch_db
+    proposer = chain.proposals[1]['proposer']
+
+    async def pages(db, **filters):
+        ids, cursor = [], None
+        while True:
+            response = Response()
+            page = await list_proposals(response, cursor=cursor, limit=7, db=db, tally=None, **filters)
+            assert all('_id' not in proposal for proposal in page)
+            ids += [proposal['id'] for proposal in page]
+            if 'X-Next-Cursor' not in response.headers:
+                return ids
+            cursor = int(response.headers['X-Next-Cursor'])
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        indexer = EventIndexer(service, db, {'ProposalManager': service.proposal_manager}, confirmations=0)
+        await indexer.ensure_indexes()
+        await indexer.sync()
+        states = await db.proposals.distinct('state')
+        return (
+            await pages(db),
+            await pages(db, proposer=proposer.lower()),
+            {state: await pages(db, state=ProposalState(state)) for state in states},
+            {p['id']: p['state'] for p in await db.proposals.find({}, {'id': 1, 'state': 1}).to_list(None)},
+        )
+
+    every, by_proposer, by_state, states = asyncio.run(run())
+
+    assert every == sorted(chain.proposals, reverse=True)
+    assert by_proposer == sorted((pid for pid, p in chain.proposals.items() if p['proposer'] == proposer), reverse=True)
+    for state, ids in by_state.items():
+        assert ids == sorted((pid for pid, s in states.items() if s == state), reverse=True)
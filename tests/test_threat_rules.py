@@ -0,0 +1,48 @@
+"""
+Threat rules: keyword and regex matching, overlapping rules, rule files
+"""
+
+import json
+
+from services.threat_rules import Rule, RuleEngine, required_literal
+
+
+def test_overlapping_regex_rules_all_match():
+    engine = RuleEngine([
+        Rule('drain', r'drain\w*', 'regex', 1),
+        Rule('drain-treasury', r'drain\s+treasury', 'regex', 5),
+        Rule('treasury', 'treasury'),
+    ])
+
+    score, matches = engine.score('Please DRAIN treasury now')
+
+    assert score == 7
+    assert [(m.rule_id, m.matched) for m in matches] == [
+        ('drain', 'DRAIN'), ('drain-treasury', 'DRAIN treasury'), ('treasury', 'treasury')
+    ]
+    assert engine.score('Fund the treasury audit') == (1, [matches[2]])
+
+
+def test_regexes_without_a_literal_always_run():
+    assert required_literal(r'drain\s+treasury') == 'treasury'
+    assert required_literal(r'(\w)\1') is None
+    assert required_literal(r'mint|burn') is None
+
+    engine = RuleEngine([Rule('repeat', r'(\w)\1{3}', 'regex', 2), Rule('mint', r'mint|burn', 'regex', 3)])
+
+    assert [m.rule_id for m in engine.match('transfer to 0xaaaa, then burn')] == ['repeat', 'mint']
+    assert engine.match('transfer to 0xabcd') == []
+
+
+def test_rule_file_with_backreferences_loads(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'rules': [
+        {'id': 'stutter', 'pattern': r'\b(\w+) \1\b', 'type': 'regex', 'score': 2},
+        {'pattern': 'backdoor', 'score': 4},
+    ]}))
+
+    engine = RuleEngine([Rule('fallback', 'rug')], path=str(path))
+
+    assert engine.rule_count == 2
+    assert engine.score('add a backdoor backdoor') == (6, engine.match('add a backdoor backdoor'))
+    assert [m.matched for m in engine.match('add a backdoor backdoor')] == ['backdoor backdoor', 'backdoor']
@@ -0,0 +1,152 @@
+"""
+Vote relay: voter-signed ballots cast through castVoteBySig, one relayed
+vote per voter and proposal, resilient submitter and receipt poller
+"""
+
+import asyncio
+
+import pytest
+import rlp
+from eth_abi import encode
+from eth_account import Account
+from eth_account._utils.legacy_transactions import Transaction
+from eth_account.messages import encode_typed_data
+from eth_utils import keccak
+from pymongo.errors import PyMongoError
+from web3 import Web3
+
+from services.vote_relay import (
+    STATUS_CONFIRMED,
+    STATUS_SUBMITTED,
+    AlreadyRelayed,
+    InvalidVoteSignature,
+    VoteRelay,
+    ballot,
+    recover_voter,
+)
+from tests.stub_chain import ABIS, StubChain, StubRPCServer, write_abis
+
+RELAYER = Account.from_key('0x' + '42' * 32)
+CONTRACT = '0x' + '11' * 20
+
+
+def sign(account, typed_data):
+    return account.sign_message(encode_typed_data(full_message=typed_data)).signature.hex()
+
+
+def contract_digest(chain_id, contract, proposal_id, support, weight):
+    """Digest ProposalManager.castVoteBySig recovers the voter from"""
+    domain = keccak(encode(
+        ['bytes32', 'bytes32', 'bytes32', 'uint256', 'address'],
+        [keccak(text='EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)'),
+         keccak(text='ProposalManager'), keccak(text='1'), chain_id, contract]
+    ))
+    struct = keccak(encode(
+        ['bytes32', 'uint256', 'uint8', 'uint256'],
+        [keccak(text='Ballot(uint256 proposalId,uint8 support,uint256 weight)'), proposal_id, support, weight]
+    ))
+    return keccak(b'\x19\x01' + domain + struct)
+
+
+def test_ballot_signatures_match_the_contract():
+    voter, other = Account.create(), Account.create()
+    signature = sign(voter, ballot(1, CONTRACT, 7, 1, 3 * 10 ** 18))
+
+    assert recover_voter(ballot(1, CONTRACT, 7, 1, 3 * 10 ** 18), signature) == voter.address
+    assert Account._recover_hash(contract_digest(1, CONTRACT, 7, 1, 3 * 10 ** 18), signature=signature) == voter.address
+    # Another weight or chain recovers someone else
+    assert recover_voter(ballot(1, CONTRACT, 7, 1, 4 * 10 ** 18), signature) != voter.address
+    assert recover_voter(ballot(2, CONTRACT, 7, 1, 3 * 10 ** 18), signature) != voter.address
+    assert recover_voter(ballot(1, CONTRACT, 7, 1, 1), sign(other, ballot(1, CONTRACT, 7, 1, 1))) == other.address
+    with pytest.raises(InvalidVoteSignature):
+        recover_voter(ballot(1, CONTRACT, 7, 1, 1), '0x1234')
+
+
+def test_relay_casts_each_voters_signed_vote(tmp_path, monkeypatch, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.async_blockchain_service import AsyncBlockchainService
+
+    url, name = scratch_db
+    chain = StubChain(proposals=5, votes_per_proposal=2, citizens=10)
+    voters, impostor = [Account.create() for _ in range(3)], Account.create()
+
+    async def run(rpc):
+        service = await AsyncBlockchainService.create(
+            rpc_url=rpc.url,
+            governance_core_address=chain.addresses['GovernanceCore'],
+            proposal_manager_address=chain.addresses['ProposalManager'],
+            private_key=RELAYER.key.hex()
+        )
+        relay = VoteRelay(service, AsyncIOMotorClient(url)[name], poll_interval=0.02)
+        await relay.start()
+        try:
+            chain_id = await service.w3.eth.chain_id
+            contract = service.proposal_manager.address
+
+            def vote(account, proposal_id, signer=None):
+                typed_data = ballot(chain_id, contract, proposal_id, 1, 5)
+                return {'voter': account.address, 'proposal_id': proposal_id, 'support': 1, 'weight': 5,
+                        'signature': sign(signer or account, typed_data), 'reason': None}
+
+            verified = [await relay.verify(v['voter'], v['proposal_id'], 1, 5, v['signature'])
+                        for v in (vote(voter, 1) for voter in voters)]
+            with pytest.raises(InvalidVoteSignature):
+                forged = vote(voters[0], 1, signer=impostor)
+                await relay.verify(forged['voter'], 1, 1, 5, forged['signature'])
+
+            # The first status write of each kind fails; both workers carry on
+            update = relay._update
+            failures = []
+
+            async def flaky_update(tracking_id, **fields):
+                if fields['status'] not in [status for _, status in failures]:
+                    failures.append((tracking_id, fields['status']))
+                    raise PyMongoError('connection reset')
+                await update(tracking_id, **fields)
+
+            relay._update = flaky_update
+            # Many voters on one proposal
+            ids = await relay.submit([vote(voter, 1) for voter in voters])
+            with pytest.raises(AlreadyRelayed):
+                await relay.submit([vote(voters[0], 1)])
+            with pytest.raises(AlreadyRelayed):
+                await relay.submit([vote(voters[0], 2), vote(voters[0], 2)])
+            ids += await relay.submit([vote(voters[0], 2)])
+
+            async def statuses():
+                return [(await relay.get(tracking_id))['status'] for tracking_id in ids]
+
+            for _ in range(200):
+                if len(chain.transactions) == len(ids) and STATUS_SUBMITTED in await statuses():
+                    break
+                await asyncio.sleep(0.01)
+            chain.mine()
+            for _ in range(200):
+                if await statuses() == [STATUS_CONFIRMED] * len(ids):
+                    break
+                await asyncio.sleep(0.01)
+            jobs = [await relay.get(tracking_id) for tracking_id in ids]
+            return verified, failures, jobs, relay._pending, [task.done() for task in relay._tasks]
+        finally:
+            await relay.stop()
+            await service.close()
+
+    with StubRPCServer(chain) as rpc:
+        monkeypatch.setenv('ABI_DIR', write_abis(tmp_path / 'abi'))
+        verified, failures, jobs, pending, done = asyncio.run(run(rpc))
+
+    assert verified == [voter.address for voter in voters]
+    assert [status for _, status in failures] == [STATUS_SUBMITTED, STATUS_CONFIRMED]
+    assert [job['status'] for job in jobs] == [STATUS_CONFIRMED] * 4
+    assert pending == {} and done == [False, False]
+
+    # Every vote went out through castVoteBySig, credited to its voter
+    contract = Web3().eth.contract(address=chain.addresses['ProposalManager'], abi=ABIS['ProposalManager'])
+    cast = []
+    for raw, _ in chain.transactions.values():
+        function, args = contract.decode_function_input(rlp.decode(bytes.fromhex(raw[2:]), Transaction).data)
+        cast.append((function.fn_name, args['proposalId'], args['voter']))
+    assert sorted(cast) == sorted(
+        [('castVoteBySig', 1, voter.address) for voter in voters] + [('castVoteBySig', 2, voters[0].address)]
+    )
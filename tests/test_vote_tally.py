@@ -0,0 +1,69 @@
+"""
+Off-chain vote tallies: uint256 exactness, incremental updates and quorum
+against the stub chain
+"""
+
+import asyncio
+
+from services.vote_tally import VoteTally
+
+ETHER = 10 ** 18
+
+
+def test_totals_stay_exact_beyond_int64():
+    tally = VoteTally(None, quorum_bps=1000, capacity=1)
+    tally.electorate = 10
+    tally.add_vote(1, 1, 3 * ETHER)
+    tally.add_vote(2, 0, ETHER // 2)
+    assert tally.exact_int64 and tally.unit == ETHER // 2
+
+    tally.add_vote(2, 1, 2 ** 255 + 1)
+    tally.add_vote(1, 1, -3 * ETHER)
+
+    assert not tally.exact_int64
+    first, second = tally.tallies()
+    assert (first['for_votes'], first['voters'], first['quorum_reached']) == ('0', 0, False)
+    assert second['for_votes'] == str(2 ** 255 + 1)
+    assert second['total_votes'] == str(2 ** 255 + 1 + ETHER // 2)
+    assert second['passing'] and second['turnout'] == 0.2
+
+
+def test_tallies_match_chain_after_indexing(chain, chain_env, service, scratch_db):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from services.event_indexer import EventIndexer
+    from services.governance_stats import GovernanceStatsProjection
+
+    url, name = scratch_db
+
+    async def run():
+        db = AsyncIOMotorClient(url)[name]
+        contracts = {
+            'GovernanceCore': service.governance_core,
+            'ProposalManager': service.proposal_manager,
+            'CitizenRegistry': service.load_contract('CitizenRegistry', chain.addresses['CitizenRegistry']),
+        }
+        indexer = EventIndexer(service, db, contracts, page_size=50, confirmations=0)
+        indexer.add_projection(GovernanceStatsProjection(db, reconcile_interval=0))
+        # Half the chain is loaded from the database, the rest arrives as events
+        await indexer.index_range(0, chain.head // 2)
+        tally = VoteTally(db, service)
+        await tally.load()
+        indexer.add_projection(tally)
+        await indexer.sync()
+        return tally
+
+    tally = asyncio.run(run())
+    results = {t['id']: t for t in tally.tallies()}
+
+    assert tally.quorum_bps == chain.params[2]
+    assert tally.electorate == len(chain.citizens)
+    for pid, proposal in chain.proposals.items():
+        votes_for, against, abstain = proposal['votes']
+        assert results[pid]['for_votes'] == str(votes_for)
+        assert results[pid]['against_votes'] == str(against)
+        assert results[pid]['abstain_votes'] == str(abstain)
+        assert results[pid]['quorum_reached'] == (votes_for + against + abstain >= tally.quorum_required())
+    assert {t['id'] for t in tally.tallies(state='ACTIVE')} == {
+        pid for pid, proposal in chain.proposals.items() if proposal['state'] == 1
+    }